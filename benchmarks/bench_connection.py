@@ -0,0 +1,41 @@
+"""Compare the per-call latency of a pooled `TopasConnection` with
+one-shot ``requests.get`` calls, which open a new TCP connection each time.
+
+Run with ``python benchmarks/bench_connection.py [n_calls] [latency_s]``.
+"""
+from __future__ import annotations
+
+import sys
+import time
+
+import numpy as np
+import requests
+
+from topasoptim.simulator import TopasSimulator
+
+
+def timed(func, n: int) -> np.ndarray:
+    out = np.empty(n)
+    for i in range(n):
+        t0 = time.perf_counter()
+        func()
+        out[i] = time.perf_counter() - t0
+    return out * 1e3
+
+
+def report(name: str, ms: np.ndarray) -> None:
+    p50, p95, p99 = np.percentile(ms, [50, 95, 99])
+    print(f"{name:>12}: p50 {p50:.3f} ms  p95 {p95:.3f} ms  p99 {p99:.3f} ms")
+
+
+def main(n: int = 500, latency: float = 0.0) -> None:
+    path = "/Motors/PropertiesThatChangeOften"
+    with TopasSimulator(latency=latency) as sim:
+        url = sim.base_address + path
+        report("one-shot", timed(lambda: requests.get(url, timeout=1).json(), n))
+        with sim.connection() as conn:
+            report("pooled", timed(lambda: conn.get(path), n))
+
+
+if __name__ == "__main__":
+    main(*(t(a) for t, a in zip((int, float), sys.argv[1:], strict=False)))
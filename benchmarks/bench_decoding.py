@@ -0,0 +1,74 @@
+"""Decoding of the motor payloads with the stdlib against the backends of
+`topasoptim.decoding`.
+
+``PropertiesThatChangeOften`` is decoded into a `MotorTable`, the old path
+decodes with ``json`` and copies the five fields one list at a time, the
+projected path fills the table from `decode_motor_states`. ``AllProperties``
+is decoded into `TopasMotor` objects with ``json`` and `decoding.loads`.
+
+Run with ``python benchmarks/bench_decoding.py [n_calls]``.
+"""
+from __future__ import annotations
+
+import json
+import sys
+import time
+
+import numpy as np
+
+from topasoptim import decoding
+from topasoptim.simulator import SimulatedMotor, make_motor_properties
+from topasoptim.TopasModel import MotorTable, TopasMotor
+
+
+def timed(func, n: int) -> float:
+    "Mean time of `func` in µs"
+    t0 = time.perf_counter()
+    for _ in range(n):
+        func()
+    return (time.perf_counter() - t0) / n * 1e6
+
+
+def make_motors(n_motors: int) -> list[SimulatedMotor]:
+    motors = [SimulatedMotor(make_motor_properties(i, f"Motor {i}", position=1000 + 37 * i))
+              for i in range(n_motors)]
+    for i, m in enumerate(motors):
+        m.set_target(5000 + 11 * i, 0.0)
+    return motors
+
+
+def update_per_field(table: MotorTable, props: list[dict]) -> None:
+    "`MotorTable.update` before the projected decoding"
+    rows = np.array([table.row_of_index[m["Index"]] for m in props], dtype=np.intp)
+    for field, key in decoding.MOTOR_STATE_KEYS.items():
+        table.data[field][rows] = [m[key] for m in props]
+
+
+def main(n: int = 20000) -> None:
+    backends = [b for b in decoding.BACKENDS if b != "orjson" or decoding.orjson is not None]
+    print(f"default backend: {decoding.DEFAULT_BACKEND}")
+    for n_motors in (6, 16, 32):
+        motors = make_motors(n_motors)
+        changing = json.dumps([m.changing_properties(0.05) for m in motors]).encode()
+        table = MotorTable(TopasMotor.from_dict(m.all_properties(0.0)) for m in motors)
+        base = timed(lambda t=table, c=changing: update_per_field(t, json.loads(c)), n)
+        line = f"{n_motors:3d} motors, {len(changing):6d} B changing: full json {base:6.1f} µs"
+        for backend in backends:
+            t = timed(lambda b=backend, t=table, c=changing: t.update_states(
+                decoding.decode_motor_states(c, backend=b)), n)
+            line += f", {backend} {t:6.1f} µs ({base / t:.1f}x)"
+        print(line)
+
+        everything = json.dumps({"Motors": [m.all_properties(0.0) for m in motors]}).encode()
+
+        def parse(loads, everything=everything):
+            return [TopasMotor.from_dict(m) for m in loads(everything)["Motors"]]
+
+        base = timed(lambda: parse(json.loads), n // 10)
+        t = timed(lambda: parse(decoding.loads), n // 10)
+        print(f"{'':11} {len(everything):6d} B all:      full json {base:6.1f} µs"
+              f", loads {t:6.1f} µs ({base / t:.1f}x)")
+
+
+if __name__ == "__main__":
+    main(*(t(a) for t, a in zip((int,), sys.argv[1:], strict=False)))
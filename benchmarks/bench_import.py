@@ -0,0 +1,61 @@
+"""Import time of the package and its modules, and the time to create a
+`Topas` model eagerly and lazily on the simulator.
+
+Every import is measured in a fresh interpreter with ``-X importtime``, the
+numbers are the cumulative import times of the module in milliseconds.
+
+Run with ``python benchmarks/bench_import.py [repeats] [latency_s]``.
+"""
+from __future__ import annotations
+
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+from topasoptim.simulator import TopasSimulator
+from topasoptim.TopasModel import Topas
+
+MODULES = [
+    "topasoptim",
+    "topasoptim.TopasModel",
+    "topasoptim.AsyncTopasModel",
+    "topasoptim.metrics",
+    "topasoptim.optimizers",
+    "topasoptim.pool",
+]
+
+
+def import_time(module: str) -> float:
+    "Cumulative import time of `module` in ms, measured in a new interpreter"
+    out = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True, text=True, check=True).stderr
+    for line in reversed(out.splitlines()):
+        _, cumulative, name = line.split("|")
+        if name.strip() == module:
+            return int(cumulative) / 1e3
+    msg = f"{module} not found in the import times"
+    raise RuntimeError(msg)
+
+
+def main(repeats: int = 5, latency: float = 0.02) -> None:
+    for module in MODULES:
+        ms = np.array([import_time(module) for _ in range(repeats)])
+        print(f"{module:>28}: {np.median(ms):7.2f} ms")
+
+    with TopasSimulator(latency=latency) as sim:
+        for lazy in (False, True):
+            times = np.empty(repeats)
+            for i in range(repeats):
+                with sim.connection() as conn:
+                    t0 = time.perf_counter()
+                    Topas(connection=conn, lazy=lazy)
+                    times[i] = time.perf_counter() - t0
+            print(f"{'Topas(lazy=' + str(lazy) + ')':>28}: "
+                  f"{np.median(times) * 1e3:7.2f} ms")
+
+
+if __name__ == "__main__":
+    main(*(t(a) for t, a in zip((int, float), sys.argv[1:], strict=False)))
@@ -0,0 +1,37 @@
+"""Throughput of the spectral metrics on batches of spectrometer frames.
+
+Run with ``python benchmarks/bench_metrics.py [n_frames] [n_pixels]``.
+"""
+from __future__ import annotations
+
+import sys
+import time
+
+import numpy as np
+
+from topasoptim import metrics
+
+
+def main(n_frames: int = 100, n_pixels: int = 2048, repeats: int = 50) -> None:
+    axis = metrics.SpectralAxis(np.linspace(400, 1000, n_pixels))
+    rng = np.random.default_rng(0)
+    centers = rng.uniform(600, 800, n_frames)
+    spectra = np.exp(-0.5 * ((axis.wavelengths - centers[:, None]) / 10) ** 2)
+    spectra += rng.normal(0, 0.01, spectra.shape)
+    funcs = {
+        "intensity": metrics.intensity_metric(axis, 689.0, width=2.0),
+        "band power": metrics.band_power_metric(axis, 650, 750),
+        "centroid": metrics.centroid_metric(axis),
+        "fwhm": metrics.fwhm_metric(axis),
+    }
+    for name, func in funcs.items():
+        t0 = time.perf_counter()
+        for _ in range(repeats):
+            func(spectra)
+        dt = (time.perf_counter() - t0) / repeats
+        print(f"{name:>10}: {dt * 1e3:7.3f} ms per batch, "
+              f"{n_frames / dt:10.0f} frames/s")
+
+
+if __name__ == "__main__":
+    main(*(int(a) for a in sys.argv[1:]))
@@ -0,0 +1,49 @@
+"""Grid scan on the simulator, hand-written loop against the pipelined `Scan`.
+
+The acquisition and the processing are simulated by sleeping.
+
+Run with ``python benchmarks/bench_scan.py [n] [acquire_s] [process_s]``.
+"""
+from __future__ import annotations
+
+import sys
+import time
+
+import numpy as np
+
+from topasoptim.scan import Scan, ScanAxis
+from topasoptim.simulator import TopasSimulator
+from topasoptim.TopasModel import Topas
+
+
+def main(n: int = 8, acquire_time: float = 0.02, process_time: float = 0.01) -> None:
+    axes = [ScanAxis.linspace("Crystal 1", 5000, 5200, n),
+            ScanAxis.linspace("Delay 1", 5000, 5200, n)]
+
+    def acquire() -> np.ndarray:
+        time.sleep(acquire_time)
+        return np.zeros(1024)
+
+    def process(spectrum: np.ndarray) -> float:
+        time.sleep(process_time)
+        return float(spectrum.sum())
+
+    with TopasSimulator() as sim, sim.connection() as conn:
+        topas = Topas(connection=conn)
+        data = np.empty((n, n))
+        t0 = time.perf_counter()
+        for i, p1 in enumerate(axes[0].positions):
+            for j, p2 in enumerate(axes[1].positions):
+                topas.move_motor("Crystal 1", p1)
+                topas.move_motor("Delay 1", p2)
+                topas.wait_for_motors(["Crystal 1", "Delay 1"])
+                data[i, j] = process(acquire())
+        loop = time.perf_counter() - t0
+        topas.move_motors({"Crystal 1": 5000, "Delay 1": 5000}, wait=True)
+        result = Scan(topas, axes, acquire, process).run()
+    print(f"{n}x{n} points: loop {loop:.2f} s, scan {result.elapsed:.2f} s "
+          f"({loop / result.elapsed:.2f}x)")
+
+
+if __name__ == "__main__":
+    main(*(t(a) for t, a in zip((int, float, float), sys.argv[1:], strict=False)))
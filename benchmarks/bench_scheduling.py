@@ -0,0 +1,49 @@
+"""Measured effect of travel scheduling on batches evaluated on the simulator.
+
+Each batch of random candidates is visited once in the generated order and
+once in the scheduled order, with a move to the candidate and a wait for
+the motors per point. Prints the predicted and the measured travel times.
+
+Run with ``python benchmarks/bench_scheduling.py [n_batches] [batch_size]``.
+"""
+from __future__ import annotations
+
+import sys
+import time
+
+import numpy as np
+
+from topasoptim.scheduling import TravelScheduler
+from topasoptim.simulator import TopasSimulator
+from topasoptim.TopasModel import Topas
+
+NAMES = ["Crystal 1", "Delay 1", "Crystal 2"]
+
+
+def visit(topas: Topas, X: np.ndarray) -> float:
+    t0 = time.perf_counter()
+    for x in X:
+        topas.move_motors(dict(zip(NAMES, x, strict=True)), wait=True, min_interval=0.002)
+    return time.perf_counter() - t0
+
+
+def main(n_batches: int = 3, batch_size: int = 12) -> None:
+    rng = np.random.default_rng(0)
+    with TopasSimulator() as sim, sim.connection() as conn:
+        topas = Topas(connection=conn)
+        scheduler = TravelScheduler.for_topas(topas, NAMES)
+        original = scheduled = 0.0
+        for _ in range(n_batches):
+            X = rng.integers(4000, 6000, size=(batch_size, len(NAMES)))
+            start = scheduler.position.copy()
+            original += visit(topas, X)
+            visit(topas, [start])
+            scheduled += visit(topas, X[scheduler.order(X)])
+    stats = scheduler.stats
+    print(f"predicted: {stats.predicted_original:.2f} s -> {stats.predicted_scheduled:.2f} s")
+    print(f"measured:  {original:.2f} s -> {scheduled:.2f} s "
+          f"({(1 - scheduled / original) * 100:.0f} % saved)")
+
+
+if __name__ == "__main__":
+    main(*(int(a) for a in sys.argv[1:]))
@@ -0,0 +1,38 @@
+"""Load test of the client stack against the simulated PublicAPI.
+
+Runs optimizer-like steps, each moving two motors to random targets and
+waiting for them to settle, and reports the settle time and request rate.
+
+Run with ``python benchmarks/bench_simulator.py [n_steps] [latency_s] [jitter_s]``.
+"""
+from __future__ import annotations
+
+import sys
+import time
+
+import numpy as np
+
+from topasoptim.simulator import TopasSimulator
+from topasoptim.TopasModel import Topas
+
+
+def main(n: int = 50, latency: float = 0.002, jitter: float = 0.001) -> None:
+    rng = np.random.default_rng(0)
+    with TopasSimulator(latency=latency, jitter=jitter, seed=0) as sim, \
+            sim.connection() as conn:
+        topas = Topas(connection=conn)
+        settle = np.empty(n)
+        requests_before = sim.request_count
+        t0 = time.perf_counter()
+        for i in range(n):
+            targets = rng.integers(4800, 5200, size=2)
+            settle[i] = topas.move_motors(
+                {"Crystal 1": targets[0], "Crystal 2": targets[1]}, wait=True)
+        wall = time.perf_counter() - t0
+        n_requests = sim.request_count - requests_before
+    print(f"{n} steps in {wall:.2f} s, settle time mean {settle.mean() * 1e3:.1f} ms, "
+          f"max {settle.max() * 1e3:.1f} ms, {n_requests / wall:.0f} requests/s")
+
+
+if __name__ == "__main__":
+    main(*(t(a) for t, a in zip((int, float, float), sys.argv[1:], strict=False)))
@@ -0,0 +1,254 @@
+from __future__ import annotations
+
+import asyncio
+import dataclasses
+from collections.abc import Awaitable, Callable, Collection
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING, Any, TypeVar
+
+from .decoding import motor_states_from_dicts
+from .TopasModel import (
+    Operation,
+    Request,
+    TopasConnection,
+    TopasState,
+    fetch_motor_states,
+)
+
+if TYPE_CHECKING:
+    import numpy as np
+    import requests
+
+T = TypeVar("T")
+
+
+@dataclasses.dataclass(kw_only=True)
+class AsyncTopasConnection:
+    """Asyncio connection to the Topas OPA
+
+    Awaitable counterpart of `TopasConnection`. The requests are run by the
+    wrapped blocking connection on a small thread pool, so they share its
+    keep-alive session, timeouts and retries, while the event loop stays
+    free for other work.
+
+    Attributes
+    ----------
+    connection : TopasConnection
+        Blocking connection doing the actual requests
+    max_workers : int | None
+        Number of requests in flight at the same time, defaults to the
+        pool size of the connection
+    """
+    connection: TopasConnection
+    max_workers: int | None = None
+    executor: ThreadPoolExecutor = dataclasses.field(init=False, repr=False)
+
+    def __post_init__(self) -> None:
+        if self.max_workers is None:
+            self.max_workers = getattr(self.connection, "pool_size", 4)
+        self.executor = ThreadPoolExecutor(
+            max_workers=self.max_workers, thread_name_prefix="topas-io"
+        )
+
+    @classmethod
+    def from_info(cls, **kwargs: Any) -> AsyncTopasConnection:
+        "Create a connection, takes the arguments of `TopasConnection.from_info`"
+        return cls(connection=TopasConnection.from_info(**kwargs))
+
+    async def _run(self, func, *args) -> Any:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, func, *args)
+
+    async def put(self, url, data) -> requests.Response:
+        return await self._run(self.connection.put, url, data)
+
+    async def post(self, url, data) -> requests.Response:
+        return await self._run(self.connection.post, url, data)
+
+    async def get(self, url) -> Any:
+        return await self._run(self.connection.get, url)
+
+    async def get_motor_states(self, out: np.ndarray | None = None) -> np.ndarray:
+        "Motor positions as a `MOTOR_DTYPE` array, see `fetch_motor_states`"
+        return await self._run(fetch_motor_states, self.connection, out)
+
+    def close(self) -> None:
+        "Shut down the thread pool and close the wrapped connection"
+        self.executor.shutdown(wait=True)
+        if hasattr(self.connection, "close"):
+            self.connection.close()
+
+    async def __aenter__(self) -> AsyncTopasConnection:
+        return self
+
+    async def __aexit__(self, *exc_info: object) -> None:
+        self.close()
+
+
+async def run_operation_async(
+    operation: Operation[T], execute: Callable[[Request], Awaitable[Any]]
+) -> T:
+    "Awaitable `run_operation`, executing the steps with the coroutine `execute`"
+    result: Any = None
+    error: Exception | None = None
+    while True:
+        try:
+            request = operation.send(result) if error is None else operation.throw(error)
+        except StopIteration as stop:
+            return stop.value
+        try:
+            result, error = await execute(request), None
+        except Exception as err:
+            result, error = None, err
+
+
+@dataclasses.dataclass
+class AsyncTopas(TopasState):
+    """
+    Asyncio OPA Model
+
+    Has the same methods as `Topas`, but all methods talking to the OPA
+    are coroutines. Both run the operations of `TopasState`, so they only
+    differ in how the requests are executed. Since ``__post_init__`` can
+    not await, create instances with `AsyncTopas.create`, which loads the
+    motors and the saved positions concurrently, otherwise they are loaded
+    by the first method needing them.
+
+    Attributes
+    ----------
+    motors : dict[str, TopasMotor]
+        Dictionary of motors
+    index_to_motor : dict[int, TopasMotor]
+        Dictionary of motor indices to motors
+    connection : AsyncTopasConnection
+        Connection to the OPA
+    positions : PositionStore
+        Saved positions by GUID
+    recorder : SessionRecorder | None
+        Records motor snapshots and moves, see `start_recording`
+    """
+
+    connection: AsyncTopasConnection = dataclasses.field(
+        default_factory=AsyncTopasConnection.from_info
+    )
+    _init_lock: asyncio.Lock = dataclasses.field(
+        init=False, repr=False, compare=False, default_factory=asyncio.Lock)
+
+    @classmethod
+    async def create(
+        cls, connection: AsyncTopasConnection | None = None
+    ) -> AsyncTopas:
+        "Create and initialize an OPA model"
+        topas = cls() if connection is None else cls(connection=connection)
+        await topas.initialize()
+        return topas
+
+    async def _execute(self, request: Request) -> Any:
+        kind, args = request.kind, request.args
+        if kind == "sleep":
+            await asyncio.sleep(args[0])
+            return None
+        if kind == "get_many":
+            return list(await asyncio.gather(*(self.connection.get(url) for url in args)))
+        if kind == "put_many":
+            return list(await asyncio.gather(
+                *(self.connection.put(url, data) for url, data in args[0])))
+        if kind == "get_motor_states" and not hasattr(self.connection, kind):
+            props = await self.connection.get("/Motors/PropertiesThatChangeOften")
+            return motor_states_from_dicts(props, *args)
+        return await getattr(self.connection, kind)(*args)
+
+    async def _run(self, operation: Operation[T], initialize: bool = True) -> T:
+        if initialize:
+            await self.ensure_initialized()
+        return await run_operation_async(operation, self._execute)
+
+    async def initialize(self) -> None:
+        "Load the motors and the saved positions concurrently"
+        await self._run(self._initialize_op(), initialize=False)
+
+    async def ensure_initialized(self) -> None:
+        "Initialize the model unless done"
+        if self.initialized:
+            return
+        async with self._init_lock:
+            if not self.initialized:
+                await self.initialize()
+
+    async def update_motors(self) -> None:
+        "Update the motor information"
+        await self._run(self._update_motors_op())
+
+    async def get_actual_positions(self) -> dict[str, int]:
+        "Get the actual positions of the motors"
+        await self.update_motor_positions()
+        return self._actual_positions()
+
+    async def get_target_positions(self) -> dict[str, int]:
+        "Get the target positions of the motors"
+        await self.update_motor_positions()
+        return self._target_positions()
+
+    async def is_open(self) -> bool:
+        "Get the status of the shutter"
+        return await self._run(
+            self._get_op("/ShutterInterlock/IsShutterOpen"), initialize=False)
+
+    async def toggle_shutter(self, shutter_open: bool) -> None:
+        "Toggle the shutter"
+        await self._run(self._toggle_shutter_op(shutter_open), initialize=False)
+
+    async def get_authentication_status(self) -> bool:
+        "Get the authentication status of the caller"
+        return await self._run(self._get_op("/CallerHasAccess"), initialize=False)
+
+    async def update_motor_positions(self) -> None:
+        "Get the motor positions"
+        await self._run(self._update_motor_positions_op())
+
+    async def move_motor(self, name: str, position: int) -> None:
+        "Move a motor to a position"
+        await self._run(self._move_motor_op(name, position))
+
+    async def move_motors(
+        self,
+        positions: dict[str, int],
+        wait: bool = False,
+        timeout: float = 10.0,
+        min_interval: float = 0.005,
+        max_interval: float = 0.1,
+    ) -> float | None:
+        """Move multiple motors to positions, see `Topas.move_motors`
+
+        The target positions are sent concurrently."""
+        return await self._run(self._move_motors_op(
+            positions, wait, timeout, min_interval, max_interval))
+
+    async def wait_for_motors(
+        self,
+        names: Collection[str],
+        timeout: float = 10.0,
+        min_interval: float = 0.005,
+        max_interval: float = 0.1,
+    ) -> float:
+        "Wait until the motors in `names` settled, see `Topas.wait_for_motors`"
+        return await self._run(self._wait_for_motors_op(
+            names, timeout, min_interval, max_interval))
+
+    async def save_positions(self, name: str, folder: str) -> str:
+        "Save the current motor positions"
+        return await self._run(self._save_positions_op(name, folder))
+
+    async def load_positions(self) -> None:
+        "Load all saved motor positions"
+        await self._run(self._load_positions_op())
+
+    async def goto_position_by_name(self, name: str) -> None:
+        """Move the motors to a saved position called `name`
+        If there are multiple positions with the same name, the first one is used"""
+        await self.ensure_initialized()
+        await self.goto_position_by_id(self._find_position(name).GUID)
+
+    async def goto_position_by_id(self, guid: str) -> None:
+        """Move the motors to a saved position with a given GUID"""
+        await self._run(self._goto_position_by_id_op(guid), initialize=False)
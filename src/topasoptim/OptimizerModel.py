@@ -1,10 +1,15 @@
 from __future__ import annotations
 
+import queue
+import threading
 from collections.abc import Callable
 from typing import Any, Protocol
 
 import numpy as np
 
+ObjectiveFunc = Callable[[np.ndarray[Any, np.float64]], float]
+BatchObjectiveFunc = Callable[[np.ndarray[Any, np.float64]], np.ndarray[Any, np.float64]]
+
 
 class OptimizerModel(Protocol):
     """Protocol for optimizer models."""
@@ -20,3 +25,195 @@ class OptimizerModel(Protocol):
 
     def get_history(self) -> np.ndarray[Any, float]:
         """Get the history of the optimizer."""
+
+
+class AskTellOptimizer(Protocol):
+    """Protocol for optimizers proposing batches of candidates.
+
+    The caller evaluates the candidates returned by `ask` in any order or
+    all at once and reports the results with `tell`.
+    """
+
+    num_params: int
+
+    def ask(self, n: int = 1) -> np.ndarray[Any, np.float64]:
+        """Return up to `n` candidates as an ``(n, num_params)`` array."""
+
+    def tell(
+        self, X: np.ndarray[Any, np.float64], y: np.ndarray[Any, np.float64]
+    ) -> None:
+        """Report the objective values `y` of the candidates `X`."""
+
+    def get_history(self) -> np.ndarray[Any, float]:
+        """Get the history of the optimizer."""
+
+
+def evaluate_batch(func: ObjectiveFunc, X: np.ndarray) -> np.ndarray:
+    """Evaluate a scalar objective on every row of `X`"""
+    return np.fromiter((func(x) for x in X), dtype=np.float64, count=len(X))
+
+
+class AskTellStepper:
+    """
+    Use an `AskTellOptimizer` where an `OptimizerModel` is expected
+
+    Every `step` asks for `batch_size` candidates, evaluates them and tells
+    the results. If `batch_func` is given, the whole batch is passed to it
+    at once, otherwise the `func` given to `step` is called per candidate.
+    Once the optimizer returns no candidates, `done` is true and `step`
+    returns NaN without evaluating anything.
+    """
+
+    def __init__(
+        self,
+        optimizer: AskTellOptimizer,
+        batch_size: int = 1,
+        batch_func: BatchObjectiveFunc | None = None,
+    ) -> None:
+        self.optimizer = optimizer
+        self.num_params = optimizer.num_params
+        self.batch_size = batch_size
+        self.batch_func = batch_func
+        self.done = False
+
+    def step(
+        self,
+        params: np.ndarray[Any, np.float64],
+        func: Callable[[np.ndarray[Any, np.float64]], float],
+    ) -> float:
+        """Evaluate one batch, returns its best value and writes the best
+        candidate into `params`"""
+        X = self.optimizer.ask(self.batch_size)
+        if len(X) == 0:
+            self.done = True
+            return np.nan
+        if self.batch_func is not None:
+            y = np.asarray(self.batch_func(X), dtype=np.float64)
+        else:
+            y = evaluate_batch(func, X)
+        self.optimizer.tell(X, y)
+        best = int(np.argmin(y))
+        params[:] = X[best]
+        return float(y[best])
+
+    def get_history(self) -> np.ndarray[Any, float]:
+        return self.optimizer.get_history()
+
+
+class _Closed(Exception):
+    """Raised inside the wrapped step to end the worker thread"""
+
+
+class StepAskTell:
+    """
+    Use a step-style `OptimizerModel` through the ask/tell interface
+
+    The wrapped optimizer runs `step` in a worker thread. Each call of the
+    objective inside `step` becomes one candidate returned by `ask`, and
+    blocks until its value is reported with `tell`. Since such optimizers
+    evaluate one point after another, `ask` returns a single candidate
+    regardless of `n`. Once a `step` calls the objective no more, or the
+    optimizer reports `done`, the worker ends and `ask` returns an empty
+    batch. Call `close` to stop the worker.
+    """
+
+    def __init__(self, optimizer: OptimizerModel, params: np.ndarray) -> None:
+        self.optimizer = optimizer
+        self.num_params = optimizer.num_params
+        self.params = np.array(params, dtype=np.float64)
+        self._candidates: queue.Queue[np.ndarray | BaseException | None] = queue.Queue(1)
+        self._results: queue.Queue[float | None] = queue.Queue(1)
+        self._pending = False
+        self._calls = 0
+        self._exhausted = False
+        self._thread: threading.Thread | None = None
+
+    def _func(self, x: np.ndarray) -> float:
+        self._calls += 1
+        self._candidates.put(np.array(x, dtype=np.float64))
+        y = self._results.get()
+        if y is None:
+            raise _Closed
+        return y
+
+    def _run(self) -> None:
+        try:
+            while not getattr(self.optimizer, "done", False):
+                calls = self._calls
+                self.optimizer.step(self.params, self._func)
+                if self._calls == calls:
+                    break
+        except _Closed:
+            return
+        except BaseException as err:  # forwarded to the caller of ask
+            self._candidates.put(err)
+            return
+        self._candidates.put(None)
+
+    def ask(self, n: int = 1) -> np.ndarray[Any, np.float64]:  # noqa: ARG002
+        if self._pending:
+            msg = "tell the result of the last candidate before asking again"
+            raise RuntimeError(msg)
+        if self._exhausted:
+            return np.empty((0, self.num_params))
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+        x = self._candidates.get()
+        if isinstance(x, BaseException):
+            self._thread = None
+            raise x
+        if x is None:
+            self._exhausted = True
+            self._thread.join()
+            self._thread = None
+            return np.empty((0, self.num_params))
+        self._pending = True
+        return x[np.newaxis, :]
+
+    def tell(
+        self, X: np.ndarray[Any, np.float64], y: np.ndarray[Any, np.float64]
+    ) -> None:
+        if not self._pending or len(X) != 1:
+            msg = "tell expects exactly the one candidate returned by ask"
+            raise ValueError(msg)
+        self._pending = False
+        self._results.put(float(np.asarray(y).ravel()[0]))
+
+    def close(self) -> None:
+        "Stop the worker thread"
+        if self._thread is not None:
+            self._pending = False
+            self._results.put(None)
+            self._thread.join()
+            self._thread = None
+
+    def get_history(self) -> np.ndarray[Any, float]:
+        return self.optimizer.get_history()
+
+
+def run_ask_tell(
+    optimizer: AskTellOptimizer,
+    func: ObjectiveFunc | BatchObjectiveFunc,
+    max_evals: int,
+    batch_size: int = 1,
+    vectorized: bool = False,
+) -> tuple[np.ndarray, float]:
+    """Run an ask/tell optimizer for up to `max_evals` evaluations
+
+    If `vectorized` is true, `func` takes an ``(n, num_params)`` array and
+    returns ``n`` values. Returns the best candidate and its value.
+    """
+    best_x, best_y = np.full(optimizer.num_params, np.nan), np.inf
+    evals = 0
+    while evals < max_evals:
+        X = optimizer.ask(min(batch_size, max_evals - evals))
+        if len(X) == 0:
+            break
+        y = np.asarray(func(X), dtype=np.float64) if vectorized else evaluate_batch(func, X)
+        optimizer.tell(X, y)
+        evals += len(X)
+        i = int(np.argmin(y))
+        if y[i] < best_y:
+            best_x, best_y = X[i].copy(), float(y[i])
+    return best_x, best_y
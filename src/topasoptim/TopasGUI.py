@@ -25,9 +25,10 @@ class TopasInfoLabel(QLabel):
         self.topas: Topas = topas
 
     def update_text(self):
+        snapshot = self.topas.snapshot()
         s = ""
-        for name, motor in self.topas.motors.items():
-            s += f"{name}: {motor.actual_position} {motor.target_position}\n"
+        for name, actual in snapshot.actual_positions.items():
+            s += f"{name}: {actual} {snapshot.target_positions[name]}\n"
         self.setText(s)
 
 
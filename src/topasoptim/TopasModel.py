@@ -1,24 +1,82 @@
 from __future__ import annotations
 
+import bisect
 import dataclasses
-from typing import Any
+import datetime
+import logging
+import os
+import re
+import threading
+import time
+from collections.abc import Callable, Collection, Generator, Iterable, Iterator, Mapping
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import TYPE_CHECKING, Any, TypeVar
 
-import requests
+import numpy as np
+
+from .cache import ResponseCache
+from .decoding import MOTOR_DTYPE, decode_motor_states, loads, motor_states_from_dicts
+from .instrumentation import ConnectionStats
+from .poller import MotorPoller, MotorSnapshot
+from .recording import SessionRecorder
+
+if TYPE_CHECKING:
+    import requests
+
+T = TypeVar("T")
+
+logger = logging.getLogger(__name__)
+
+
+class _MotorState:
+    """Field of `TopasMotor` stored in a one-row view of a `MOTOR_DTYPE` array
+
+    Raises AttributeError on class access, so the dataclass sees no default.
+    """
+
+    def __init__(self, convert: type) -> None:
+        self.convert = convert
+
+    def __set_name__(self, owner: type, name: str) -> None:
+        self.name = name
+
+    def __get__(self, motor: TopasMotor | None, owner: type | None = None) -> Any:
+        if motor is None:
+            raise AttributeError(self.name)
+        return self.convert(motor._row[self.name][0])
+
+    def __set__(self, motor: TopasMotor, value: Any) -> None:
+        row = motor.__dict__.get("_row")
+        if row is None:
+            row = motor.__dict__["_row"] = np.zeros(1, MOTOR_DTYPE)
+        row[self.name] = value
 
 
 @dataclasses.dataclass
 class TopasMotor:
-    """A motor on the Topas OPA"""
+    """A motor on the Topas OPA
+
+    The positions are stored in a row of a `MOTOR_DTYPE` array. A motor
+    created on its own owns its row, motors of a `Topas` are views into
+    its `MotorTable`. `forbidden_ranges` only holds the enabled, non-empty
+    ``(From, To)`` ranges.
+    """
     name: str
     index: int
-    actual_position: int
-    target_position: int
-    actual_position_in_units: float
-    target_position_in_units: float
+    actual_position: int = _MotorState(int)
+    target_position: int = _MotorState(int)
+    actual_position_in_units: float = _MotorState(float)
+    target_position_in_units: float = _MotorState(float)
     unit_name: str
+    maximal_position: int | None = None
+    maximal_velocity: float | None = None
+    acceleration: float | None = None
+    forbidden_ranges: list[tuple[int, int]] = dataclasses.field(default_factory=list)
 
     @classmethod
     def from_dict(cls, data: dict[str, Any]) -> TopasMotor:
+        forbidden = [(r["From"], r["To"]) for r in data.get("ForbiddenRanges", ())
+                     if r.get("IsEnabled", True) and r["From"] < r["To"]]
         return cls(
             name=data["Title"],
             index=data["Index"],
@@ -27,9 +85,129 @@ class TopasMotor:
             actual_position_in_units=data["ActualPositionInUnits"],
             target_position_in_units=data["TargetPositionInUnits"],
             unit_name=data["UnitName"],
+            maximal_position=data.get("MaximalPosition"),
+            maximal_velocity=data.get("MaximalVelocity"),
+            acceleration=data.get("Acceleration"),
+            forbidden_ranges=forbidden,
         )
 
 
+class MotorTable:
+    """
+    Fast-changing state of all motors as one structured array
+
+    Attributes
+    ----------
+    data : np.ndarray
+        Array of `MOTOR_DTYPE`, one row per motor
+    names : list[str]
+        Motor name of each row
+    motors : list[TopasMotor]
+        Motor of each row, the motors are views into `data`
+    """
+
+    def __init__(self, motors: Iterable[TopasMotor]) -> None:
+        self.motors = list(motors)
+        self.data = np.zeros(len(self.motors), MOTOR_DTYPE)
+        self._bind()
+        self._props_indices: list[int] | None = None
+        self._props_rows: np.ndarray | None = None
+
+    def _bind(self) -> None:
+        for i, motor in enumerate(self.motors):
+            self.data[i] = motor._row[0]
+            self.data["index"][i] = motor.index
+            motor.__dict__["_row"] = self.data[i: i + 1]
+        self.names = [motor.name for motor in self.motors]
+        self.row_of_name = {name: i for i, name in enumerate(self.names)}
+        self.row_of_index = {m.index: i for i, m in enumerate(self.motors)}
+        self._rows_cache: dict[tuple[str, ...], np.ndarray] = {}
+
+    def __len__(self) -> int:
+        return len(self.motors)
+
+    def rows(self, names: Iterable[str]) -> np.ndarray:
+        "Row numbers of the motors called `names`"
+        key = tuple(names)
+        rows = self._rows_cache.get(key)
+        if rows is None:
+            rows = np.array([self.row_of_name[n] for n in key], dtype=np.intp)
+            self._rows_cache[key] = rows
+        return rows
+
+    def update_states(self, states: np.ndarray) -> None:
+        "Update the table in place from `MOTOR_DTYPE` rows, matched by motor index"
+        indices = states["index"].tolist()
+        if indices != self._props_indices:
+            self._props_rows = np.array(
+                [self.row_of_index[i] for i in indices], dtype=np.intp)
+            self._props_indices = indices
+        self.data[self._props_rows] = states
+
+    def update(self, props: list[dict[str, Any]]) -> None:
+        "Update the table in place from the ``PropertiesThatChangeOften`` payload"
+        self.update_states(motor_states_from_dicts(props))
+
+    def actual_positions(self, names: Iterable[str] | None = None) -> np.ndarray:
+        "Actual positions of the motors in the order of `names`, all if None"
+        if names is None:
+            return self.data["actual_position"].copy()
+        return self.data["actual_position"][self.rows(names)]
+
+    def target_positions(self, names: Iterable[str] | None = None) -> np.ndarray:
+        "Target positions of the motors in the order of `names`, all if None"
+        if names is None:
+            return self.data["target_position"].copy()
+        return self.data["target_position"][self.rows(names)]
+
+    def reorder(self, names: Iterable[str]) -> None:
+        """Move the motors called `names` to the first rows, in that order
+
+        Afterwards ``data[field][:len(names)]`` is a view with the values of
+        these motors in that order. Views taken before are no longer updated.
+        """
+        names = list(names)
+        first = [self.motors[self.row_of_name[n]] for n in names]
+        rest = [m for m in self.motors if m.name not in set(names)]
+        self.motors = first + rest
+        self.data = np.zeros(len(self.motors), MOTOR_DTYPE)
+        self._bind()
+        self._props_indices = None
+
+
+_DATE_RE = re.compile(r"/Date\((-?\d+)([+-]\d{4})?\)/")
+
+
+def parse_date(value: str) -> datetime.datetime:
+    """Parse a ``/Date(1500038173392+0300)/`` timestamp of the PublicAPI
+
+    The number is milliseconds since the epoch in UTC, the optional
+    offset gives the time zone of the returned datetime."""
+    match = _DATE_RE.fullmatch(value)
+    if match is None:
+        msg = f"Invalid date: {value!r}"
+        raise ValueError(msg)
+    millis, offset = match.groups()
+    tz = datetime.timezone.utc
+    if offset:
+        sign = -1 if offset[0] == "-" else 1
+        tz = datetime.timezone(sign * datetime.timedelta(
+            hours=int(offset[1:3]), minutes=int(offset[3:5])))
+    return datetime.datetime.fromtimestamp(int(millis) / 1000, tz=tz)
+
+
+def format_date(value: datetime.datetime | None = None) -> str:
+    """Format a timezone-aware datetime, now in UTC if None, as a
+    PublicAPI timestamp, the inverse of `parse_date`"""
+    if value is None:
+        value = datetime.datetime.now(datetime.timezone.utc)
+    offset = value.utcoffset() or datetime.timedelta()
+    minutes = round(offset.total_seconds() / 60)
+    sign = "-" if minutes < 0 else "+"
+    hours, minutes = divmod(abs(minutes), 60)
+    return f"/Date({round(value.timestamp() * 1000)}{sign}{hours:02d}{minutes:02d})/"
+
+
 @dataclasses.dataclass
 class MotorPositionSetting:
     """A saved motor position setting using the Topas software"""
@@ -52,12 +230,172 @@ class MotorPositionSetting:
             time_created=data["TimeCreated"],
         )
 
+    @property
+    def created(self) -> datetime.datetime | None:
+        "Creation time parsed from `time_created`, None if it is malformed"
+        try:
+            return parse_date(self.time_created)
+        except (TypeError, ValueError):
+            return None
+
+
+@dataclasses.dataclass
+class PositionSync:
+    """GUIDs changed by a `PositionStore.sync`"""
+    added: list[str] = dataclasses.field(default_factory=list)
+    changed: list[str] = dataclasses.field(default_factory=list)
+    removed: list[str] = dataclasses.field(default_factory=list)
+
+
+class PositionStore(Mapping[str, MotorPositionSetting]):
+    """
+    Saved motor positions, a mapping from GUID to `MotorPositionSetting`
+
+    Indexed by name, folder and creation time. `sync` merges a new
+    ``/Positions`` payload into the store and only parses the settings
+    which were added or changed. Settings with a malformed creation time
+    are kept, but left out of the creation time index.
+    """
+
+    def __init__(self, data: Iterable[dict[str, Any]] = ()) -> None:
+        self._by_guid: dict[str, MotorPositionSetting] = {}
+        self._raw: dict[str, dict[str, Any]] = {}
+        self._by_name: dict[str, dict[str, None]] = {}
+        self._by_folder: dict[str, dict[str, None]] = {}
+        self._created: list[tuple[datetime.datetime, str]] = []
+        self.sync(data)
+
+    def __getitem__(self, guid: str) -> MotorPositionSetting:
+        return self._by_guid[guid]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._by_guid)
+
+    def __len__(self) -> int:
+        return len(self._by_guid)
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({list(self._by_guid.values())!r})"
+
+    def _add(self, raw: dict[str, Any]) -> None:
+        setting = MotorPositionSetting.from_dict(raw)
+        guid = setting.GUID
+        self._by_guid[guid] = setting
+        self._raw[guid] = raw
+        self._by_name.setdefault(setting.name, {})[guid] = None
+        self._by_folder.setdefault(setting.folder, {})[guid] = None
+        created = setting.created
+        if created is None:
+            logger.warning("Saved position %s has an invalid creation time %r",
+                           guid, setting.time_created)
+        else:
+            bisect.insort(self._created, (created, guid))
+
+    def _remove(self, guid: str) -> None:
+        setting = self._by_guid.pop(guid)
+        del self._raw[guid]
+        for index, key in ((self._by_name, setting.name),
+                           (self._by_folder, setting.folder)):
+            del index[key][guid]
+            if not index[key]:
+                del index[key]
+        created = setting.created
+        if created is not None:
+            del self._created[bisect.bisect_left(self._created, (created, guid))]
+
+    def sync(self, data: Iterable[dict[str, Any]]) -> PositionSync:
+        "Merge a ``/Positions`` payload into the store"
+        result = PositionSync()
+        seen = set()
+        for raw in data:
+            guid = raw["GUID"]
+            seen.add(guid)
+            old = self._raw.get(guid)
+            if old is None:
+                self._add(raw)
+                result.added.append(guid)
+            elif old != raw:
+                self._remove(guid)
+                self._add(raw)
+                result.changed.append(guid)
+        result.removed = [guid for guid in self._by_guid if guid not in seen]
+        for guid in result.removed:
+            self._remove(guid)
+        return result
+
+    def find_by_name(self, name: str) -> list[MotorPositionSetting]:
+        "All settings called `name`, in the order they were added"
+        return [self._by_guid[g] for g in self._by_name.get(name, ())]
+
+    def find_by_folder(self, folder: str) -> list[MotorPositionSetting]:
+        "All settings in `folder`, in the order they were added"
+        return [self._by_guid[g] for g in self._by_folder.get(folder, ())]
+
+    def names(self) -> list[str]:
+        return list(self._by_name)
+
+    def folders(self) -> list[str]:
+        return list(self._by_folder)
+
+    def created_between(
+        self,
+        start: datetime.datetime | None = None,
+        end: datetime.datetime | None = None,
+    ) -> list[MotorPositionSetting]:
+        """Settings created in ``[start, end)``, sorted by creation time,
+        without those with a malformed creation time"""
+        lo = 0 if start is None else bisect.bisect_left(self._created, (start,))
+        hi = len(self._created) if end is None else bisect.bisect_left(self._created, (end,))
+        return [self._by_guid[g] for _, g in self._created[lo:hi]]
+
 
 @dataclasses.dataclass(kw_only=True)
 class TopasConnection:
-    """Connection to the Topas OPA, handles all requests to the API"""
+    """Connection to the Topas OPA, handles all requests to the API
+
+    All requests go through a single pooled ``requests.Session``, so the
+    TCP connections to the PublicAPI are kept alive between calls.
+
+    Attributes
+    ----------
+    baseAddress : str
+        Base url of the PublicAPI
+    timeout : float
+        Default timeout of a request in seconds
+    endpoint_timeouts : dict[str, float]
+        Timeouts overriding `timeout` for single endpoints, keyed by the
+        endpoint path without the query string, e.g. ``"/Positions"``
+    pool_size : int
+        Maximal number of kept-alive connections
+    max_retries : int
+        Number of retries for failed connects and idempotent requests
+    stats : ConnectionStats | None
+        Per-endpoint request statistics, not collected if None
+    cache : ResponseCache | None
+        Cache of GET responses invalidated by writes, no caching if None
+    session : requests.Session | None
+        Session shared with other connections, e.g. by a `TopasPool`, a new
+        one from `make_session` if None. A shared session is not closed.
+    executor : ThreadPoolExecutor | None
+        Executor of `get_many` and `put_many` shared with other connections,
+        created on first use if None. A shared executor is not shut down.
+    """
     baseAddress: str
     timeout: float = 1.0
+    endpoint_timeouts: dict[str, float] = dataclasses.field(default_factory=dict)
+    pool_size: int = 4
+    max_retries: int = 2
+    stats: ConnectionStats | None = None
+    cache: ResponseCache | None = None
+    session: requests.Session | None = dataclasses.field(default=None, repr=False)
+    executor: ThreadPoolExecutor | None = dataclasses.field(default=None, repr=False)
+    _owns_session: bool = dataclasses.field(init=False, repr=False, default=False)
+    _owns_executor: bool = dataclasses.field(init=False, repr=False, default=False)
+
+    def __post_init__(self) -> None:
+        if self.session is None:
+            self.session = make_session(self.pool_size, self.max_retries)
+            self._owns_session = True
 
     @classmethod
     def from_info(
@@ -66,24 +404,241 @@ class TopasConnection:
         port: str = "8000",
         serial_number: str = "14187",
         version="v0",
+        **kwargs: Any,
     ) -> TopasConnection:
         url = f"http://{ip_address}:{port}/{serial_number}/{version}/PublicAPI"
-        return cls(baseAddress=url)
+        return cls(baseAddress=url, **kwargs)
+
+    def timeout_for(self, url: str) -> float:
+        "Get the timeout used for requests to `url`"
+        return self.endpoint_timeouts.get(url.partition("?")[0], self.timeout)
+
+    def enable_stats(self) -> ConnectionStats:
+        "Start collecting request statistics"
+        if self.stats is None:
+            self.stats = ConnectionStats()
+        return self.stats
+
+    def enable_cache(self, ttls: dict[str, float] | None = None) -> ResponseCache:
+        """Start caching GET responses, `ttls` overrides the default lifetimes
+        of `topasoptim.cache.DEFAULT_TTLS`"""
+        if self.cache is None:
+            self.cache = ResponseCache()
+        if ttls:
+            self.cache.ttls.update(ttls)
+        return self.cache
+
+    def invalidate(self, *paths: str) -> None:
+        "Drop cached responses of `paths`, all if empty"
+        if self.cache is not None:
+            self.cache.invalidate(*paths)
+
+    def _request(self, method: str, url: str, **kwargs: Any) -> requests.Response:
+        stats = self.stats
+        if stats is None:
+            return self.session.request(
+                method, self.baseAddress + url, timeout=self.timeout_for(url), **kwargs
+            )
+        t0 = time.perf_counter()
+        try:
+            response = self.session.request(
+                method, self.baseAddress + url, timeout=self.timeout_for(url), **kwargs
+            )
+        except Exception:
+            stats.record(url, time.perf_counter() - t0, error=True)
+            raise
+        body = response.request.body
+        stats.record(
+            url,
+            time.perf_counter() - t0,
+            sent=len(body) if body else 0,
+            received=len(response.content),
+            error=not response.ok,
+        )
+        return response
 
     def put(self, url, data) -> requests.Response:
-        return requests.put(self.baseAddress + url, json=data, timeout=self.timeout)
+        response = self._request("PUT", url, json=data)
+        if self.cache is not None and response.ok:
+            self.cache.written(url)
+        return response
 
     def post(self, url, data) -> requests.Response:
-        return requests.post(self.baseAddress + url, json=data, timeout=self.timeout)
+        response = self._request("POST", url, json=data)
+        if self.cache is not None and response.ok:
+            self.cache.written(url)
+        return response
 
     def get(self, url) -> Any:
-        return requests.get(self.baseAddress + url, timeout=self.timeout).json()
+        "Decoded response to a GET of `url`, see `decoding.loads`"
+        cache = self.cache
+        if cache is None or not cache.cacheable(url):
+            return loads(self._request("GET", url).content)
+        hit, value = cache.lookup(url)
+        if not hit:
+            generation = cache.generation(url)
+            value = loads(self._request("GET", url).content)
+            cache.store(url, value, generation)
+        return value
+
+    def get_raw(self, url) -> bytes:
+        "Undecoded body of the response to a GET of `url`, never cached"
+        return self._request("GET", url).content
+
+    def get_motor_states(self, out: np.ndarray | None = None) -> np.ndarray:
+        """Motor positions of ``/Motors/PropertiesThatChangeOften`` as a
+        `MOTOR_DTYPE` array, `out` is reused if it has the right length"""
+        url = "/Motors/PropertiesThatChangeOften"
+        if self.cache is not None and self.cache.cacheable(url):
+            return motor_states_from_dicts(self.get(url), out)
+        return decode_motor_states(self.get_raw(url), out)
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self.executor is None:
+            self.executor = ThreadPoolExecutor(
+                max_workers=self.pool_size, thread_name_prefix="topas-put")
+            self._owns_executor = True
+        return self.executor
+
+    def get_many(self, urls: Iterable[str]) -> list[Any]:
+        """GET several urls concurrently, returns the responses in order
+
+        The first url is fetched by the calling thread, and requests still
+        queued when their result is needed run there too, so this does not
+        deadlock when called from a task of a busy shared executor."""
+        first, *rest = urls
+        futures = [self._get_executor().submit(self.get, url) for url in rest]
+        results = [self.get(first)]
+        for url, future in zip(rest, futures, strict=True):
+            results.append(self.get(url) if future.cancel() else future.result())
+        return results
+
+    def put_many(self, items: Iterable[tuple[str, Any]]) -> list[requests.Response]:
+        "Send several PUT requests concurrently, returns the responses in order"
+        futures = [self._get_executor().submit(self.put, url, data)
+                   for url, data in items]
+        return [f.result() for f in futures]
+
+    def close(self) -> None:
+        "Close all pooled connections, shared resources are left open"
+        if self.executor is not None and self._owns_executor:
+            self.executor.shutdown(wait=True)
+            self.executor = None
+        if self._owns_session:
+            self.session.close()
+
+    def __enter__(self) -> TopasConnection:
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
+
+
+def make_session(
+    pool_size: int = 4, max_retries: int = 2, num_hosts: int = 1
+) -> requests.Session:
+    """Create a keep-alive session with a connection pool of `pool_size`
+    for each of `num_hosts` hosts
+
+    Failed connects are retried up to `max_retries` times with a short
+    backoff. Read errors and 502/503/504 responses are only retried for
+    idempotent methods, so ``/SaveCurrent`` is never posted twice.
+    """
+    import requests
+    from requests.adapters import HTTPAdapter
+    from urllib3.util.retry import Retry
+
+    retry = Retry(
+        total=max_retries,
+        backoff_factor=0.05,
+        status_forcelist=(502, 503, 504),
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(
+        pool_connections=num_hosts, pool_maxsize=pool_size, max_retries=retry
+    )
+    session = requests.Session()
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+def backoff_intervals(
+    min_interval: float, max_interval: float, factor: float = 1.5
+) -> Iterator[float]:
+    "Yield poll intervals growing geometrically from `min_interval` to `max_interval`"
+    interval = min_interval
+    while True:
+        yield interval
+        interval = min(interval * factor, max_interval)
+
+
+def fetch_motor_states(connection: Any, out: np.ndarray | None = None) -> np.ndarray:
+    """Motor positions as a `MOTOR_DTYPE` array, with the
+    `TopasConnection.get_motor_states` of `connection` if it has one, else
+    projected from its decoded ``/Motors/PropertiesThatChangeOften``"""
+    get_motor_states = getattr(connection, "get_motor_states", None)
+    if get_motor_states is not None:
+        return get_motor_states(out)
+    return motor_states_from_dicts(connection.get("/Motors/PropertiesThatChangeOften"), out)
+
+
+def settle_timeout_error(names: Collection[str], timeout: float) -> TimeoutError:
+    msg = f"Motors {sorted(names)} did not settle within {timeout} s"
+    return TimeoutError(msg)
+
+
+@dataclasses.dataclass(frozen=True)
+class Request:
+    """
+    I/O step of an `Operation`
+
+    Attributes
+    ----------
+    kind : str
+        ``"get"``, ``"put"``, ``"post"`` or ``"put_many"`` call the method of
+        the connection with `args`, ``"get_many"`` gets all urls in `args`
+        concurrently, ``"get_motor_states"`` fetches the motor positions into
+        the array ``args[0]`` as `fetch_motor_states`, ``"sleep"`` waits
+        ``args[0]`` seconds
+    args : tuple
+        Arguments of the step
+    """
+    kind: str
+    args: tuple[Any, ...] = ()
+
+
+Operation = Generator[Request, Any, T]
+"""Generator yielding the `Request` steps of an operation on the OPA and
+receiving their results, returns the result of the operation"""
+
+
+def run_operation(operation: Operation[T], execute: Callable[[Request], Any]) -> T:
+    """Run `operation`, executing its steps with `execute`
+
+    Errors raised by `execute` are thrown into the operation."""
+    result: Any = None
+    error: Exception | None = None
+    while True:
+        try:
+            request = operation.send(result) if error is None else operation.throw(error)
+        except StopIteration as stop:
+            return stop.value
+        try:
+            result, error = execute(request), None
+        except Exception as err:
+            result, error = None, err
 
 
 @dataclasses.dataclass
-class Topas:
+class TopasState:
     """
-    OPA Model
+    Motor and position state of an OPA and the operations on it, shared by
+    `Topas` and `AsyncTopas`
+
+    The operations are generators yielding their I/O as `Request` steps, so
+    the logic is written once and the blocking and the asyncio model only
+    differ in how they execute the steps.
 
     Attributes
     ----------
@@ -91,95 +646,433 @@ class Topas:
         Dictionary of motors
     index_to_motor : dict[int, TopasMotor]
         Dictionary of motor indices to motors
-    connection : TopasConnection
-        Connection to the OPA
-    positions : dict[str, MotorPositionSetting]
+    positions : PositionStore
+        Saved positions by GUID
+    table : MotorTable
+        Positions of all motors as one array, the motors are views into it
+    parameter_names : list[str]
+        Motors optimized, in the order of the optimizer parameters
+    recorder : SessionRecorder | None
+        Records motor snapshots and moves, see `start_recording`
+    initialized : bool
+        True once the motors and the saved positions are loaded
     """
 
     motors: dict[str, TopasMotor] = dataclasses.field(default_factory=dict)
     index_to_motor: dict[int, TopasMotor] = dataclasses.field(
         default_factory=dict)
+    positions: PositionStore = dataclasses.field(default_factory=PositionStore)
+    table: MotorTable = dataclasses.field(
+        init=False, repr=False, compare=False,
+        default_factory=lambda: MotorTable([]))
+    parameter_names: list[str] = dataclasses.field(
+        init=False, repr=False, compare=False, default_factory=list)
+    recorder: SessionRecorder | None = dataclasses.field(
+        init=False, default=None, repr=False, compare=False)
+    initialized: bool = dataclasses.field(
+        init=False, default=False, repr=False, compare=False)
+    _states_buf: np.ndarray | None = dataclasses.field(
+        init=False, default=None, repr=False, compare=False)
+
+    def _set_motors(self, data: list[dict[str, Any]]) -> None:
+        self.motors = {motor["Title"]
+            : TopasMotor.from_dict(motor) for motor in data}
+        self.index_to_motor = {
+            motor.index: motor for motor in self.motors.values()}
+        self.table = MotorTable(self.motors.values())
+        if self.parameter_names:
+            TopasState.set_parameter_order(self, self.parameter_names)
+
+    def set_parameter_order(self, names: Iterable[str]) -> None:
+        """Set the motors optimized and their order in the parameter vector
+
+        Afterwards `params` is a zero-copy view of their actual positions.
+        """
+        self.parameter_names = list(names)
+        self.table.reorder(self.parameter_names)
+
+    @property
+    def params(self) -> np.ndarray:
+        """Actual positions of the `parameter_names` motors, as a read-only
+        view of the motor table. Updates with every poll of the positions."""
+        view = self.table.data["actual_position"][: len(self.parameter_names)]
+        view.flags.writeable = False
+        return view
+
+    @property
+    def target_params(self) -> np.ndarray:
+        "Target positions of the `parameter_names` motors, see `params`"
+        view = self.table.data["target_position"][: len(self.parameter_names)]
+        view.flags.writeable = False
+        return view
+
+    def _set_positions(self, data: list[dict[str, Any]]) -> None:
+        self.positions.sync(data)
+
+    def _actual_positions(self) -> dict[str, int]:
+        return dict(zip(self.table.names, self.table.data["actual_position"].tolist(),
+                        strict=True))
+
+    def _target_positions(self) -> dict[str, int]:
+        return dict(zip(self.table.names, self.table.data["target_position"].tolist(),
+                        strict=True))
+
+    def _find_position(self, name: str) -> MotorPositionSetting:
+        matches = self.positions.find_by_name(name)
+        if not matches:
+            msg = f"No saved position called {name!r}"
+            raise KeyError(msg)
+        return matches[0]
+
+    def _target_requests(self, positions: dict[str, int]) -> list[tuple[str, int]]:
+        return [(f"/TargetPosition?id={self.motors[name].index}", int(position))
+                for name, position in positions.items()]
+
+    def _settled(self, names: Iterable[str]) -> bool:
+        rows = self.table.rows(names)
+        data = self.table.data
+        return bool(np.array_equal(
+            data["actual_position"][rows], data["target_position"][rows]))
+
+    def _wake_poller(self) -> None:
+        pass
+
+    def start_recording(self, path: str | os.PathLike[str], **kwargs: Any) -> SessionRecorder:
+        """Record every motor snapshot and move to the directory `path`
+
+        The keyword arguments are passed to `SessionRecorder`. Record the
+        spectra with the same recorder to keep them in one session."""
+        if self.recorder is None:
+            self.recorder = SessionRecorder(path, **kwargs)
+        return self.recorder
+
+    def stop_recording(self) -> None:
+        "Stop recording and close the session files"
+        if self.recorder is not None:
+            self.recorder.close()
+            self.recorder = None
+
+    def _initialize_op(self) -> Operation[None]:
+        motors, positions = yield Request(
+            "get_many", ("/Motors/AllProperties", "/Positions"))
+        self._set_motors(motors["Motors"])
+        self._set_positions(positions)
+        self.initialized = True
+
+    def _update_motors_op(self) -> Operation[None]:
+        self._set_motors((yield Request("get", ("/Motors/AllProperties",)))["Motors"])
+
+    def _update_motor_positions_op(self) -> Operation[None]:
+        self._states_buf = yield Request("get_motor_states", (self._states_buf,))
+        self.table.update_states(self._states_buf)
+        if self.recorder is not None:
+            self.recorder.record_motors(self.table)
+
+    def _get_op(self, url: str) -> Operation[Any]:
+        return (yield Request("get", (url,)))
+
+    def _toggle_shutter_op(self, shutter_open: bool) -> Operation[None]:
+        yield Request("put", ("/ShutterInterlock/OpenCloseShutter", shutter_open))
+
+    def _move_motor_op(self, name: str, position: int) -> Operation[None]:
+        motor_index = self.motors[name].index
+        yield Request("put", (f"/TargetPosition?id={motor_index}", int(position)))
+        if self.recorder is not None:
+            self.recorder.record_moves({motor_index: int(position)})
+        self._wake_poller()
+
+    def _move_motors_op(
+        self,
+        positions: dict[str, int],
+        wait: bool,
+        timeout: float,
+        min_interval: float,
+        max_interval: float,
+    ) -> Operation[float | None]:
+        t0 = time.perf_counter()
+        yield Request("put_many", (self._target_requests(positions),))
+        if self.recorder is not None:
+            self.recorder.record_moves(
+                {self.motors[name].index: int(p) for name, p in positions.items()})
+        self._wake_poller()
+        if not wait:
+            return None
+        yield from self._wait_for_motors_op(positions, timeout, min_interval, max_interval)
+        return time.perf_counter() - t0
+
+    def _wait_for_motors_op(
+        self,
+        names: Collection[str],
+        timeout: float,
+        min_interval: float,
+        max_interval: float,
+    ) -> Operation[float]:
+        t0 = time.perf_counter()
+        intervals = backoff_intervals(min_interval, max_interval)
+        while True:
+            yield from self._update_motor_positions_op()
+            elapsed = time.perf_counter() - t0
+            if self._settled(names):
+                return elapsed
+            if elapsed > timeout:
+                raise settle_timeout_error(names, timeout)
+            yield Request("sleep", (next(intervals),))
+
+    def _save_positions_op(self, name: str, folder: str) -> Operation[str]:
+        gui_id = yield Request("post", ("/SaveCurrent", {"Name": name, "Folder": folder}))
+        yield from self._load_positions_op()
+        return gui_id.json()
+
+    def _load_positions_op(self) -> Operation[None]:
+        self._set_positions((yield Request("get", ("/Positions",))))
+
+    def _goto_position_by_id_op(self, guid: str) -> Operation[None]:
+        yield Request("put", ("/MoveMotorsToPosition", guid))
+        if self.recorder is not None:
+            self.recorder.record_event("goto_position", guid=guid)
+        self._wake_poller()
+
+
+@dataclasses.dataclass
+class Topas(TopasState):
+    """
+    OPA Model
+
+    The motors and the saved positions are loaded concurrently when the
+    model is created. With `lazy` they are loaded by the first method
+    needing them, or in the background after `preload`, so the model can
+    be created while the OPA is still unreachable. The `motors`,
+    `positions` and `table` attributes are empty until then, call
+    `ensure_initialized` before using them directly.
+
+    Attributes
+    ----------
+    motors : dict[str, TopasMotor]
+        Dictionary of motors
+    index_to_motor : dict[int, TopasMotor]
+        Dictionary of motor indices to motors
+    connection : TopasConnection
+        Connection to the OPA
+    positions : PositionStore
+        Saved positions by GUID
+    lazy : bool
+        Defer loading the motors and positions until they are needed
+    poller : MotorPoller | None
+        Background poller, see `start_polling`
+    recorder : SessionRecorder | None
+        Records motor snapshots and moves, see `start_recording`
+    """
+
     connection: TopasConnection = dataclasses.field(
         default_factory=TopasConnection.from_info
     )
-    positions: dict[str, MotorPositionSetting] = dataclasses.field(
-        default_factory=dict)
+    lazy: bool = dataclasses.field(default=False, repr=False, compare=False)
+    poller: MotorPoller | None = dataclasses.field(
+        init=False, default=None, repr=False, compare=False)
+    _init_lock: threading.Lock = dataclasses.field(
+        init=False, repr=False, compare=False, default_factory=threading.Lock)
+    _preload: Future[None] | None = dataclasses.field(
+        init=False, default=None, repr=False, compare=False)
 
     def __post_init__(self) -> None:
-        self.update_motors()
-        self.index_to_motor = {
-            motor.index: motor for motor in self.motors.values()}
-        self.load_positions()
+        if not self.lazy:
+            self.initialize()
+
+    def _execute(self, request: Request) -> Any:
+        kind, args = request.kind, request.args
+        if kind == "sleep":
+            time.sleep(args[0])
+            return None
+        if kind == "get_many":
+            if hasattr(self.connection, kind):
+                return self.connection.get_many(args)
+            first, *rest = args
+            with ThreadPoolExecutor(max(len(rest), 1), thread_name_prefix="topas-get") as ex:
+                futures = [ex.submit(self.connection.get, url) for url in rest]
+                return [self.connection.get(first), *(f.result() for f in futures)]
+        if kind == "get_motor_states":
+            return fetch_motor_states(self.connection, *args)
+        return getattr(self.connection, kind)(*args)
+
+    def _run(self, operation: Operation[T], initialize: bool = True) -> T:
+        if initialize:
+            self.ensure_initialized()
+        return run_operation(operation, self._execute)
+
+    def initialize(self) -> None:
+        "Load the motors and the saved positions concurrently"
+        self._run(self._initialize_op(), initialize=False)
+
+    def ensure_initialized(self) -> None:
+        "Initialize the model unless done, waits for a running `preload`"
+        if self.initialized:
+            return
+        with self._init_lock:
+            if not self.initialized:
+                self.initialize()
+
+    def preload(self) -> Future[None]:
+        """Initialize the model in a background thread
+
+        Methods called meanwhile wait for it. If loading fails, the error is
+        set on the returned future and the next method call tries again.
+        Runs on the executor of the connection if it has one, and returns the
+        pending future if a preload is already running."""
+        future = self._preload
+        if future is not None and not future.done():
+            return future
+        executor = getattr(self.connection, "executor", None)
+        if executor is not None:
+            future = executor.submit(self.ensure_initialized)
+        else:
+            executor = ThreadPoolExecutor(1, thread_name_prefix="topas-init")
+            future = executor.submit(self.ensure_initialized)
+            # the worker thread exits once the task is done
+            executor.shutdown(wait=False)
+        self._preload = future
+        return future
+
+    def set_parameter_order(self, names: Iterable[str]) -> None:
+        self.ensure_initialized()
+        super().set_parameter_order(names)
+
+    def start_polling(
+        self, fast_interval: float = 0.02, slow_interval: float = 0.5
+    ) -> MotorPoller:
+        """Poll the motor positions in a background thread
+
+        While the poller runs, `get_actual_positions`, `get_target_positions`
+        and `snapshot` return the latest polled state without a request."""
+        self.ensure_initialized()
+        if self.poller is None:
+            self.poller = MotorPoller(self, fast_interval, slow_interval)
+        return self.poller.start()
+
+    def stop_polling(self) -> None:
+        "Stop the background poller"
+        if self.poller is not None:
+            self.poller.stop()
+            self.poller = None
+
+    def snapshot(self) -> MotorSnapshot:
+        "Current motor state, from the poller if it runs, else freshly requested"
+        if self.poller is not None and self.poller.running:
+            return self.poller.snapshot()
+        self.update_motor_positions()
+        return MotorSnapshot.from_topas(self)
 
     def update_motors(self) -> None:
         "Update the motor information"
-        data = self.connection.get("/Motors/AllProperties")["Motors"]
-        self.motors = {motor["Title"]
-            : TopasMotor.from_dict(motor) for motor in data}
+        self._run(self._update_motors_op())
 
     def get_actual_positions(self) -> dict[str, int]:
         "Get the actual positions of the motors"
-        self.update_motor_positions()
-        return {name: motor.actual_position for name, motor in self.motors.items()}
+        return dict(self.snapshot().actual_positions)
 
     def get_target_positions(self) -> dict[str, int]:
         "Get the target positions of the motors"
-        self.update_motor_positions()
-        return {name: motor.target_position for name, motor in self.motors.items()}
+        return dict(self.snapshot().target_positions)
 
     def is_open(self) -> bool:
         "Get the status of the shutter"
-        return self.connection.get("/ShutterInterlock/IsShutterOpen")
+        return self._run(self._get_op("/ShutterInterlock/IsShutterOpen"), initialize=False)
 
     def toggle_shutter(self, shutter_open: bool) -> None:
         "Toggle the shutter"
-        self.connection.put("/ShutterInterlock/OpenCloseShutter", shutter_open)
+        self._run(self._toggle_shutter_op(shutter_open), initialize=False)
 
     def get_authentication_status(self) -> bool:
         "Get the authentication status of the caller"
-        return self.connection.get("/CallerHasAccess")
+        return self._run(self._get_op("/CallerHasAccess"), initialize=False)
 
     def update_motor_positions(self) -> None:
-        "Get the motor positions"
-        props = self.connection.get("/Motors/PropertiesThatChangeOften")
-        for m in props:
-            motor = self.index_to_motor[m["Index"]]
-            motor.actual_position = m["ActualPosition"]
-            motor.target_position = m["TargetPosition"]
-            motor.target_position_in_units = m["TargetPositionInUnits"]
-            motor.actual_position_in_units = m["ActualPositionInUnits"]
+        "Get the motor positions, serialized with the polls of a running poller"
+        if self.poller is None:
+            self._run(self._update_motor_positions_op())
+            return
+        with self.poller.poll_lock:
+            self._run(self._update_motor_positions_op())
+
+    def _wait_for_motors_op(
+        self,
+        names: Collection[str],
+        timeout: float,
+        min_interval: float,
+        max_interval: float,
+    ) -> Operation[float]:
+        poller = self.poller
+        if poller is None or not poller.running:
+            return (yield from super()._wait_for_motors_op(
+                names, timeout, min_interval, max_interval))
+        t0 = time.perf_counter()
+        settled = poller.wait(lambda snapshot: snapshot.settled(names), time.time(), timeout)
+        if settled is None:
+            remaining = timeout - (time.perf_counter() - t0)
+            if poller.running or remaining <= 0:
+                raise settle_timeout_error(names, timeout)
+            # the poller was stopped while waiting
+            yield from super()._wait_for_motors_op(
+                names, remaining, min_interval, max_interval)
+        return time.perf_counter() - t0
 
     def move_motor(self, name: str, position: int) -> None:
         "Move a motor to a position"
-        motor_index = self.motors[name].index
-        self.connection.put(f"/TargetPosition?id={motor_index}", int(position))
+        self._run(self._move_motor_op(name, position))
+
+    def move_motors(
+        self,
+        positions: dict[str, int],
+        wait: bool = False,
+        timeout: float = 10.0,
+        min_interval: float = 0.005,
+        max_interval: float = 0.1,
+    ) -> float | None:
+        """Move multiple motors to positions
 
-    def move_motors(self, positions: dict[str, int]) -> None:
-        "Move multiple motors to positions"
-        for name, position in positions.items():
-            self.move_motor(name, position)
+        The target positions are sent concurrently. If `wait` is true, block
+        until all moved motors reached their target and return the settle
+        time in seconds, measured from sending the targets. See
+        `wait_for_motors` for the other arguments.
+        """
+        return self._run(self._move_motors_op(
+            positions, wait, timeout, min_interval, max_interval))
+
+    def wait_for_motors(
+        self,
+        names: Collection[str],
+        timeout: float = 10.0,
+        min_interval: float = 0.005,
+        max_interval: float = 0.1,
+    ) -> float:
+        """Wait until the actual position of all motors in `names` equals their
+        target position, returns the waiting time in seconds
+
+        The motor positions are polled with an interval growing from
+        `min_interval` to `max_interval`, or taken from the snapshots of the
+        poller while it runs. Raises `TimeoutError` if the motors did not
+        settle within `timeout` seconds.
+        """
+        return self._run(self._wait_for_motors_op(
+            names, timeout, min_interval, max_interval))
 
     def save_positions(self, name: str, folder: str) -> str:
         "Save the current motor positions"
-        gui_id = self.connection.post(
-            "/SaveCurrent", {"Name": name, "Folder": folder})
-        self.load_positions()
-        return gui_id.json()
+        return self._run(self._save_positions_op(name, folder))
 
     def load_positions(self) -> None:
         "Load all saved motor positions"
-        data = self.connection.get("/Positions")
-        self.positions = {
-            m["GUID"]: MotorPositionSetting.from_dict(m) for m in data}
+        self._run(self._load_positions_op())
 
     def goto_position_by_name(self, name: str) -> None:
         """Move the motors to a saved position called `name`
         If there are multiple positions with the same name, the first one is used"""
-        first_match: MotorPositionSetting = next(
-            v for k, v in self.positions.items() if v.name == name
-        )
-        self.goto_position_by_id(first_match.GUID)
+        self.ensure_initialized()
+        self.goto_position_by_id(self._find_position(name).GUID)
 
     def goto_position_by_id(self, guid: str) -> None:
         """Move the motors to a saved position with a given GUID"""
-        self.connection.put("/MoveMotorsToPosition", guid)
+        self._run(self._goto_position_by_id_op(guid), initialize=False)
+
+    def _wake_poller(self) -> None:
+        if self.poller is not None:
+            self.poller.wake()
@@ -2,11 +2,88 @@
 Copyright (c) 2023 Till Stensitzki. All rights reserved.
 
 TopasOptim: Automatic Optimazition of a light conversion OPA.
+
+The submodules and the classes listed in ``__all__`` are imported on first
+access, so ``import topasoptim`` does not load numpy, requests or any GUI
+library.
 """
 
 
 from __future__ import annotations
 
+import importlib
+from typing import TYPE_CHECKING, Any
+
 from ._version import version as __version__
 
-__all__ = ["__version__"]
+if TYPE_CHECKING:
+    from .AsyncTopasModel import AsyncTopas, AsyncTopasConnection
+    from .evaluation import MemoizedObjective
+    from .history import OptimizerHistory
+    from .pool import TopasPool
+    from .recording import RecordedSession, SessionRecorder
+    from .scan import Scan, ScanAxis
+    from .scheduling import TravelScheduler
+    from .simulator import TopasSimulator
+    from .TopasModel import MotorTable, Topas, TopasConnection, TopasMotor
+
+_LAZY_ATTRS = {
+    "Topas": "TopasModel",
+    "TopasConnection": "TopasModel",
+    "TopasMotor": "TopasModel",
+    "MotorTable": "TopasModel",
+    "AsyncTopas": "AsyncTopasModel",
+    "AsyncTopasConnection": "AsyncTopasModel",
+    "TopasPool": "pool",
+    "TopasSimulator": "simulator",
+    "SessionRecorder": "recording",
+    "RecordedSession": "recording",
+    "Scan": "scan",
+    "ScanAxis": "scan",
+    "TravelScheduler": "scheduling",
+    "MemoizedObjective": "evaluation",
+    "OptimizerHistory": "history",
+}
+
+_SUBMODULES = {
+    "AsyncTopasModel", "OptimizerModel", "TopasModel", "acquisition", "cache",
+    "decimation", "decoding", "evaluation", "history", "instrumentation", "metrics",
+    "optimizers", "poller", "pool", "recording", "replay", "scan",
+    "scheduling", "simulator", "spectrum_ring",
+}
+
+__all__ = [
+    "AsyncTopas",
+    "AsyncTopasConnection",
+    "MemoizedObjective",
+    "MotorTable",
+    "OptimizerHistory",
+    "RecordedSession",
+    "Scan",
+    "ScanAxis",
+    "SessionRecorder",
+    "Topas",
+    "TopasConnection",
+    "TopasMotor",
+    "TopasPool",
+    "TopasSimulator",
+    "TravelScheduler",
+    "__version__",
+]
+
+
+def __getattr__(name: str) -> Any:
+    if name in _LAZY_ATTRS:
+        module = importlib.import_module(f".{_LAZY_ATTRS[name]}", __name__)
+        value = getattr(module, name)
+    elif name in _SUBMODULES:
+        value = importlib.import_module(f".{name}", __name__)
+    else:
+        msg = f"module {__name__!r} has no attribute {name!r}"
+        raise AttributeError(msg)
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> list[str]:
+    return sorted({*globals(), *__all__, *_SUBMODULES})
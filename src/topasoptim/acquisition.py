@@ -0,0 +1,158 @@
+from __future__ import annotations
+
+import contextlib
+import dataclasses
+import logging
+import threading
+import time
+from collections.abc import Callable, Iterator
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+AcquireFunc = Callable[[np.ndarray, np.ndarray], None]
+
+
+@dataclasses.dataclass(eq=False)
+class Frame:
+    """One of the two preallocated buffers of an `AcquisitionEngine`
+
+    Attributes
+    ----------
+    x, y : np.ndarray
+        Abscissa and values of the spectrum
+    index : int
+        Number of the acquisition, -1 before the buffer is first filled
+    timestamp : float
+        `time.time` at the end of the acquisition
+    """
+    x: np.ndarray
+    y: np.ndarray
+    index: int = -1
+    timestamp: float = float("nan")
+    _lock: threading.Lock = dataclasses.field(
+        default_factory=threading.Lock, repr=False)
+
+
+@dataclasses.dataclass
+class AcquisitionEngine:
+    """Acquires spectra at a controlled rate in a background thread
+
+    ``acquire(x, y)`` fills the back buffer in place. Afterwards the buffers
+    are swapped by replacing a single reference, so readers always see a
+    complete frame. A frame is never written while it is read with `read`,
+    readers therefore do not need to copy it.
+
+    The next acquisition starts `period` seconds after the last one started.
+    If an acquisition takes longer, the deadline is missed and counted as an
+    overrun. A frame replaced before anyone read it is counted as dropped.
+
+    Attributes
+    ----------
+    acquire : Callable[[np.ndarray, np.ndarray], None]
+        Fills the given ``x`` and ``y`` arrays with a new spectrum
+    size : int
+        Number of points of a spectrum
+    period : float | Callable[[], float]
+        Seconds between the starts of two acquisitions, a callable is asked
+        before every acquisition, e.g. to follow the integration time
+    on_frame : Callable[[Frame], None] | None
+        Called from the acquisition thread with every new frame, e.g. to
+        record it with `SessionRecorder.record_spectrum`. The frame is
+        reused and must not be kept.
+    clock : Callable[[], float]
+        Monotonic clock in seconds the acquisitions are scheduled with
+    """
+    acquire: AcquireFunc
+    size: int
+    period: float | Callable[[], float] = 1 / 30
+    on_frame: Callable[[Frame], None] | None = None
+    clock: Callable[[], float] = time.perf_counter
+    frames: int = dataclasses.field(init=False, default=0)
+    drops: int = dataclasses.field(init=False, default=0)
+    overruns: int = dataclasses.field(init=False, default=0)
+    _front: Frame = dataclasses.field(init=False)
+    _back: Frame = dataclasses.field(init=False)
+    _read: bool = dataclasses.field(init=False, default=True)
+    _stop: threading.Event = dataclasses.field(init=False, default_factory=threading.Event)
+    _thread: threading.Thread | None = dataclasses.field(init=False, default=None)
+
+    def __post_init__(self) -> None:
+        self._front = Frame(np.zeros(self.size), np.zeros(self.size))
+        self._back = Frame(np.zeros(self.size), np.zeros(self.size))
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    @property
+    def frame(self) -> Frame:
+        "The latest complete frame, use `read` to keep it from being rewritten"
+        return self._front
+
+    def current_period(self) -> float:
+        return self.period() if callable(self.period) else self.period
+
+    @contextlib.contextmanager
+    def read(self) -> Iterator[Frame]:
+        "Lock the latest frame for reading, without copying it"
+        frame = self._front
+        with frame._lock:
+            self._read = True
+            yield frame
+
+    def acquire_once(self) -> Frame:
+        "Fill the back buffer and swap it to the front"
+        back = self._back
+        with back._lock:
+            self.acquire(back.x, back.y)
+            back.index = self.frames
+            back.timestamp = time.time()
+        if not self._read:
+            self.drops += 1
+        self._read = False
+        self._back, self._front = self._front, back
+        self.frames += 1
+        if self.on_frame is not None:
+            with back._lock:
+                self.on_frame(back)
+        return back
+
+    def start(self) -> AcquisitionEngine:
+        "Start the acquisition thread"
+        if self.running:
+            return self
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._run, name="acquisition", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        "Stop the acquisition thread after the running acquisition"
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self) -> None:
+        deadline = self.clock()
+        while not self._stop.is_set():
+            try:
+                self.acquire_once()
+            except Exception:
+                logger.exception("Acquisition failed")
+            deadline += self.current_period()
+            now = self.clock()
+            if now > deadline:
+                self.overruns += 1
+                deadline = now
+            else:
+                self._stop.wait(deadline - now)
+
+    def __enter__(self) -> AcquisitionEngine:
+        return self.start()
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.stop()
@@ -0,0 +1,127 @@
+from __future__ import annotations
+
+import dataclasses
+import threading
+import time
+from collections.abc import Callable, Iterable
+from typing import Any
+
+DEFAULT_TTLS: dict[str, float] = {
+    "/Motors/AllProperties": 60.0,
+    "/Positions": 60.0,
+    "/CallerHasAccess": 10.0,
+}
+"Seconds a response stays cached, endpoints not listed are never cached"
+
+_FAST_STATE = ("/Motors/PropertiesThatChangeOften", "/Motors/AllProperties")
+"Endpoints including the motor positions, ``AllProperties`` holds them too"
+
+DEFAULT_INVALIDATIONS: dict[str, tuple[str, ...]] = {
+    "/SaveCurrent": ("/Positions",),
+    "/TargetPosition": _FAST_STATE,
+    "/Motors/TargetPosition": _FAST_STATE,
+    "/MoveMotorsToPosition": _FAST_STATE,
+    "/ShutterInterlock/OpenCloseShutter": ("/ShutterInterlock/IsShutterOpen",),
+}
+"Cached endpoints invalidated by a successful write to an endpoint"
+
+
+def _path(url: str) -> str:
+    return url.partition("?")[0]
+
+
+@dataclasses.dataclass
+class ResponseCache:
+    """
+    Cache of decoded GET responses with per-endpoint lifetimes
+
+    Cached values are shared between callers and must not be mutated.
+    Every invalidation advances the `generation` of the endpoints, a GET
+    started before passes the generation it saw to `store`, so its possibly
+    stale response is not cached.
+
+    Attributes
+    ----------
+    ttls : dict[str, float]
+        Lifetime of the cached responses in seconds per endpoint path
+    invalidations : dict[str, tuple[str, ...]]
+        Endpoints invalidated by a PUT or POST to an endpoint
+    hits, misses : dict[str, int]
+        Cache hits and misses of each cached endpoint
+    """
+    ttls: dict[str, float] = dataclasses.field(
+        default_factory=lambda: dict(DEFAULT_TTLS))
+    invalidations: dict[str, tuple[str, ...]] = dataclasses.field(
+        default_factory=lambda: dict(DEFAULT_INVALIDATIONS))
+    clock: Callable[[], float] = time.monotonic
+    hits: dict[str, int] = dataclasses.field(init=False, default_factory=dict)
+    misses: dict[str, int] = dataclasses.field(init=False, default_factory=dict)
+    _entries: dict[str, tuple[float, Any]] = dataclasses.field(
+        init=False, default_factory=dict, repr=False)
+    _generations: dict[str, int] = dataclasses.field(
+        init=False, default_factory=dict, repr=False)
+    _cleared: int = dataclasses.field(init=False, default=0, repr=False)
+    _lock: threading.Lock = dataclasses.field(
+        init=False, default_factory=threading.Lock, repr=False)
+
+    def cacheable(self, url: str) -> bool:
+        return self.ttls.get(_path(url), 0.0) > 0.0
+
+    def lookup(self, url: str) -> tuple[bool, Any]:
+        "Returns ``(True, value)`` for a valid cached response, else ``(False, None)``"
+        path = _path(url)
+        with self._lock:
+            entry = self._entries.get(url)
+            if entry is not None and entry[0] > self.clock():
+                self.hits[path] = self.hits.get(path, 0) + 1
+                return True, entry[1]
+            self.misses[path] = self.misses.get(path, 0) + 1
+            return False, None
+
+    def _generation(self, path: str) -> int:
+        return self._cleared + self._generations.get(path, 0)
+
+    def generation(self, url: str) -> int:
+        "Counter advanced by every invalidation of the endpoint of `url`"
+        with self._lock:
+            return self._generation(_path(url))
+
+    def store(self, url: str, value: Any, generation: int | None = None) -> None:
+        """Cache `value` as the response to `url`, unless the endpoint was
+        invalidated since `generation` was taken"""
+        path = _path(url)
+        ttl = self.ttls.get(path, 0.0)
+        if ttl > 0.0:
+            with self._lock:
+                if generation is None or generation == self._generation(path):
+                    self._entries[url] = (self.clock() + ttl, value)
+
+    def invalidate(self, *paths: str) -> None:
+        "Drop the cached responses of the endpoints in `paths`, all if empty"
+        with self._lock:
+            if not paths:
+                self._entries.clear()
+                self._cleared += 1
+                return
+            for path in paths:
+                self._generations[path] = self._generations.get(path, 0) + 1
+            for url in [u for u in self._entries if _path(u) in paths]:
+                del self._entries[url]
+
+    def written(self, url: str) -> None:
+        "Invalidate the endpoints depending on a successful write to `url`"
+        paths = self.invalidations.get(_path(url))
+        if paths:
+            self.invalidate(*paths)
+
+    def reset_counters(self) -> None:
+        with self._lock:
+            self.hits.clear()
+            self.misses.clear()
+
+    def hit_rate(self, paths: Iterable[str] | None = None) -> float:
+        "Fraction of lookups answered from the cache"
+        keys = set(self.hits) | set(self.misses) if paths is None else set(paths)
+        hits = sum(self.hits.get(k, 0) for k in keys)
+        total = hits + sum(self.misses.get(k, 0) for k in keys)
+        return hits / total if total else float("nan")
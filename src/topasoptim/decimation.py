@@ -0,0 +1,211 @@
+from __future__ import annotations
+
+import math
+
+import numpy as np
+
+
+def minmax_decimate(
+    x: np.ndarray | None, y: np.ndarray, buckets: int
+) -> tuple[np.ndarray, np.ndarray]:
+    """Reduce a series to the minimum and maximum of `buckets` equal parts
+
+    Returns at most ``2 * buckets`` points in their original order, so peaks
+    survive the decimation. Series with fewer points are returned unchanged.
+    If `x` is None, the indices are used as abscissa.
+    """
+    if buckets < 1:
+        msg = f"buckets must be at least 1, got {buckets}"
+        raise ValueError(msg)
+    y = np.asarray(y)
+    n = len(y)
+    if x is None:
+        x = np.arange(n, dtype=np.float64)
+    if n <= 2 * buckets:
+        return x, y
+    size = math.ceil(n / buckets)
+    full = n // size
+    idx = _block_extrema(y[: full * size].reshape(full, size), 0, size)
+    if full * size < n:
+        tail = y[full * size:]
+        idx = np.concatenate([idx, full * size + np.unique([tail.argmin(), tail.argmax()])])
+    return x[idx], y[idx]
+
+
+def _block_extrema(blocks: np.ndarray, first: int, size: int) -> np.ndarray:
+    "Sorted indices of the minimum and maximum of each row of `blocks`"
+    base = first + size * np.arange(len(blocks))
+    lo = base + blocks.argmin(axis=1)
+    hi = base + blocks.argmax(axis=1)
+    return np.column_stack([np.minimum(lo, hi), np.maximum(lo, hi)]).ravel()
+
+
+class _Level:
+    """Index and value of the minimum and maximum of consecutive blocks
+
+    Blocks are numbered from the start of the series including dropped
+    points, `first` is the number of the oldest kept block.
+    """
+
+    def __init__(self, first: int = 0) -> None:
+        self.first = first
+        self.head = 0
+        self.n = 0
+        self.idx = np.empty((64, 2), dtype=np.int64)
+        self.val = np.empty((64, 2))
+
+    @property
+    def end(self) -> int:
+        "Number of the block after the newest one"
+        return self.first + self.n
+
+    def append(self, idx: np.ndarray, val: np.ndarray) -> None:
+        end = self.head + self.n + len(idx)
+        if end > len(self.idx):
+            if self.head:
+                live = slice(self.head, self.head + self.n)
+                self.idx[: self.n] = self.idx[live]
+                self.val[: self.n] = self.val[live]
+                end -= self.head
+                self.head = 0
+            if end > len(self.idx):
+                cap = max(end, 2 * len(self.idx))
+                self.idx = np.resize(self.idx, (cap, 2))
+                self.val = np.resize(self.val, (cap, 2))
+        self.idx[end - len(idx): end] = idx
+        self.val[end - len(idx): end] = val
+        self.n += len(idx)
+
+    def trim(self, first: int) -> None:
+        "Forget the blocks before block `first`"
+        k = min(max(first - self.first, 0), self.n)
+        self.head += k
+        self.n -= k
+        self.first = max(self.first + k, first)
+
+    def extend_from(self, lower: _Level) -> None:
+        "Add the blocks made of newly completed pairs of `lower` blocks"
+        pairs = lower.end // 2 - self.end
+        if pairs <= 0:
+            return
+        start = lower.head + 2 * self.end - lower.first
+        i = slice(start, start + 2 * pairs)
+        idx = lower.idx[i].reshape(-1, 2, 2)
+        val = lower.val[i].reshape(-1, 2, 2)
+        r = np.arange(len(idx))
+        lo = val[:, :, 0].argmin(axis=1)
+        hi = val[:, :, 1].argmax(axis=1)
+        self.append(np.column_stack([idx[r, lo, 0], idx[r, hi, 1]]),
+                    np.column_stack([val[r, lo, 0], val[r, hi, 1]]))
+
+    def indices(self, start: int, stop: int) -> np.ndarray:
+        "Sorted min/max indices of the blocks numbered ``start:stop``"
+        idx = self.idx[self.head + start - self.first: self.head + stop - self.first]
+        return np.column_stack([idx.min(axis=1), idx.max(axis=1)]).ravel()
+
+
+class DecimatedSeries:
+    """
+    Incrementally maintained min/max decimation of a growing series
+
+    The series is split into blocks of `block` points, and the index of the
+    minimum and maximum of every block is kept. Each further level combines
+    pairs of blocks of the level below. `update` only processes the points
+    added since the last call, and `decimate` picks the level with at most
+    one block per pixel, so the cost per frame depends on the plot width and
+    not on the length of the series.
+
+    The series itself is not copied, `update` takes the current arrays, e.g.
+    views of an `OptimizerHistory`. If the series loses points at the front,
+    as a ring buffer does, pass the number of dropped points as `start`. The
+    blocks holding dropped points are trimmed from every level and the points
+    between `start` and the first kept block are plotted from finer levels.
+    """
+
+    def __init__(self, block: int = 32) -> None:
+        self.block = block
+        self.start = 0
+        self.count = 0
+        self.x: np.ndarray | None = None
+        self.y: np.ndarray = np.empty(0)
+        self._levels: list[_Level] = [_Level()]
+
+    def reset(self) -> None:
+        self.count = 0
+        self._levels = [_Level(-(-self.start // self.block))]
+
+    def update(self, x: np.ndarray | None, y: np.ndarray, start: int = 0) -> None:
+        """Use the arrays `x` and `y`, which extend the series of the last
+        call, after dropping the points before `start`"""
+        if start < self.start or start + len(y) < self.start + self.count:
+            self.start = start
+            self.reset()
+        elif start > self.start:
+            self.start = start
+            for level, blocks in enumerate(self._levels):
+                blocks.trim(-(-start // self.block_size(level)))
+        self.x, self.y = x, y
+        base = self._levels[0]
+        full = (start + len(y)) // self.block
+        if full > base.end:
+            first = base.end * self.block - start
+            blocks = y[first: full * self.block - start].reshape(-1, self.block)
+            r = np.arange(len(blocks))
+            lo, hi = blocks.argmin(axis=1), blocks.argmax(axis=1)
+            offsets = start + first + self.block * r
+            base.append(np.column_stack([offsets + lo, offsets + hi]),
+                        np.column_stack([blocks[r, lo], blocks[r, hi]]))
+            level = 0
+            while self._levels[level].n >= 2:
+                if level + 1 == len(self._levels):
+                    self._levels.append(_Level((self._levels[level].first + 1) // 2))
+                self._levels[level + 1].extend_from(self._levels[level])
+                level += 1
+        self.count = len(y)
+
+    def block_size(self, level: int) -> int:
+        return self.block << level
+
+    def decimate(
+        self, pixels: int, x_range: tuple[float, float] | None = None
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """About two points per pixel of the series, or of the part within
+        `x_range` if given, which requires increasing x values"""
+        if pixels < 1:
+            msg = f"pixels must be at least 1, got {pixels}"
+            raise ValueError(msg)
+        n = self.count
+        x = np.arange(n, dtype=np.float64) if self.x is None else self.x[:n]
+        y = self.y[:n]
+        i0, i1 = 0, n
+        if x_range is not None:
+            i0, i1 = np.searchsorted(x, x_range)
+            i0, i1 = max(int(i0) - 1, 0), min(int(i1) + 1, n)
+        span = i1 - i0
+        if span <= 2 * pixels:
+            return x[i0:i1], y[i0:i1]
+        a0, a1 = self.start + i0, self.start + i1
+        level = max(0, math.ceil(math.log2(span / (pixels * self.block))))
+        level = min(level, len(self._levels) - 1)
+        while level > 0 and self._levels[level].end * self.block_size(level) <= a0:
+            level -= 1
+        idx = np.concatenate(self._cover(level, a0, a1)) - self.start
+        return x[idx], y[idx]
+
+    def _cover(self, level: int, a0: int, a1: int) -> list[np.ndarray]:
+        """Indices covering the points ``a0:a1``, counted from the start of
+        the series, with the blocks of `level` and the finer levels at the
+        ends"""
+        if a1 <= a0:
+            return []
+        if level < 0:
+            return [np.arange(a0, a1)]
+        size = self.block_size(level)
+        blocks = self._levels[level]
+        first = max(a0 // size, blocks.first)
+        last = min(-(-a1 // size), blocks.end)
+        if last <= first:
+            return self._cover(level - 1, a0, a1)
+        return [*self._cover(level - 1, a0, first * size),
+                blocks.indices(first, last),
+                *self._cover(level - 1, last * size, a1)]
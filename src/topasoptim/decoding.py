@@ -0,0 +1,82 @@
+from __future__ import annotations
+
+import json
+from collections.abc import Sequence
+from operator import itemgetter
+from typing import Any
+
+import numpy as np
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+MOTOR_DTYPE = np.dtype(
+    [
+        ("index", np.int64),
+        ("actual_position", np.int64),
+        ("target_position", np.int64),
+        ("actual_position_in_units", np.float64),
+        ("target_position_in_units", np.float64),
+    ]
+)
+"Dtype of the rows of a `MotorTable`"
+
+MOTOR_STATE_KEYS = {
+    "index": "Index",
+    "actual_position": "ActualPosition",
+    "target_position": "TargetPosition",
+    "actual_position_in_units": "ActualPositionInUnits",
+    "target_position_in_units": "TargetPositionInUnits",
+}
+"JSON key of each `MOTOR_DTYPE` field in the motor properties"
+
+BACKENDS = ("orjson", "json")
+"JSON decoders of `decode_motor_states`, ``orjson`` needs the optional package"
+
+DEFAULT_BACKEND = "orjson" if orjson is not None else "json"
+
+_motor_state = itemgetter(*MOTOR_STATE_KEYS.values())
+
+
+def loads(data: bytes | str) -> Any:
+    "Decode JSON with orjson if it is installed, else with the stdlib"
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def motor_states_from_dicts(
+    props: Sequence[dict[str, Any]], out: np.ndarray | None = None
+) -> np.ndarray:
+    """Project decoded motor properties into a `MOTOR_DTYPE` array, `out`
+    is filled and returned if it has the right length"""
+    if out is None or len(out) != len(props) or out.dtype != MOTOR_DTYPE:
+        out = np.empty(len(props), MOTOR_DTYPE)
+    out[:] = list(map(_motor_state, props))
+    return out
+
+
+def decode_motor_states(
+    raw: bytes, out: np.ndarray | None = None, backend: str | None = None
+) -> np.ndarray:
+    """Decode a ``/Motors/PropertiesThatChangeOften`` response body into a
+    `MOTOR_DTYPE` array with one row per motor, in the order of the payload
+
+    Both backends decode the full payload into dicts first, then the fields
+    of `MOTOR_DTYPE` are copied into the array in one pass over the motors.
+    orjson makes the decode step cheaper, the stdlib ``json`` backend is a
+    plain `json.loads` followed by that copy. `backend` defaults to
+    `DEFAULT_BACKEND`, see `BACKENDS`.
+    """
+    backend = backend or DEFAULT_BACKEND
+    if backend == "orjson":
+        if orjson is None:
+            msg = "The orjson backend needs the orjson package"
+            raise ValueError(msg)
+        return motor_states_from_dicts(orjson.loads(raw), out)
+    if backend == "json":
+        return motor_states_from_dicts(json.loads(raw), out)
+    msg = f"Unknown backend {backend!r}, expected one of {BACKENDS}"
+    raise ValueError(msg)
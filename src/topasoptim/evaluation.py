@@ -0,0 +1,180 @@
+from __future__ import annotations
+
+import dataclasses
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Callable
+from typing import Any
+
+import numpy as np
+
+from .OptimizerModel import BatchObjectiveFunc, ObjectiveFunc
+
+
+@dataclasses.dataclass
+class _Entry:
+    total: float = 0.0
+    count: int = 0
+    updated: float = 0.0
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.count
+
+
+@dataclasses.dataclass
+class MemoStats:
+    """Counters of a `MemoizedObjective`"""
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+    eval_time: float = 0.0
+
+    @property
+    def calls(self) -> int:
+        return self.hits + self.misses
+
+    @property
+    def hit_rate(self) -> float:
+        return self.hits / self.calls if self.calls else float("nan")
+
+    @property
+    def saved_time(self) -> float:
+        "Estimated seconds saved, hits times the mean evaluation time"
+        return self.hits * self.eval_time / self.misses if self.misses else 0.0
+
+
+class MemoizedObjective:
+    """
+    Objective wrapper reusing results at already measured motor positions
+
+    Candidates are rounded to integer motor steps, and the rounded position
+    vector is the cache key. A position is measured `repeats` times and the
+    results are averaged before the mean is reused, which suppresses the
+    noise of a single measurement. Results older than `max_age` seconds are
+    measured again, e.g. to follow slow drifts of the laser. At most
+    `maxsize` positions are kept, the least recently used are evicted first.
+
+    Use it as the `func` passed to `OptimizerModel.step`, or call `batch`
+    with a whole population.
+
+    Parameters
+    ----------
+    func : Callable[[np.ndarray], float]
+        The objective
+    maxsize : int | None
+        Maximal number of cached positions, unbounded if None
+    repeats : int
+        Measurements averaged per position before reuse
+    max_age : float | None
+        Seconds a result stays valid, forever if None
+    batch_func : Callable[[np.ndarray], np.ndarray] | None
+        Vectorized objective used by `batch` for the positions not cached
+    """
+
+    def __init__(
+        self,
+        func: ObjectiveFunc,
+        maxsize: int | None = 10_000,
+        repeats: int = 1,
+        max_age: float | None = None,
+        batch_func: BatchObjectiveFunc | None = None,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.func = func
+        self.maxsize = maxsize
+        self.repeats = repeats
+        self.max_age = max_age
+        self.batch_func = batch_func
+        self.clock = clock
+        self.stats = MemoStats()
+        self._cache: OrderedDict[bytes, _Entry] = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(x: np.ndarray) -> bytes:
+        "Cache key of the position `x`"
+        return np.rint(np.asarray(x, dtype=np.float64)).astype(np.int64).tobytes()
+
+    def __len__(self) -> int:
+        return len(self._cache)
+
+    def _lookup(self, key: bytes) -> float | None:
+        with self._lock:
+            entry = self._cache.get(key)
+            if entry is not None and self.max_age is not None \
+                    and self.clock() - entry.updated > self.max_age:
+                del self._cache[key]
+                entry = None
+            if entry is None or entry.count < self.repeats:
+                self.stats.misses += 1
+                return None
+            self._cache.move_to_end(key)
+            self.stats.hits += 1
+            return entry.mean
+
+    def _store(self, key: bytes, value: float) -> float:
+        "Add a measurement, returns the mean of the position"
+        with self._lock:
+            entry = self._cache.get(key)
+            if entry is None:
+                entry = self._cache[key] = _Entry()
+            entry.total += value
+            entry.count += 1
+            entry.updated = self.clock()
+            self._cache.move_to_end(key)
+            if self.maxsize is not None:
+                while len(self._cache) > self.maxsize:
+                    self._cache.popitem(last=False)
+                    self.stats.evictions += 1
+            return entry.mean
+
+    def __call__(self, x: np.ndarray[Any, np.float64]) -> float:
+        key = self.key(x)
+        value = self._lookup(key)
+        if value is not None:
+            return value
+        t0 = time.perf_counter()
+        result = float(self.func(x))
+        self.stats.eval_time += time.perf_counter() - t0
+        return self._store(key, result)
+
+    def batch(self, X: np.ndarray) -> np.ndarray:
+        """Evaluate the rows of `X`, only the positions not cached are
+        measured, with `batch_func` if given
+
+        Rows rounding to the same position are measured once and count as
+        hits after the first."""
+        X = np.asarray(X, dtype=np.float64)
+        out = np.empty(len(X))
+        missing: dict[bytes, list[int]] = {}
+        for i, x in enumerate(X):
+            key = self.key(x)
+            rows = missing.get(key)
+            if rows is not None:
+                rows.append(i)
+                with self._lock:
+                    self.stats.hits += 1
+                continue
+            value = self._lookup(key)
+            if value is None:
+                missing[key] = [i]
+            else:
+                out[i] = value
+        if missing:
+            first = [rows[0] for rows in missing.values()]
+            t0 = time.perf_counter()
+            if self.batch_func is not None:
+                values = np.asarray(self.batch_func(X[first]), dtype=np.float64)
+            else:
+                values = [float(self.func(X[i])) for i in first]
+            self.stats.eval_time += time.perf_counter() - t0
+            for (key, rows), value in zip(missing.items(), values, strict=True):
+                out[rows] = self._store(key, float(value))
+        return out
+
+    def clear(self) -> None:
+        "Forget all cached results, the statistics are kept"
+        with self._lock:
+            self._cache.clear()
@@ -0,0 +1,212 @@
+from __future__ import annotations
+
+import math
+import os
+import time
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+
+
+class OptimizerHistory:
+    """
+    Preallocated history of optimizer evaluations
+
+    Each row holds the parameters, the objective value, the timestamp and
+    the settle time of one evaluation, stored in one float64 array so every
+    column is available as a zero-copy view. The array grows in chunks of
+    `chunk_size` rows. Once `max_rows` rows are reached, the history either
+    moves to a memory-mapped file at `spill_path` and keeps growing there,
+    or, without a spill path, keeps only the last `max_rows` rows as a ring
+    buffer. The ring stores every row twice, so the window of the last rows
+    is still one contiguous view.
+
+    Views stay valid until the array is reallocated, i.e. until the next
+    growth or the switch to the ring buffer or the file.
+
+    Parameters
+    ----------
+    num_params : int
+        Number of parameters per evaluation
+    chunk_size : int
+        Rows added per growth, growth at least doubles the capacity
+    max_rows : int
+        Rows kept in memory
+    spill_path : str | os.PathLike | None
+        File the history moves to once it outgrows `max_rows`
+    """
+
+    def __init__(
+        self,
+        num_params: int,
+        chunk_size: int = 4096,
+        max_rows: int = 1_000_000,
+        spill_path: str | os.PathLike[str] | None = None,
+    ) -> None:
+        self.num_params = num_params
+        self.chunk_size = chunk_size
+        self.max_rows = max_rows
+        self.spill_path = None if spill_path is None else Path(spill_path)
+        self.total = 0
+        self._ring = False
+        self._data = np.empty((min(chunk_size, max_rows), num_params + 3))
+
+    @property
+    def width(self) -> int:
+        "Number of columns, ``num_params + 3``"
+        return self.num_params + 3
+
+    @property
+    def capacity(self) -> int:
+        return self.max_rows if self._ring else len(self._data)
+
+    @property
+    def dropped(self) -> int:
+        "Rows overwritten by the ring buffer"
+        return self.total - len(self)
+
+    @property
+    def spilled(self) -> bool:
+        return isinstance(self._data, np.memmap)
+
+    def __len__(self) -> int:
+        return min(self.total, self.max_rows) if self._ring else self.total
+
+    def _grow(self, needed: int) -> None:
+        cap = len(self._data)
+        new_cap = max(needed, 2 * cap)
+        new_cap = self.chunk_size * math.ceil(new_cap / self.chunk_size)
+        if needed <= self.max_rows:
+            new_cap = min(new_cap, self.max_rows)
+        if new_cap > self.max_rows and self.spill_path is not None:
+            self._spill(new_cap)
+        elif new_cap > self.max_rows:
+            self._start_ring()
+        else:
+            data = np.empty((new_cap, self.width))
+            data[: self.total] = self._data[: self.total]
+            self._data = data
+
+    def _spill(self, new_cap: int) -> None:
+        old = self._data
+        if isinstance(old, np.memmap):
+            old.flush()
+        with self.spill_path.open("r+b" if self.spilled else "wb") as f:
+            f.truncate(new_cap * self.width * 8)
+        data = np.memmap(self.spill_path, dtype=np.float64, mode="r+",
+                         shape=(new_cap, self.width))
+        if not self.spilled:
+            data[: self.total] = old[: self.total]
+        self._data = data
+
+    def _start_ring(self) -> None:
+        data = np.empty((2 * self.max_rows, self.width))
+        n = self.total
+        data[:n] = self._data[:n]
+        data[self.max_rows: self.max_rows + n] = self._data[:n]
+        self._data = data
+        self._ring = True
+
+    def _rows_for(self, n: int) -> tuple[np.ndarray, np.ndarray | None]:
+        "Slots for the next `n` rows, a second slot array for the ring copies"
+        start = self.total
+        if not self._ring and start + n > len(self._data):
+            self._grow(start + n)
+        if not self._ring:
+            return np.arange(start, start + n), None
+        slots = np.arange(start, start + n) % self.max_rows
+        return slots, slots + self.max_rows
+
+    def append(
+        self,
+        params: np.ndarray,
+        objective: float,
+        timestamp: float | None = None,
+        settle_time: float = np.nan,
+    ) -> None:
+        "Add one evaluation"
+        self.extend(np.asarray(params)[None, :], [objective],
+                    None if timestamp is None else [timestamp], [settle_time])
+
+    def extend(
+        self,
+        params: np.ndarray,
+        objective: np.ndarray | list[float],
+        timestamp: np.ndarray | list[float] | None = None,
+        settle_time: np.ndarray | list[float] | None = None,
+    ) -> None:
+        "Add a batch of evaluations, `params` has one row per evaluation"
+        params = np.asarray(params, dtype=np.float64).reshape(-1, self.num_params)
+        n = len(params)
+        if n > self.max_rows and self.spill_path is None:
+            if not self._ring:
+                # copy the rows written so far before `total` moves past them
+                self._start_ring()
+            skip = n - self.max_rows
+            self.total += skip
+            params = params[skip:]
+            objective = np.asarray(objective)[skip:]
+            timestamp = None if timestamp is None else np.asarray(timestamp)[skip:]
+            settle_time = None if settle_time is None else np.asarray(settle_time)[skip:]
+            n = self.max_rows
+        block = np.empty((n, self.width))
+        block[:, : self.num_params] = params
+        block[:, -3] = objective
+        block[:, -2] = time.time() if timestamp is None else timestamp
+        block[:, -1] = np.nan if settle_time is None else settle_time
+        slots, copies = self._rows_for(n)
+        self._data[slots] = block
+        if copies is not None:
+            self._data[copies] = block
+        self.total += n
+
+    def table(self) -> np.ndarray:
+        "All kept rows, oldest first, as a zero-copy ``(n, num_params + 3)`` view"
+        n = len(self)
+        if not self._ring or self.total <= self.max_rows:
+            return self._data[:n]
+        start = self.total % self.max_rows
+        return self._data[start: start + n]
+
+    @property
+    def params(self) -> np.ndarray:
+        return self.table()[:, : self.num_params]
+
+    @property
+    def objective(self) -> np.ndarray:
+        return self.table()[:, -3]
+
+    @property
+    def timestamp(self) -> np.ndarray:
+        return self.table()[:, -2]
+
+    @property
+    def settle_time(self) -> np.ndarray:
+        return self.table()[:, -1]
+
+    def get_history(self) -> np.ndarray[Any, float]:
+        "Parameters and objective, one ``(*params, objective)`` row per evaluation"
+        return self.table()[:, : self.num_params + 1]
+
+    def flush(self) -> None:
+        "Write a spilled history to disk"
+        if isinstance(self._data, np.memmap):
+            self._data.flush()
+
+    def close(self) -> None:
+        """Flush a spilled history and cut the file to the rows written,
+        afterwards the file can be read with `open_spilled`"""
+        if not self.spilled:
+            return
+        self._data.flush()
+        self._data = np.empty((0, self.width))
+        with self.spill_path.open("r+b") as f:
+            f.truncate(self.total * self.width * 8)
+        self._data = np.memmap(self.spill_path, dtype=np.float64, mode="r+",
+                               shape=(self.total, self.width))
+
+    @classmethod
+    def open_spilled(cls, path: str | os.PathLike[str], num_params: int) -> np.ndarray:
+        "Memory-map a closed spill file read-only as ``(n, num_params + 3)`` array"
+        return np.memmap(path, dtype=np.float64, mode="r").reshape(-1, num_params + 3)
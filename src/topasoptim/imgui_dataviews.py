@@ -1,4 +1,7 @@
 import dataclasses as dc
+import inspect
+import typing
+from collections.abc import Callable
 from typing import Any, Protocol
 
 from imgui_bundle import imgui, immapp
@@ -55,39 +58,39 @@ def unique_label(name, dc: DataclassProtocol) -> str:
     return f"{name}##{id(dc)}"
 
 
-def text_edit_view(name: str, dc: DataclassProtocol) -> None:
+def text_edit_view(name: str, dc: DataclassProtocol, label: str | None = None) -> None:
     """Create a text edit view of the value"""
     current_val = getattr(dc, name)
-    changed, new_val = imgui.input_text(unique_label(name, dc), current_val)
+    changed, new_val = imgui.input_text(label or unique_label(name, dc), current_val)
     if changed:
         setattr(dc, name, new_val)
 
 
-def float_edit_view(name: str, dc: DataclassProtocol) -> None:
+def float_edit_view(name: str, dc: DataclassProtocol, label: str | None = None) -> None:
     """Create a float edit view of the value"""
     current_val = getattr(dc, name)
-    changed, new_val = imgui.input_float(unique_label(name, dc), current_val)
+    changed, new_val = imgui.input_float(label or unique_label(name, dc), current_val)
     if changed:
         setattr(dc, name, new_val)
 
 
-def int_edit_view(name: str, dc: DataclassProtocol) -> None:
+def int_edit_view(name: str, dc: DataclassProtocol, label: str | None = None) -> None:
     """Create an int edit view of the value"""
     current_val = getattr(dc, name)
-    changed, new_val = imgui.input_int(unique_label(name, dc), current_val)
+    changed, new_val = imgui.input_int(label or unique_label(name, dc), current_val)
     if changed:
         setattr(dc, name, new_val)
 
 
-def bool_edit_view(name: str, dc: DataclassProtocol) -> None:
+def bool_edit_view(name: str, dc: DataclassProtocol, label: str | None = None) -> None:
     """Create a bool edit view of the value"""
     current_val = getattr(dc, name)
-    changed, new_val = imgui.checkbox(unique_label(name, dc), current_val)
+    changed, new_val = imgui.checkbox(label or unique_label(name, dc), current_val)
     if changed:
         setattr(dc, name, new_val)
 
 
-def default_edit_view(name: str, dc: DataclassProtocol) -> None:
+def default_edit_view(name: str, dc: DataclassProtocol, _label: str | None = None) -> None:
     return default_view(name, getattr(dc, name))
 
 
@@ -100,26 +103,94 @@ TYPE_EDIT_MAP = {
 
 
 def register_type_map(ty, view, edit_view):
-    """Register a type mapping"""
+    """Register a type mapping, `edit_view` may take `(name, dc)` or
+    `(name, dc, label)`"""
     TYPE_MAP[ty] = view
     TYPE_EDIT_MAP[ty] = edit_view
+    _PLANS.clear()
+
+
+@dc.dataclass(frozen=True)
+class ViewPlan:
+    """Views of the fields of a dataclass type, resolved once per type"""
+    names: tuple[str, ...]
+    views: tuple[Callable[[str, Any], None], ...]
+    edit_views: tuple[Callable[..., None], ...]
+    edit_labels: tuple[bool, ...]
+
+
+def takes_label(edit_view: Callable[..., None]) -> bool:
+    """True if `edit_view` accepts a third `label` argument, edit views
+    registered with two arguments are called without it"""
+    try:
+        params = list(inspect.signature(edit_view).parameters.values())
+    except (TypeError, ValueError):
+        return False
+    if any(p.kind is p.VAR_POSITIONAL or p.name == "label" for p in params):
+        return True
+    positional = (inspect.Parameter.POSITIONAL_ONLY, inspect.Parameter.POSITIONAL_OR_KEYWORD)
+    return sum(p.kind in positional for p in params) >= 3
+
+
+_PLANS: dict[type, ViewPlan] = {}
+
+
+def field_types(cls: type) -> dict[str, Any]:
+    """Resolved field types, string annotations are evaluated if possible"""
+    try:
+        hints = typing.get_type_hints(cls)
+    except (NameError, TypeError):
+        hints = {}
+    return {f.name: hints.get(f.name, f.type) for f in dc.fields(cls)}
+
+
+def view_plan(cls: type) -> ViewPlan:
+    """The cached `ViewPlan` of a dataclass type"""
+    plan = _PLANS.get(cls)
+    if plan is None:
+        types = field_types(cls)
+        edit_views = tuple(TYPE_EDIT_MAP.get(t, default_edit_view) for t in types.values())
+        plan = _PLANS[cls] = ViewPlan(
+            names=tuple(types),
+            views=tuple(TYPE_MAP.get(t, default_view) for t in types.values()),
+            edit_views=edit_views,
+            edit_labels=tuple(takes_label(v) for v in edit_views),
+        )
+    return plan
 
 
 @dc.dataclass
 class DataView:
     dc: DataclassProtocol = dc.field()
 
+    def __post_init__(self) -> None:
+        self.plan: ViewPlan = view_plan(type(self.dc))
+        self.labels: tuple[str, ...] = tuple(unique_label(name, self.dc) for name in self.plan.names)
+
+    def _check_plan(self) -> None:
+        """Recompile if the type map changed"""
+        if self.plan is not _PLANS.get(type(self.dc)):
+            self.__post_init__()
+
     def make_view(self) -> None:
+        self._check_plan()
         imgui.begin_group()
-        for name, field in self.dc.__dataclass_fields__.items():
-            view = TYPE_MAP.get(field.type, default_view)
-            view(name, getattr(self.dc, name))
+        obj = self.dc
+        for name, view in zip(self.plan.names, self.plan.views, strict=True):
+            view(name, getattr(obj, name))
         imgui.end_group()
 
     def make_edit_view(self) -> None:
+        self._check_plan()
         imgui.begin_group()
-        for name, field in self.dc.__dataclass_fields__.items():
-            TYPE_EDIT_MAP.get(field.type, default_edit_view)(name, self.dc)
+        obj = self.dc
+        plan = self.plan
+        for name, edit_view, with_label, label in zip(
+                plan.names, plan.edit_views, plan.edit_labels, self.labels, strict=True):
+            if with_label:
+                edit_view(name, obj, label)
+            else:
+                edit_view(name, obj)
         imgui.end_group()
 
 
@@ -1,11 +1,15 @@
-from OptimizerModel import OptimizerModel
-from TopasModel import Topas, TopasConnection
-from typing import Literal, TYPE_CHECKING
+from __future__ import annotations
+
 import dataclasses as dc
-from imgui_bundle import imgui, immapp, implot, hello_imgui
-import numpy as np
 import time
-import threading
+from typing import Literal
+
+import numpy as np
+from imgui_bundle import imgui, immapp, implot
+
+from .acquisition import AcquisitionEngine
+from .decimation import DecimatedSeries, minmax_decimate
+from .history import OptimizerHistory
 
 
 @dc.dataclass
@@ -16,26 +20,32 @@ class AppState:
     mode: Literal["alignment", "optimization"] = "alignment"
     wavelength: float = 689.0
     integration_time: float = 30.0
-    last_x: np.ndarray = dc.field(init=False)
-    last_y: np.ndarray = dc.field(init=False)
+    max_fps: float = 60.0
+    num_points: int = 100
+    acquisition: AcquisitionEngine = dc.field(init=False)
 
-    optimizer_hist: np.ndarray = dc.field(init=False)
-    optimizer_hist_x: np.ndarray = dc.field(init=False)
+    optimizer_hist: OptimizerHistory | None = dc.field(init=False, default=None)
+    rng: np.random.Generator = dc.field(
+        init=False, default_factory=np.random.default_rng)
+    objective_series: DecimatedSeries = dc.field(
+        init=False, default_factory=DecimatedSeries)
 
     stop_optimization: bool = False
-    is_running: bool = True
-    runner: threading.Thread = dc.field(init=False)
 
     def __post_init__(self):
-        self.update_xy()
+        self.acquisition = AcquisitionEngine(
+            self.update_xy, self.num_points, period=self.frame_period)
+        self.acquisition.acquire_once()
+
+    def frame_period(self) -> float:
+        """Seconds per spectrum, the integration time limited by max_fps"""
+        return max(self.integration_time * 1e-3, 1 / self.max_fps)
 
-    def update_xy(self):
-        """Update the x and y values"""
-        self.last_x = np.linspace(0, 10, 100)
-        self.last_y = np.sin(self.last_x+time.time()) + \
-            np.random.randn(100)*0.1
-        cur_time = time.time()
-        self.last_update = cur_time
+    def update_xy(self, x: np.ndarray, y: np.ndarray):
+        """Fill x and y with a new spectrum"""
+        x[:] = np.linspace(0, 10, len(x))
+        y[:] = np.sin(x+time.time()) + self.rng.normal(0, 0.1, len(y))
+        self.last_update = time.time()
 
     def update_motors(self):
         """Update the motor information"""
@@ -50,22 +60,12 @@ class AppState:
         imgui.log_text("Saving application state")
 
     def start_loop(self):
-        """Start the loop"""
-        self.is_running = True
-        self.runner = threading.Thread(
-            target=self.run_loop, daemon=True).start()
+        """Start the acquisition"""
+        self.acquisition.start()
 
     def stop_loop(self):
-        """Stop the loop"""
-        self.is_running = False
-
-    def run_loop(self):
-        """Run updates in a loop"""
-        while self.is_running:
-            self.update_xy()
-
-
-app_state = AppState()
+        """Stop the acquisition"""
+        self.acquisition.stop()
 
 
 def spec_settings(app_state: AppState):
@@ -78,7 +78,7 @@ def spec_settings(app_state: AppState):
             app_state.mode = mode[0]
         if (wavelength := imgui.input_float("Wavelength [nm]", app_state.wavelength, step=5., format="%.1f"))[0]:
             app_state.wavelength = wavelength[0]
-        if (integration_time := imgui.input_float("Integration Time [s]", app_state.integration_time, step=1., format="%.1f"))[0]:
+        if (integration_time := imgui.input_float("Integration Time [ms]", app_state.integration_time, step=1., format="%.1f"))[0]:
             app_state.integration_time = integration_time[1]
 
         imgui.pop_item_width()
@@ -109,7 +109,7 @@ def topas_settings(app_state: AppState):
         imgui.tree_pop()
 
 
-def gui():
+def gui(app_state: AppState):
     """The GUI function"""
 
     # app_state.update_xy()
@@ -126,13 +126,22 @@ def gui():
         if implot.begin_plot("Spectrum Plot", (-1, 400)):
             implot.setup_axes("Time", "Amplitude")
             implot.set_next_line_style(weight=5)
-            implot.plot_scatter(
-                "My Line Plot", app_state.last_x, app_state.last_y)
+            pixels = int(implot.get_plot_size().x)
+            with app_state.acquisition.read() as frame:
+                implot.plot_scatter(
+                    "My Line Plot", *minmax_decimate(frame.x, frame.y, pixels))
             implot.end_plot()
+        acq = app_state.acquisition
+        imgui.text(f"Frames: {acq.frames}  Dropped: {acq.drops}  "
+                   f"Overruns: {acq.overruns}")
         if implot.begin_plot("Optimization Plot", (-1, 400)):
             implot.setup_axes("Time", "Amplitude")
-            implot.plot_line("My Line Plot", app_state.last_x,
-                             app_state.last_y)
+            hist = app_state.optimizer_hist
+            if hist is not None and len(hist):
+                series = app_state.objective_series
+                series.update(hist.timestamp, hist.objective, start=hist.dropped)
+                implot.plot_line(
+                    "Objective", *series.decimate(int(implot.get_plot_size().x)))
             implot.end_plot()
     else:
         imgui.text("Iteration: 0")
@@ -144,28 +153,34 @@ def gui():
 
         if implot.begin_plot("Spec Plot", (-1, -1)):
             implot.setup_axes("Time", "Amplitude")
-            implot.plot_line("My Line Plot", app_state.last_x,
-                             app_state.last_y)
+            pixels = int(implot.get_plot_size().x)
+            with app_state.acquisition.read() as frame:
+                implot.plot_line(
+                    "My Line Plot", *minmax_decimate(frame.x, frame.y, pixels))
             implot.end_plot()
 
 
-app_state.start_loop()
-params = immapp.RunnerParams()
-params.callbacks.show_gui = gui
-params.callbacks.before_exit = app_state.stop_loop
-params.app_window_params.window_title = "TopasOpt!"
-params.fps_idling.enable_idling = False
-params.fps_idling.remember_enable_idling = False
-
-
 def setup_fonts():
     style = imgui.get_style()
     style.scale_all_sizes(2)
-    imgui.
 
 
-params.callbacks.post_init = setup_fonts
+def main():
+    """Create the application state and run the GUI until it is closed"""
+    app_state = AppState()
+    app_state.start_loop()
+    params = immapp.RunnerParams()
+    params.callbacks.show_gui = lambda: gui(app_state)
+    params.callbacks.before_exit = app_state.stop_loop
+    params.app_window_params.window_title = "TopasOpt!"
+    params.fps_idling.enable_idling = False
+    params.fps_idling.remember_enable_idling = False
+    params.callbacks.post_init = setup_fonts
+
+    add_on_params = immapp.AddOnsParams()
+    add_on_params.with_implot = True
+    immapp.run(params, add_on_params)
+
 
-add_on_params = immapp.AddOnsParams()
-add_on_params.with_implot = True
-immapp.run(params, add_on_params)
+if __name__ == "__main__":
+    main()
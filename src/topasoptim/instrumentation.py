@@ -0,0 +1,176 @@
+from __future__ import annotations
+
+import contextlib
+import dataclasses
+import threading
+import time
+from collections.abc import Iterator
+
+import numpy as np
+
+LATENCY_BINS = np.geomspace(1e-5, 1e2, 141)
+"Edges of the latency histograms in seconds, 20 bins per decade"
+
+
+@dataclasses.dataclass
+class EndpointStats:
+    """
+    Request statistics of one endpoint
+
+    Attributes
+    ----------
+    calls : int
+        Number of requests
+    errors : int
+        Number of requests raising an exception or with an error status
+    bytes_sent, bytes_received : int
+        Size of the request and response bodies
+    total_time : float
+        Summed latency in seconds
+    histogram : np.ndarray
+        Request counts per bin of `LATENCY_BINS`, latencies outside of the
+        range are counted in the first or last bin
+    """
+    calls: int = 0
+    errors: int = 0
+    bytes_sent: int = 0
+    bytes_received: int = 0
+    total_time: float = 0.0
+    histogram: np.ndarray = dataclasses.field(
+        default_factory=lambda: np.zeros(len(LATENCY_BINS) - 1, dtype=np.int64))
+
+    def add(self, latency: float, sent: int, received: int, error: bool) -> None:
+        self.calls += 1
+        self.errors += error
+        self.bytes_sent += sent
+        self.bytes_received += received
+        self.total_time += latency
+        i = int(np.searchsorted(LATENCY_BINS, latency, side="right")) - 1
+        self.histogram[min(max(i, 0), len(self.histogram) - 1)] += 1
+
+    def percentile(self, q: float) -> float:
+        "Latency at percentile `q` (0 to 100), geometric center of its bin"
+        if self.calls == 0:
+            return float("nan")
+        cum = np.cumsum(self.histogram)
+        i = int(np.searchsorted(cum, q / 100 * cum[-1], side="left"))
+        return float(np.sqrt(LATENCY_BINS[i] * LATENCY_BINS[i + 1]))
+
+    @property
+    def mean(self) -> float:
+        return self.total_time / self.calls if self.calls else float("nan")
+
+    def summary(self) -> dict[str, float]:
+        "Counters and p50/p95/p99 latencies as a flat dict"
+        return {
+            "calls": self.calls,
+            "errors": self.errors,
+            "bytes_sent": self.bytes_sent,
+            "bytes_received": self.bytes_received,
+            "mean": self.mean,
+            "p50": self.percentile(50),
+            "p95": self.percentile(95),
+            "p99": self.percentile(99),
+        }
+
+    def copy(self) -> EndpointStats:
+        return dataclasses.replace(self, histogram=self.histogram.copy())
+
+
+@dataclasses.dataclass
+class Trace:
+    """
+    Requests made during one traced block, see `ConnectionStats.trace`
+
+    Attributes
+    ----------
+    name : str
+        Name of the traced block
+    start, end : float
+        `time.perf_counter` at the begin and the end of the block
+    endpoints : dict[str, EndpointStats]
+        Statistics of the requests made while the block ran
+    """
+    name: str
+    start: float = dataclasses.field(default_factory=time.perf_counter)
+    end: float | None = None
+    endpoints: dict[str, EndpointStats] = dataclasses.field(default_factory=dict)
+
+    @property
+    def duration(self) -> float:
+        "Wall time of the block in seconds"
+        end = time.perf_counter() if self.end is None else self.end
+        return end - self.start
+
+    @property
+    def request_time(self) -> float:
+        "Summed latency of all requests, may exceed `duration` for concurrent requests"
+        return sum(s.total_time for s in self.endpoints.values())
+
+    @property
+    def calls(self) -> int:
+        return sum(s.calls for s in self.endpoints.values())
+
+
+class ConnectionStats:
+    """
+    Thread-safe per-endpoint request statistics of a `TopasConnection`
+
+    Endpoints are keyed by their path without the query string, e.g. all
+    ``/TargetPosition?id=...`` requests share one entry.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._endpoints: dict[str, EndpointStats] = {}
+        self._traces: list[Trace] = []
+
+    def record(
+        self, path: str, latency: float, sent: int = 0, received: int = 0,
+        error: bool = False
+    ) -> None:
+        "Record one request to `path`"
+        path = path.partition("?")[0]
+        with self._lock:
+            stats = self._endpoints.get(path)
+            if stats is None:
+                stats = self._endpoints[path] = EndpointStats()
+            stats.add(latency, sent, received, error)
+            for trace in self._traces:
+                stats = trace.endpoints.get(path)
+                if stats is None:
+                    stats = trace.endpoints[path] = EndpointStats()
+                stats.add(latency, sent, received, error)
+
+    def snapshot(self) -> dict[str, EndpointStats]:
+        "Copy of the current statistics"
+        with self._lock:
+            return {path: s.copy() for path, s in self._endpoints.items()}
+
+    def summary(self) -> dict[str, dict[str, float]]:
+        "`EndpointStats.summary` of every endpoint"
+        return {path: s.summary() for path, s in self.snapshot().items()}
+
+    def reset(self) -> dict[str, EndpointStats]:
+        "Clear the statistics, returns the statistics before clearing"
+        with self._lock:
+            old, self._endpoints = self._endpoints, {}
+        return old
+
+    @contextlib.contextmanager
+    def trace(self, name: str = "step") -> Iterator[Trace]:
+        """Collect the requests made from any thread while the block runs
+
+        >>> with conn.stats.trace("step") as trace:
+        ...     topas.move_motors(targets, wait=True)
+        >>> trace.duration, trace.calls
+        """
+        trace = Trace(name)
+        with self._lock:
+            self._traces.append(trace)
+        try:
+            yield trace
+        finally:
+            trace.end = time.perf_counter()
+            with self._lock:
+                self._traces.remove(trace)
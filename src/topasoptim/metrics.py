@@ -0,0 +1,203 @@
+from __future__ import annotations
+
+from collections.abc import Callable
+from typing import Any
+
+import numpy as np
+
+from .OptimizerModel import ObjectiveFunc
+
+Metric = Callable[[np.ndarray], np.ndarray]
+"Maps an ``(n_frames, n_pixels)`` batch of spectra to ``n_frames`` values"
+
+MeasureFunc = Callable[[np.ndarray], np.ndarray]
+"Moves to the given motor positions and returns the spectra recorded there"
+
+
+def _trapezoid_weights(x: np.ndarray) -> np.ndarray:
+    "Weights `w` with ``y @ w`` equal to the trapezoid integral of `y` over `x`"
+    w = np.zeros(len(x))
+    if len(x) > 1:
+        dx = np.diff(x)
+        w[:-1] += dx / 2
+        w[1:] += dx / 2
+    return w
+
+
+class SpectralAxis:
+    """
+    Wavelength axis of a spectrometer with precomputed pixel ranges
+
+    Bands are contiguous pixel slices with trapezoid integration weights,
+    so band integrals of a whole batch are a single matrix-vector product.
+    The slices and weights are cached per band.
+
+    Parameters
+    ----------
+    wavelengths : np.ndarray
+        Strictly increasing wavelength of every pixel
+    """
+
+    def __init__(self, wavelengths: np.ndarray) -> None:
+        self.wavelengths = np.asarray(wavelengths, dtype=np.float64)
+        if np.any(np.diff(self.wavelengths) <= 0):
+            msg = "wavelengths must be strictly increasing"
+            raise ValueError(msg)
+        self._bands: dict[tuple[float, float], tuple[slice, np.ndarray]] = {}
+
+    def __len__(self) -> int:
+        return len(self.wavelengths)
+
+    def index(self, wavelength: float) -> int:
+        "Pixel closest to `wavelength`"
+        i = int(np.searchsorted(self.wavelengths, wavelength))
+        if i == len(self.wavelengths) or (
+                i > 0 and wavelength - self.wavelengths[i - 1] < self.wavelengths[i] - wavelength):
+            i -= 1
+        return i
+
+    def band(self, lower: float, upper: float) -> tuple[slice, np.ndarray]:
+        "Pixel slice within ``[lower, upper]`` and its integration weights"
+        key = (lower, upper)
+        band = self._bands.get(key)
+        if band is None:
+            start = np.searchsorted(self.wavelengths, lower, side="left")
+            stop = np.searchsorted(self.wavelengths, upper, side="right")
+            if stop <= start:
+                msg = f"no pixels between {lower} and {upper}"
+                raise ValueError(msg)
+            sl = slice(int(start), int(stop))
+            band = self._bands[key] = (sl, _trapezoid_weights(self.wavelengths[sl]))
+        return band
+
+
+def _as_batch(spectra: np.ndarray) -> np.ndarray:
+    return np.atleast_2d(np.asarray(spectra, dtype=np.float64))
+
+
+def intensity_at(
+    spectra: np.ndarray, axis: SpectralAxis, wavelength: float, width: float = 0.0
+) -> np.ndarray:
+    """Intensity at `wavelength`, the mean over ``wavelength ± width / 2``
+    if `width` is positive"""
+    spectra = _as_batch(spectra)
+    if width <= 0:
+        return spectra[:, axis.index(wavelength)].copy()
+    sl, _ = axis.band(wavelength - width / 2, wavelength + width / 2)
+    return spectra[:, sl].mean(axis=1)
+
+
+def band_power(
+    spectra: np.ndarray, axis: SpectralAxis, lower: float, upper: float
+) -> np.ndarray:
+    "Integral of the spectra over the band ``[lower, upper]``"
+    sl, w = axis.band(lower, upper)
+    return _as_batch(spectra)[:, sl] @ w
+
+
+def centroid(
+    spectra: np.ndarray,
+    axis: SpectralAxis,
+    lower: float | None = None,
+    upper: float | None = None,
+) -> np.ndarray:
+    "Intensity weighted mean wavelength, within ``[lower, upper]`` if given"
+    lower = axis.wavelengths[0] if lower is None else lower
+    upper = axis.wavelengths[-1] if upper is None else upper
+    sl, w = axis.band(lower, upper)
+    S = _as_batch(spectra)[:, sl]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return (S @ (w * axis.wavelengths[sl])) / (S @ w)
+
+
+def fwhm(spectra: np.ndarray, axis: SpectralAxis) -> np.ndarray:
+    """Full width at half maximum of the highest peak, linearly interpolated
+    between the pixels, NaN if a flank does not fall below half maximum"""
+    S = _as_batch(spectra)
+    n, p = S.shape
+    rows = np.arange(n)
+    peak = np.argmax(S, axis=1)
+    half = S[rows, peak] / 2
+    below = S < half[:, None]
+    idx = np.arange(p)
+    left = np.where(below & (idx < peak[:, None]), idx, -1).max(axis=1)
+    right = np.where(below & (idx > peak[:, None]), idx, p).min(axis=1)
+    ok = (left >= 0) & (right < p)
+    lo, hi = np.where(ok, left, 0), np.where(ok, right, p - 1)
+    wl = axis.wavelengths
+
+    def crossing(i: np.ndarray, j: np.ndarray) -> np.ndarray:
+        "Wavelength where the spectrum crosses half maximum between pixels i and j"
+        yi, yj = S[rows, i], S[rows, j]
+        return wl[i] + (half - yi) / (yj - yi) * (wl[j] - wl[i])
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        width = crossing(hi - 1, hi) - crossing(lo, lo + 1)
+    width[~ok] = np.nan
+    return width
+
+
+def stability(values: np.ndarray) -> float:
+    "Relative standard deviation of a series of metric values, e.g. over frames"
+    values = np.asarray(values, dtype=np.float64)
+    return float(np.std(values) / np.abs(np.mean(values)))
+
+
+def intensity_metric(axis: SpectralAxis, wavelength: float, width: float = 0.0) -> Metric:
+    "Metric version of `intensity_at` with the pixel range resolved once"
+    if width <= 0:
+        i = axis.index(wavelength)
+        return lambda spectra: _as_batch(spectra)[:, i].copy()
+    axis.band(wavelength - width / 2, wavelength + width / 2)
+    return lambda spectra: intensity_at(spectra, axis, wavelength, width)
+
+
+def band_power_metric(axis: SpectralAxis, lower: float, upper: float) -> Metric:
+    "Metric version of `band_power` with the pixel range resolved once"
+    sl, w = axis.band(lower, upper)
+    return lambda spectra: _as_batch(spectra)[:, sl] @ w
+
+
+def centroid_metric(
+    axis: SpectralAxis, lower: float | None = None, upper: float | None = None
+) -> Metric:
+    "Metric version of `centroid`"
+    return lambda spectra: centroid(spectra, axis, lower, upper)
+
+
+def fwhm_metric(axis: SpectralAxis) -> Metric:
+    "Metric version of `fwhm`"
+    return lambda spectra: fwhm(spectra, axis)
+
+
+def make_objective(
+    measure: MeasureFunc,
+    metric: Metric,
+    maximize: bool = True,
+    target: float | None = None,
+    stability_weight: float = 0.0,
+) -> ObjectiveFunc:
+    """
+    Build the objective passed to `OptimizerModel.step`
+
+    ``measure(x)`` moves to the motor positions `x` and returns the spectra
+    recorded there, one or more frames. The objective is the mean of
+    `metric` over the frames, negated if `maximize`, as the optimizers
+    minimize. If `target` is given, the squared distance of the mean to the
+    target is minimized instead, e.g. to tune the centroid to a wavelength.
+    `stability_weight` adds the relative standard deviation over the frames
+    as a penalty.
+    """
+
+    def objective(x: np.ndarray[Any, np.float64]) -> float:
+        values = metric(measure(x))
+        mean = float(np.mean(values))
+        if target is not None:
+            result = (mean - target) ** 2
+        else:
+            result = -mean if maximize else mean
+        if stability_weight and len(values) > 1:
+            result += stability_weight * stability(values)
+        return result
+
+    return objective
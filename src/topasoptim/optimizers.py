@@ -0,0 +1,536 @@
+"""
+Vectorized optimizers for OPA alignment.
+
+All optimizers minimize, implement the ask/tell protocol
+`topasoptim.OptimizerModel.AskTellOptimizer` and the step protocol
+`topasoptim.OptimizerModel.OptimizerModel`. They work in coordinates
+normalized to the `Bounds` of the parameters and only propose points
+inside the bounds, rounded to integer motor steps and outside of the
+forbidden ranges of the motors.
+"""
+from __future__ import annotations
+
+import abc
+import dataclasses
+import math
+from collections.abc import Callable, Iterable, Sequence
+from typing import TYPE_CHECKING, Any
+
+import numpy as np
+
+from .history import OptimizerHistory
+from .OptimizerModel import evaluate_batch
+
+if TYPE_CHECKING:
+    from .TopasModel import TopasMotor
+
+
+@dataclasses.dataclass
+class Bounds:
+    """
+    Box bounds of the parameters with optional forbidden ranges
+
+    Attributes
+    ----------
+    lower, upper : np.ndarray
+        Inclusive lower and upper bound of each parameter
+    integer : np.ndarray
+        Boolean mask of the parameters restricted to integers
+    forbidden : list[list[tuple[float, float]]]
+        Per parameter, closed ranges which must not be proposed
+    """
+    lower: np.ndarray
+    upper: np.ndarray
+    integer: np.ndarray | bool = True
+    forbidden: list[list[tuple[float, float]]] = dataclasses.field(default_factory=list)
+
+    def __post_init__(self) -> None:
+        self.lower = np.asarray(self.lower, dtype=np.float64)
+        self.upper = np.asarray(self.upper, dtype=np.float64)
+        self.integer = np.broadcast_to(np.asarray(self.integer, dtype=bool), self.lower.shape)
+        if not self.forbidden:
+            self.forbidden = [[] for _ in self.lower]
+        if np.any(self.upper <= self.lower):
+            msg = "upper bounds must be larger than the lower bounds"
+            raise ValueError(msg)
+
+    @classmethod
+    def from_motors(cls, motors: Iterable[TopasMotor], minimal_position: int = 0) -> Bounds:
+        """Integer bounds from ``MaximalPosition`` and ``ForbiddenRanges``
+        of the motors, in the order given"""
+        motors = list(motors)
+        missing = [m.name for m in motors if m.maximal_position is None]
+        if missing:
+            msg = f"Motors without a maximal position: {missing}"
+            raise ValueError(msg)
+        return cls(
+            lower=np.full(len(motors), minimal_position),
+            upper=[m.maximal_position for m in motors],
+            integer=True,
+            forbidden=[list(m.forbidden_ranges) for m in motors],
+        )
+
+    def __len__(self) -> int:
+        return len(self.lower)
+
+    @property
+    def width(self) -> np.ndarray:
+        return self.upper - self.lower
+
+    def to_unit(self, X: np.ndarray) -> np.ndarray:
+        "Map parameters to the unit cube"
+        return (np.asarray(X, dtype=np.float64) - self.lower) / self.width
+
+    def from_unit(self, U: np.ndarray) -> np.ndarray:
+        "Map points of the unit cube to parameters"
+        return self.lower + np.asarray(U, dtype=np.float64) * self.width
+
+    def project(self, X: np.ndarray) -> np.ndarray:
+        """Move the rows of `X` to the nearest allowed point: clip to the
+        bounds, round integer parameters and push values out of forbidden
+        ranges to the closer edge"""
+        X = np.clip(np.asarray(X, dtype=np.float64), self.lower, self.upper)
+        X[..., self.integer] = np.rint(X[..., self.integer])
+        for i, ranges in enumerate(self.forbidden):
+            for lo, hi in ranges:
+                col = X[..., i]
+                inside = (col >= lo) & (col <= hi)
+                if not np.any(inside):
+                    continue
+                if self.integer[i]:
+                    below, above = math.floor(lo) - 1, math.ceil(hi) + 1
+                else:
+                    below, above = np.nextafter(lo, -np.inf), np.nextafter(hi, np.inf)
+                use_below = (col - below <= above - col) & (below >= self.lower[i])
+                use_below |= above > self.upper[i]
+                pushed = np.clip(np.where(use_below, below, above),
+                                 self.lower[i], self.upper[i])
+                col[inside] = pushed[inside]
+        return X
+
+    def contains(self, X: np.ndarray) -> np.ndarray:
+        "True for the rows of `X` which `project` leaves unchanged"
+        X = np.asarray(X, dtype=np.float64)
+        return np.all(self.project(X) == X, axis=-1)
+
+
+class PhasedOptimizer(abc.ABC):
+    """
+    Base class of the optimizers
+
+    Subclasses propose batches of points in unit coordinates with
+    `_next_batch` and get the evaluated batch back in `_update`, once all of
+    its points were told. `ask` hands out the points of the current batch,
+    and `tell` accepts results in any order.
+
+    Parameters
+    ----------
+    bounds : Bounds
+        Bounds of the parameters
+    x0 : array_like | None
+        Starting point, the center of the bounds if None
+    max_evals : int | None
+        Evaluation budget, `ask` returns no points once it is used up
+    seed : int | None
+        Seed of the random number generator
+    """
+
+    def __init__(
+        self,
+        bounds: Bounds,
+        x0: Sequence[float] | np.ndarray | None = None,
+        max_evals: int | None = None,
+        seed: int | None = None,
+    ) -> None:
+        self.bounds = bounds
+        self.num_params = len(bounds)
+        self.max_evals = max_evals
+        self.rng = np.random.default_rng(seed)
+        if x0 is None:
+            self.x0 = np.full(self.num_params, 0.5)
+        else:
+            self.x0 = bounds.to_unit(bounds.project(x0))
+        self.evals = 0
+        self.asked = 0
+        self.converged = False
+        self.best_x: np.ndarray | None = None
+        self.best_y = np.inf
+        self.history = OptimizerHistory(self.num_params)
+        self._U: np.ndarray | None = None
+        self._X: np.ndarray | None = None
+        self._y: np.ndarray | None = None
+        self._next = 0
+        self._rows: dict[bytes, list[int]] = {}
+
+    @abc.abstractmethod
+    def _next_batch(self) -> np.ndarray:
+        "Next batch of points in unit coordinates, one per row"
+
+    @abc.abstractmethod
+    def _update(self, U: np.ndarray, U_eval: np.ndarray, y: np.ndarray) -> None:
+        """Update the state from a told batch, `U` as proposed, `U_eval` as
+        evaluated after projection, and the values `y`"""
+
+    @property
+    def done(self) -> bool:
+        "True if converged or the budget is used up"
+        budget_left = self.max_evals is None or self.asked < self.max_evals
+        return self.converged or not budget_left
+
+    def _start_batch(self) -> None:
+        U = np.atleast_2d(self._next_batch())
+        X = self.bounds.project(self.bounds.from_unit(U))
+        self._U, self._X = U, X
+        self._y = np.full(len(U), np.nan)
+        self._next = 0
+        self._rows = {}
+        for i, x in enumerate(X):
+            self._rows.setdefault(x.tobytes(), []).append(i)
+
+    @property
+    def batch_size(self) -> int:
+        "Number of points `ask` can hand out right now"
+        if self.done:
+            return 0
+        if self._U is None:
+            self._start_batch()
+        n = len(self._U) - self._next
+        if self.max_evals is not None:
+            n = min(n, self.max_evals - self.asked)
+        return n
+
+    def ask(self, n: int = 1) -> np.ndarray:
+        n = min(n, self.batch_size)
+        if n <= 0:
+            return np.empty((0, self.num_params))
+        X = self._X[self._next: self._next + n].copy()
+        self._next += n
+        self.asked += n
+        return X
+
+    def tell(
+        self, X: np.ndarray, y: np.ndarray, settle_times: np.ndarray | None = None
+    ) -> None:
+        """Report the values `y` of the points `X`, optionally with the
+        motor settle times, which are kept in the `history`
+
+        Raises ValueError without changing the state if any point was not
+        asked or is already told."""
+        X = np.ascontiguousarray(X, dtype=np.float64).reshape(-1, self.num_params)
+        y = np.asarray(y, dtype=np.float64).ravel()
+        if len(X) != len(y):
+            msg = f"Got {len(X)} points but {len(y)} values"
+            raise ValueError(msg)
+        taken: dict[bytes, int] = {}
+        batch_rows = []
+        for x in X:
+            key = x.tobytes()
+            rows = self._rows.get(key, ())
+            k = taken.get(key, 0)
+            if k >= len(rows):
+                msg = f"{x} was not asked or is already told"
+                raise ValueError(msg)
+            taken[key] = k + 1
+            batch_rows.append(rows[k])
+        for key, k in taken.items():
+            del self._rows[key][:k]
+        if batch_rows:
+            self._y[batch_rows] = y
+        self.evals += len(y)
+        self.history.extend(X, y, settle_time=settle_times)
+        if len(y):
+            i = int(np.argmin(y))
+            if y[i] < self.best_y:
+                self.best_x, self.best_y = X[i].copy(), float(y[i])
+        if self._y is not None and not np.isnan(self._y).any():
+            U, U_eval, y_batch = self._U, self.bounds.to_unit(self._X), self._y
+            self._U = self._X = self._y = None
+            self._update(U, U_eval, y_batch)
+
+    def step(
+        self,
+        params: np.ndarray[Any, np.float64],
+        func: Callable[[np.ndarray[Any, np.float64]], float],
+    ) -> float:
+        """Evaluate the current batch with `func`, writes the best point so
+        far into `params` and returns its value"""
+        X = self.ask(self.batch_size)
+        if len(X):
+            self.tell(X, evaluate_batch(func, X))
+        if self.best_x is not None:
+            params[:] = self.best_x
+        return self.best_y
+
+    def get_history(self) -> np.ndarray[Any, float]:
+        """Evaluated points and values, one ``(*x, y)`` row per evaluation,
+        as a view of the `history`"""
+        return self.history.get_history()
+
+
+class CMAES(PhasedOptimizer):
+    """
+    Covariance matrix adaptation evolution strategy
+
+    Parameters
+    ----------
+    sigma0 : float
+        Initial step size relative to the width of the bounds
+    popsize : int | None
+        Points per generation, ``4 + 3 ln(n)`` if None
+    xtol : float
+        Converged once the search distribution is narrower than `xtol`
+        parameter units, e.g. one motor step
+    """
+
+    def __init__(
+        self,
+        bounds: Bounds,
+        x0: Sequence[float] | np.ndarray | None = None,
+        sigma0: float = 0.2,
+        popsize: int | None = None,
+        max_evals: int | None = None,
+        xtol: float = 1.0,
+        seed: int | None = None,
+    ) -> None:
+        super().__init__(bounds, x0, max_evals, seed)
+        n = self.num_params
+        self.popsize = popsize or 4 + int(3 * math.log(n))
+        self.mu = self.popsize // 2
+        w = math.log(self.mu + 0.5) - np.log(np.arange(1, self.mu + 1))
+        self.weights = w / w.sum()
+        self.mueff = 1 / np.sum(self.weights**2)
+        self.cc = (4 + self.mueff / n) / (n + 4 + 2 * self.mueff / n)
+        self.cs = (self.mueff + 2) / (n + self.mueff + 5)
+        self.c1 = 2 / ((n + 1.3) ** 2 + self.mueff)
+        self.cmu = min(
+            1 - self.c1, 2 * (self.mueff - 2 + 1 / self.mueff) / ((n + 2) ** 2 + self.mueff)
+        )
+        self.damps = 1 + 2 * max(0.0, math.sqrt((self.mueff - 1) / (n + 1)) - 1) + self.cs
+        self.chi_n = math.sqrt(n) * (1 - 1 / (4 * n) + 1 / (21 * n**2))
+        self.xtol_unit = float(np.min(xtol / bounds.width))
+        self.mean = self.x0.copy()
+        self.sigma = sigma0
+        self.C = np.eye(n)
+        self.B = np.eye(n)
+        self.D = np.ones(n)
+        self.pc = np.zeros(n)
+        self.ps = np.zeros(n)
+        self.generation = 0
+
+    def _next_batch(self) -> np.ndarray:
+        z = self.rng.standard_normal((self.popsize, self.num_params))
+        return self.mean + self.sigma * (z * self.D) @ self.B.T
+
+    def _update(self, U: np.ndarray, U_eval: np.ndarray, y: np.ndarray) -> None:  # noqa: ARG002
+        n = self.num_params
+        order = np.argsort(y)[: self.mu]
+        old_mean = self.mean
+        steps = (U[order] - old_mean) / self.sigma
+        shift = self.weights @ steps
+        self.mean = np.clip(old_mean + self.sigma * shift, 0.0, 1.0)
+        inv_sqrt_c = self.B @ np.diag(1 / self.D) @ self.B.T
+        self.ps = (1 - self.cs) * self.ps + math.sqrt(
+            self.cs * (2 - self.cs) * self.mueff) * inv_sqrt_c @ shift
+        ps_norm = np.linalg.norm(self.ps)
+        self.generation += 1
+        hsig = ps_norm / math.sqrt(1 - (1 - self.cs) ** (2 * self.generation)) / self.chi_n
+        hsig = float(hsig < 1.4 + 2 / (n + 1))
+        self.pc = (1 - self.cc) * self.pc + hsig * math.sqrt(
+            self.cc * (2 - self.cc) * self.mueff) * shift
+        rank_mu = (steps * self.weights[:, None]).T @ steps
+        self.C = (
+            (1 - self.c1 - self.cmu) * self.C
+            + self.c1 * (np.outer(self.pc, self.pc)
+                         + (1 - hsig) * self.cc * (2 - self.cc) * self.C)
+            + self.cmu * rank_mu
+        )
+        self.sigma *= math.exp(min(1.0, (self.cs / self.damps) * (ps_norm / self.chi_n - 1)))
+        self.C = np.triu(self.C) + np.triu(self.C, 1).T
+        d2, self.B = np.linalg.eigh(self.C)
+        self.D = np.sqrt(np.maximum(d2, 1e-20))
+        if self.sigma * self.D.max() < self.xtol_unit:
+            self.converged = True
+
+
+class NelderMead(PhasedOptimizer):
+    """
+    Nelder-Mead simplex search restricted to the bounds
+
+    By default only the trial points the classic algorithm needs are
+    proposed, one or two per iteration. With ``speculative=True`` the
+    reflection, expansion and both contractions are proposed together,
+    which uses more evaluations but needs fewer rounds, e.g. for objectives
+    evaluating batches at once.
+
+    Parameters
+    ----------
+    initial_step : float
+        Size of the initial simplex relative to the width of the bounds
+    xtol : float
+        Converged once all vertices are closer than `xtol` parameter units
+        to the best vertex
+    """
+
+    def __init__(
+        self,
+        bounds: Bounds,
+        x0: Sequence[float] | np.ndarray | None = None,
+        initial_step: float = 0.05,
+        speculative: bool = False,
+        max_evals: int | None = None,
+        xtol: float = 1.0,
+        seed: int | None = None,
+    ) -> None:
+        super().__init__(bounds, x0, max_evals, seed)
+        self.initial_step = initial_step
+        self.speculative = speculative
+        self.xtol = xtol
+        self.simplex: np.ndarray | None = None
+        self.values: np.ndarray | None = None
+        self._stage = "init"
+        self._trials: dict[str, np.ndarray] = {}
+        self._trial_values: dict[str, float] = {}
+
+    def _initial_simplex(self) -> np.ndarray:
+        n = self.num_params
+        simplex = np.repeat(self.x0[None, :], n + 1, axis=0)
+        for i in range(n):
+            step = self.initial_step if self.x0[i] + self.initial_step <= 1 else -self.initial_step
+            simplex[i + 1, i] += step
+        return simplex
+
+    def _next_batch(self) -> np.ndarray:
+        if self.simplex is None:
+            return self._initial_simplex()
+        if self._stage == "shrink":
+            return self.simplex[0] + 0.5 * (self.simplex[1:] - self.simplex[0])
+        if self._stage == "reflect":
+            centroid = self.simplex[:-1].mean(axis=0)
+            d = centroid - self.simplex[-1]
+            self._trials = {
+                "reflect": np.clip(centroid + d, 0, 1),
+                "expand": np.clip(centroid + 2 * d, 0, 1),
+                "outside": np.clip(centroid + 0.5 * d, 0, 1),
+                "inside": np.clip(centroid - 0.5 * d, 0, 1),
+            }
+            self._trial_values = {}
+            if self.speculative:
+                self._stage = "trials"
+                return np.array(list(self._trials.values()))
+        return self._trials[self._stage][None, :]
+
+    def _update(self, U: np.ndarray, U_eval: np.ndarray, y: np.ndarray) -> None:  # noqa: ARG002
+        if self._stage == "init":
+            self.simplex, self.values = U_eval, y
+        elif self._stage == "shrink":
+            self.simplex[1:], self.values[1:] = U_eval, y
+        else:
+            if self._stage == "trials":
+                self._trials = dict(zip(self._trials, U_eval, strict=True))
+                self._trial_values = dict(zip(self._trials, y, strict=True))
+            else:
+                self._trials[self._stage] = U_eval[0]
+                self._trial_values[self._stage] = y[0]
+            accepted = self._decide()
+            if accepted is None:
+                return
+            if accepted == "shrink":
+                self._stage = "shrink"
+                return
+            self.simplex[-1] = self._trials[accepted]
+            self.values[-1] = self._trial_values[accepted]
+        order = np.argsort(self.values, kind="stable")
+        self.simplex, self.values = self.simplex[order], self.values[order]
+        self._stage = "reflect"
+        spread = np.abs(self.bounds.from_unit(self.simplex) - self.bounds.from_unit(self.simplex[0]))
+        if np.all(spread < self.xtol):
+            self.converged = True
+
+    def _decide(self) -> str | None:
+        """Apply the Nelder-Mead rules to the known trial values, returns the
+        accepted trial, "shrink", or None if another trial is needed"""
+        f = self._trial_values
+        best, second_worst, worst = self.values[0], self.values[-2], self.values[-1]
+        fr = f["reflect"]
+        if fr < best:
+            if "expand" not in f:
+                self._stage = "expand"
+                return None
+            return "expand" if f["expand"] < fr else "reflect"
+        if fr < second_worst:
+            return "reflect"
+        if fr < worst:
+            if "outside" not in f:
+                self._stage = "outside"
+                return None
+            return "outside" if f["outside"] <= fr else "shrink"
+        if "inside" not in f:
+            self._stage = "inside"
+            return None
+        return "inside" if f["inside"] < worst else "shrink"
+
+
+class SPSA(PhasedOptimizer):
+    """
+    Simultaneous perturbation stochastic approximation
+
+    Estimates the gradient from two evaluations per perturbation, whatever
+    the number of parameters, and is robust against noisy objectives.
+
+    Parameters
+    ----------
+    step_size : float
+        Length of the first step relative to the width of the bounds, the
+        gain ``a`` is calibrated from the first gradient estimate
+    perturbation : float
+        Initial perturbation relative to the width of the bounds, never
+        smaller than one step of integer parameters
+    num_perturbations : int
+        Perturbations averaged per gradient estimate
+    alpha, gamma : float
+        Decay exponents of the step size and the perturbation
+    """
+
+    def __init__(
+        self,
+        bounds: Bounds,
+        x0: Sequence[float] | np.ndarray | None = None,
+        step_size: float = 0.02,
+        perturbation: float = 0.02,
+        num_perturbations: int = 1,
+        alpha: float = 0.602,
+        gamma: float = 0.101,
+        max_evals: int | None = None,
+        seed: int | None = None,
+    ) -> None:
+        super().__init__(bounds, x0, max_evals, seed)
+        self.x = self.x0.copy()
+        self.step_size = step_size
+        self.perturbation = perturbation
+        self.num_perturbations = num_perturbations
+        self.alpha = alpha
+        self.gamma = gamma
+        self.stability = 0.1 * (max_evals or 1000) / (2 * num_perturbations)
+        self.min_perturbation = np.where(bounds.integer, 1 / bounds.width, 0.0)
+        self.a: float | None = None
+        self.k = 0
+
+    def _next_batch(self) -> np.ndarray:
+        ck = np.maximum(self.perturbation / (self.k + 1) ** self.gamma, self.min_perturbation)
+        delta = self.rng.choice([-1.0, 1.0], size=(self.num_perturbations, self.num_params))
+        return np.concatenate([self.x + ck * delta, self.x - ck * delta])
+
+    def _update(self, U: np.ndarray, U_eval: np.ndarray, y: np.ndarray) -> None:  # noqa: ARG002
+        m = self.num_perturbations
+        diff = U_eval[:m] - U_eval[m:]
+        dy = (y[:m] - y[m:])[:, None]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            g = np.where(diff != 0, dy / diff, 0.0).mean(axis=0)
+        if self.a is None:
+            scale = np.abs(g).mean()
+            if scale == 0:
+                return
+            self.a = self.step_size * (self.stability + 1) ** self.alpha / scale
+        ak = self.a / (self.k + 1 + self.stability) ** self.alpha
+        self.x = np.clip(self.x - ak * g, 0.0, 1.0)
+        self.k += 1
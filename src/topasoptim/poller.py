@@ -0,0 +1,224 @@
+from __future__ import annotations
+
+import dataclasses
+import logging
+import threading
+import time
+from collections.abc import Callable, Iterable, Mapping
+from types import MappingProxyType
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from .TopasModel import Topas
+
+logger = logging.getLogger(__name__)
+
+MotorCallback = Callable[[str, "MotorSnapshot"], None]
+
+
+@dataclasses.dataclass(frozen=True)
+class MotorSnapshot:
+    """Immutable state of all motors at one point in time
+
+    Attributes
+    ----------
+    timestamp : float
+        `time.time` when the request the snapshot was made from was sent
+    actual_positions : Mapping[str, int]
+        Actual position of each motor in steps
+    target_positions : Mapping[str, int]
+        Target position of each motor in steps
+    """
+    timestamp: float
+    actual_positions: Mapping[str, int]
+    target_positions: Mapping[str, int]
+
+    @classmethod
+    def from_topas(cls, topas: Topas, timestamp: float | None = None) -> MotorSnapshot:
+        return cls(
+            timestamp=time.time() if timestamp is None else timestamp,
+            actual_positions=MappingProxyType(topas._actual_positions()),
+            target_positions=MappingProxyType(topas._target_positions()),
+        )
+
+    @property
+    def moving(self) -> bool:
+        "True if any motor is not at its target position"
+        return any(self.actual_positions[name] != target
+                   for name, target in self.target_positions.items())
+
+    def settled(self, names: Iterable[str]) -> bool:
+        "True if all motors in `names` are at their target position"
+        return all(self.actual_positions[name] == self.target_positions[name]
+                   for name in names)
+
+    def changed_motors(self, other: MotorSnapshot | None) -> list[str]:
+        "Names of the motors whose positions differ from `other`"
+        if other is None:
+            return list(self.actual_positions)
+        return [name for name in self.actual_positions
+                if self.actual_positions[name] != other.actual_positions.get(name)
+                or self.target_positions[name] != other.target_positions.get(name)]
+
+
+@dataclasses.dataclass
+class MotorPoller:
+    """Polls the motor positions of a `Topas` in a background thread
+
+    While any motor moves, the positions are polled every `fast_interval`
+    seconds, otherwise every `slow_interval` seconds. Readers get the last
+    `MotorSnapshot` without a request to the OPA, and callbacks subscribed
+    to a motor are called from the polling thread when its position changes.
+    `Topas.update_motor_positions` takes the same lock as a poll, so the
+    polling thread and other callers never update the motor table at the
+    same time.
+
+    Attributes
+    ----------
+    topas : Topas
+        The OPA to poll
+    fast_interval : float
+        Poll interval in seconds while motors are moving
+    slow_interval : float
+        Poll interval in seconds while all motors are idle
+    """
+    topas: Topas
+    fast_interval: float = 0.02
+    slow_interval: float = 0.5
+    _snapshot: MotorSnapshot | None = dataclasses.field(init=False, default=None)
+    _subscribers: dict[str | None, list[MotorCallback]] = dataclasses.field(
+        init=False, default_factory=dict)
+    _lock: threading.Lock = dataclasses.field(init=False, default_factory=threading.Lock)
+    _poll_lock: threading.RLock = dataclasses.field(
+        init=False, default_factory=threading.RLock)
+    _polled: threading.Condition = dataclasses.field(
+        init=False, default_factory=threading.Condition)
+    _wake: threading.Event = dataclasses.field(init=False, default_factory=threading.Event)
+    _stop: threading.Event = dataclasses.field(init=False, default_factory=threading.Event)
+    _thread: threading.Thread | None = dataclasses.field(init=False, default=None)
+    polls: int = dataclasses.field(init=False, default=0)
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    @property
+    def poll_lock(self) -> threading.RLock:
+        "Held during every poll, hold it to update the motor table in between"
+        return self._poll_lock
+
+    def start(self) -> MotorPoller:
+        "Start the polling thread, the first snapshot is taken before returning"
+        if self.running:
+            return self
+        self.poll_once()
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._run, name="topas-poller", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        "Stop the polling thread"
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        with self._polled:
+            self._polled.notify_all()
+
+    def wake(self) -> None:
+        "Poll immediately and switch to the fast rate, e.g. after a move"
+        self._wake.set()
+
+    def snapshot(self) -> MotorSnapshot:
+        "The latest snapshot, polls once if there is none yet"
+        snapshot = self._snapshot
+        if snapshot is None:
+            return self.poll_once()
+        return snapshot
+
+    def wait(
+        self, predicate: Callable[[MotorSnapshot], bool], since: float, timeout: float
+    ) -> MotorSnapshot | None:
+        """Wait for a snapshot polled after the `time.time` `since` for which
+        `predicate` is true, returns None after `timeout` seconds
+
+        Wakes the poller, so the first snapshot after `since` is taken at
+        once."""
+        deadline = time.monotonic() + timeout
+        self.wake()
+        with self._polled:
+            while True:
+                snapshot = self._snapshot
+                if (snapshot is not None and snapshot.timestamp >= since
+                        and predicate(snapshot)):
+                    return snapshot
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or not self.running:
+                    return None
+                self._polled.wait(remaining)
+
+    def subscribe(
+        self, callback: MotorCallback, names: Iterable[str] | None = None
+    ) -> Callable[[], None]:
+        """Call ``callback(name, snapshot)`` whenever a motor in `names`
+        changes, all motors if `names` is None. Returns a function which
+        removes the subscription."""
+        keys: list[str | None] = [None] if names is None else list(names)
+        with self._lock:
+            for key in keys:
+                self._subscribers.setdefault(key, []).append(callback)
+
+        def unsubscribe() -> None:
+            with self._lock:
+                for key in keys:
+                    self._subscribers[key].remove(callback)
+
+        return unsubscribe
+
+    def poll_once(self) -> MotorSnapshot:
+        "Update the motor positions, publish a new snapshot and notify subscribers"
+        with self._poll_lock:
+            sent = time.time()
+            self.topas.update_motor_positions()
+            self.polls += 1
+            snapshot = MotorSnapshot.from_topas(self.topas, sent)
+            with self._polled:
+                previous, self._snapshot = self._snapshot, snapshot
+                self._polled.notify_all()
+        changed = snapshot.changed_motors(previous)
+        if changed:
+            self._notify(changed, snapshot)
+        return snapshot
+
+    def _notify(self, changed: list[str], snapshot: MotorSnapshot) -> None:
+        with self._lock:
+            callbacks = [(name, cb) for name in changed
+                         for key in (name, None)
+                         for cb in self._subscribers.get(key, ())]
+        for name, cb in callbacks:
+            try:
+                cb(name, snapshot)
+            except Exception:
+                logger.exception("Motor callback %r failed", cb)
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            moving = self._snapshot is not None and self._snapshot.moving
+            self._wake.wait(self.fast_interval if moving else self.slow_interval)
+            self._wake.clear()
+            if self._stop.is_set():
+                break
+            try:
+                self.poll_once()
+            except Exception:
+                logger.exception("Polling the motor positions failed")
+                self._stop.wait(self.slow_interval)
+
+    def __enter__(self) -> MotorPoller:
+        return self.start()
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.stop()
@@ -0,0 +1,170 @@
+from __future__ import annotations
+
+from collections.abc import Callable, Iterable, Iterator, Mapping
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING, Any, TypeVar
+
+from .instrumentation import EndpointStats
+from .poller import MotorSnapshot
+from .TopasModel import Topas, TopasConnection, make_session
+
+if TYPE_CHECKING:
+    import requests
+
+T = TypeVar("T")
+
+
+class TopasPool(Mapping[str, Topas]):
+    """
+    Several OPAs controlled concurrently
+
+    The connections of all devices share one keep-alive session and one
+    executor for `TopasConnection.put_many`. Device operations run on a
+    separate executor with one thread per device, so the blocking `Topas`
+    calls of different devices overlap. Each connection keeps its own
+    `ConnectionStats`.
+
+    Create a pool with `connect`, or wrap connections with the constructor.
+    Devices are looked up by name like in a dict.
+
+    Parameters
+    ----------
+    connections : Mapping[str, TopasConnection]
+        Connection of each device by name
+    session : requests.Session | None
+        Session shared by the connections, closed with the pool
+    put_executor : ThreadPoolExecutor | None
+        Executor shared by the connections, shut down with the pool
+    """
+
+    def __init__(
+        self,
+        connections: Mapping[str, TopasConnection],
+        session: requests.Session | None = None,
+        put_executor: ThreadPoolExecutor | None = None,
+    ) -> None:
+        self.connections = dict(connections)
+        self._session = session
+        self._put_executor = put_executor
+        self._executor = ThreadPoolExecutor(
+            max_workers=max(len(self.connections), 1), thread_name_prefix="topas-pool")
+        self.devices: dict[str, Topas] = {}
+        try:
+            self.devices = self.map(
+                lambda name: Topas(connection=self.connections[name]), self.connections)
+        except BaseException:
+            self.close()
+            raise
+
+    @classmethod
+    def connect(
+        cls,
+        devices: Mapping[str, Mapping[str, Any]],
+        pool_size: int = 4,
+        max_retries: int = 2,
+        stats: bool = True,
+        **kwargs: Any,
+    ) -> TopasPool:
+        """Connect to the devices and initialize them in parallel
+
+        `devices` maps a name to the arguments of `TopasConnection.from_info`
+        of each device, e.g. ``{"opa1": {"serial_number": "14187"}}``, the
+        remaining keyword arguments are passed to all connections.
+        """
+        session = make_session(pool_size, max_retries, num_hosts=max(len(devices), 1))
+        executor = ThreadPoolExecutor(
+            max_workers=pool_size * max(len(devices), 1), thread_name_prefix="topas-put")
+        connections = {}
+        for name, info in devices.items():
+            conn = TopasConnection.from_info(
+                **info, pool_size=pool_size, max_retries=max_retries,
+                session=session, executor=executor, **kwargs)
+            if stats:
+                conn.enable_stats()
+            connections[name] = conn
+        return cls(connections, session=session, put_executor=executor)
+
+    def __getitem__(self, name: str) -> Topas:
+        return self.devices[name]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.devices)
+
+    def __len__(self) -> int:
+        return len(self.devices)
+
+    def map(
+        self,
+        func: Callable[[str], T],
+        names: Iterable[str] | None = None,
+        return_exceptions: bool = False,
+    ) -> dict[str, T]:
+        """Call ``func(name)`` for the devices `names`, all if None, in
+        parallel. Raises the first error after all calls finished, unless
+        `return_exceptions`, which returns the errors as results."""
+        names = list(self.devices if names is None else names)
+        futures = {name: self._executor.submit(func, name) for name in names}
+        results: dict[str, Any] = {}
+        error: BaseException | None = None
+        for name, future in futures.items():
+            try:
+                results[name] = future.result()
+            except Exception as err:
+                results[name] = err
+                error = error or err
+        if error is not None and not return_exceptions:
+            raise error
+        return results
+
+    def run(self, func: Callable[[Topas], T], names: Iterable[str] | None = None) -> dict[str, T]:
+        "Call ``func(topas)`` for each device in parallel, e.g. an optimization"
+        return self.map(lambda name: func(self.devices[name]), names)
+
+    def snapshots(self) -> dict[str, MotorSnapshot]:
+        "Motor state of all devices, polled concurrently"
+        return self.run(Topas.snapshot)
+
+    def move_motors(
+        self, targets: Mapping[str, dict[str, int]], wait: bool = False, **kwargs: Any
+    ) -> dict[str, float | None]:
+        """Move motors of several devices at once, `targets` maps a device to
+        its motor positions, see `Topas.move_motors`"""
+        return self.map(
+            lambda name: self.devices[name].move_motors(targets[name], wait=wait, **kwargs),
+            targets)
+
+    def start_polling(self, fast_interval: float = 0.02, slow_interval: float = 0.5) -> None:
+        "Start the background poller of every device"
+        for topas in self.devices.values():
+            topas.start_polling(fast_interval, slow_interval)
+
+    def stop_polling(self) -> None:
+        for topas in self.devices.values():
+            topas.stop_polling()
+
+    def stats(self) -> dict[str, dict[str, EndpointStats]]:
+        "Request statistics of each device by endpoint"
+        return {name: conn.stats.snapshot() for name, conn in self.connections.items()
+                if conn.stats is not None}
+
+    def summary(self) -> dict[str, dict[str, dict[str, float]]]:
+        "Latency summary of each device by endpoint, see `ConnectionStats.summary`"
+        return {name: conn.stats.summary() for name, conn in self.connections.items()
+                if conn.stats is not None}
+
+    def close(self) -> None:
+        "Stop the pollers and close all connections"
+        self.stop_polling()
+        self._executor.shutdown(wait=True)
+        for conn in self.connections.values():
+            conn.close()
+        if self._put_executor is not None:
+            self._put_executor.shutdown(wait=True)
+        if self._session is not None:
+            self._session.close()
+
+    def __enter__(self) -> TopasPool:
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
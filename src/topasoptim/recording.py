@@ -0,0 +1,352 @@
+from __future__ import annotations
+
+import dataclasses
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from collections.abc import Mapping, Sequence
+from pathlib import Path
+from typing import TYPE_CHECKING, Any
+
+import numpy as np
+
+if TYPE_CHECKING:
+    from .TopasModel import MotorTable
+
+logger = logging.getLogger(__name__)
+
+INDEX_NAME = "index.json"
+
+_STOP = object()
+
+
+class _Stream:
+    "Rows of one kind, written to numbered .npy or .npz segments"
+
+    def __init__(self, root: Path, name: str, width: int, rows: int, compress: bool) -> None:
+        self.root = root
+        self.name = name
+        self.width = width
+        self.rows = rows
+        self.compress = compress
+        self.segments: list[dict[str, Any]] = []
+        self._data: np.ndarray | None = None
+        self._n = 0
+
+    def _path(self) -> Path:
+        suffix = ".npz" if self.compress else ".npy"
+        return self.root / f"{self.name}-{len(self.segments):05d}{suffix}"
+
+    def _open(self) -> None:
+        if self.compress:
+            self._data = np.empty((self.rows, self.width))
+        else:
+            self._data = np.lib.format.open_memmap(
+                self._path(), mode="w+", shape=(self.rows, self.width))
+        self._n = 0
+
+    def write(self, row: np.ndarray) -> None:
+        if self._data is None:
+            self._open()
+        self._data[self._n] = row
+        self._n += 1
+        if self._n == self.rows:
+            self._finish()
+
+    def _finish(self) -> None:
+        "Close the current segment, a partial one is cut to its rows"
+        data, n, path = self._data, self._n, self._path()
+        self._data = None
+        if self.compress:
+            np.savez_compressed(path, data=data[:n])
+        elif n < self.rows:
+            partial = np.array(data[:n])
+            del data
+            np.save(path, partial)
+        else:
+            data.flush()
+        self.segments.append({"file": path.name, "rows": n})
+
+    def flush(self) -> None:
+        if self._data is not None and not self.compress:
+            self._data.flush()
+
+    def close(self) -> None:
+        if self._data is not None and self._n:
+            self._finish()
+        self._data = None
+
+    def index(self) -> dict[str, Any]:
+        "Index entry, the open segment is listed with the rows written so far"
+        segments = list(self.segments)
+        if self._data is not None and not self.compress:
+            segments.append({"file": self._path().name, "rows": self._n})
+        return {"width": self.width, "segments": segments}
+
+
+class SessionRecorder:
+    """
+    Records motor snapshots, moves and spectra of a run to a directory
+
+    Every kind of record is a stream of float64 rows, written to numbered
+    segments of `segment_rows` rows. Uncompressed segments are memory-mapped
+    ``.npy`` files, compressed ones are written as ``.npz`` once full. The
+    JSON index lists the segments, the motor names, the wavelength axis and
+    other events, and is rewritten every `flush_interval` seconds, so a
+    crashed run can still be read up to the last flush.
+
+    The ``record_*`` methods only put the data into a queue of at most
+    `max_queue` records and never block, the files are written by a
+    background thread. Records which do not fit into the full queue are
+    counted in `dropped`.
+
+    Rows of the streams:
+
+    ``motors``
+        time, actual positions, target positions, in the order of `motor_names`
+    ``moves``
+        time, motor index, target position
+    ``spectra``
+        time, spectrum
+
+    Parameters
+    ----------
+    path : str | os.PathLike
+        Directory of the session, created if needed
+    segment_rows : int
+        Rows per segment file
+    compress : bool
+        Write compressed ``.npz`` segments
+    max_queue : int
+        Records buffered before new ones are dropped
+    flush_interval : float
+        Seconds between flushes of the files and the index
+    """
+
+    def __init__(
+        self,
+        path: str | os.PathLike[str],
+        segment_rows: int = 4096,
+        compress: bool = False,
+        max_queue: int = 10_000,
+        flush_interval: float = 1.0,
+    ) -> None:
+        self.path = Path(path)
+        self.path.mkdir(parents=True, exist_ok=True)
+        self.segment_rows = segment_rows
+        self.compress = compress
+        self.flush_interval = flush_interval
+        self.dropped = 0
+        self.recorded = 0
+        self.motor_names: list[str] = []
+        self.motor_indices: list[int] = []
+        self.wavelengths: list[float] | None = None
+        self.events: list[dict[str, Any]] = []
+        self.started = time.time()
+        self._streams: dict[str, _Stream] = {}
+        self._queue: queue.Queue[Any] = queue.Queue(max_queue)
+        self._dropped_lock = threading.Lock()
+        self._thread = threading.Thread(
+            target=self._run, name="session-recorder", daemon=True)
+        self._thread.start()
+
+    def _put(self, item: tuple[Any, ...]) -> None:
+        try:
+            self._queue.put_nowait(item)
+        except queue.Full:
+            with self._dropped_lock:
+                self.dropped += 1
+
+    def record_motors(self, table: MotorTable, timestamp: float | None = None) -> None:
+        """Record the actual and target positions of all motors in `table`
+
+        The columns keep the motor order of the first call, even if the
+        table is reordered later. Motors missing from `table` after the
+        motor set changed are recorded as NaN, new motors are ignored."""
+        if not self.motor_names:
+            self.motor_names = list(table.names)
+            self.motor_indices = table.data["index"].tolist()
+        n = len(self.motor_indices)
+        row = np.full(1 + 2 * n, np.nan)
+        row[0] = time.time() if timestamp is None else timestamp
+        for col, index in enumerate(self.motor_indices):
+            i = table.row_of_index.get(index)
+            if i is not None:
+                row[1 + col] = table.data["actual_position"][i]
+                row[1 + n + col] = table.data["target_position"][i]
+        self._put(("motors", row))
+
+    def record_moves(
+        self, targets: Mapping[int, int], timestamp: float | None = None
+    ) -> None:
+        "Record new target positions by motor index"
+        t = time.time() if timestamp is None else timestamp
+        for index, position in targets.items():
+            self._put(("moves", np.array([t, index, position], dtype=np.float64)))
+
+    def record_spectrum(
+        self,
+        values: np.ndarray,
+        timestamp: float | None = None,
+        wavelengths: Sequence[float] | None = None,
+    ) -> None:
+        "Record a spectrum, `values` is copied and may be reused by the caller"
+        if wavelengths is not None and self.wavelengths is None:
+            self.wavelengths = [float(w) for w in wavelengths]
+        row = np.empty(len(values) + 1)
+        row[0] = time.time() if timestamp is None else timestamp
+        row[1:] = values
+        self._put(("spectra", row))
+
+    def record_event(self, kind: str, **data: Any) -> None:
+        "Record a rare event like moving to a saved position in the index"
+        self._put(("event", {"time": time.time(), "kind": kind, **data}))
+
+    def _write(self, item: tuple[str, Any]) -> None:
+        name, row = item
+        if name == "event":
+            self.events.append(row)
+            return
+        stream = self._streams.get(name)
+        if stream is None:
+            stream = self._streams[name] = _Stream(
+                self.path, name, len(row), self.segment_rows, self.compress)
+        if len(row) != stream.width:
+            logger.warning("Dropped a %s record of width %d instead of %d",
+                           name, len(row), stream.width)
+            return
+        stream.write(row)
+        self.recorded += 1
+
+    def _run(self) -> None:
+        next_flush = time.monotonic() + self.flush_interval
+        while True:
+            try:
+                item = self._queue.get(timeout=max(next_flush - time.monotonic(), 0))
+            except queue.Empty:
+                item = None
+            if item is _STOP:
+                break
+            if item is not None:
+                try:
+                    self._write(item)
+                except Exception:
+                    logger.exception("Writing a session record failed")
+            if time.monotonic() >= next_flush:
+                self.flush()
+                next_flush = time.monotonic() + self.flush_interval
+        for stream in self._streams.values():
+            stream.close()
+        self._write_index()
+
+    def flush(self) -> None:
+        "Flush the open segments and rewrite the index, called by the writer thread"
+        for stream in self._streams.values():
+            stream.flush()
+        self._write_index()
+
+    def _write_index(self) -> None:
+        index = {
+            "started": self.started,
+            "motor_names": self.motor_names,
+            "motor_indices": self.motor_indices,
+            "wavelengths": self.wavelengths,
+            "events": self.events,
+            "dropped": self.dropped,
+            "streams": {name: s.index() for name, s in self._streams.items()},
+        }
+        tmp = self.path / (INDEX_NAME + ".tmp")
+        tmp.write_text(json.dumps(index))
+        tmp.replace(self.path / INDEX_NAME)
+
+    def close(self) -> None:
+        "Write all queued records, close the segments and write the index"
+        if self._thread.is_alive():
+            self._queue.put(_STOP)
+            self._thread.join()
+
+    def __enter__(self) -> SessionRecorder:
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
+
+
+@dataclasses.dataclass
+class RecordedSession:
+    """
+    A session written by `SessionRecorder`
+
+    Attributes
+    ----------
+    motor_names : list[str]
+        Motor names, the column order of the motor positions
+    motor_indices : list[int]
+        API index of each motor
+    motor_time : np.ndarray
+        Time of each motor snapshot
+    actual_positions, target_positions : np.ndarray
+        ``(n_snapshots, n_motors)`` motor positions
+    moves : np.ndarray
+        ``(n_moves, 3)`` rows of time, motor index and target position
+    spectrum_time : np.ndarray
+        Time of each spectrum
+    spectra : np.ndarray
+        ``(n_spectra, n_pixels)`` spectra
+    wavelengths : np.ndarray | None
+        Wavelength axis of the spectra
+    events : list[dict]
+        Other events
+    """
+    motor_names: list[str]
+    motor_indices: list[int]
+    motor_time: np.ndarray
+    actual_positions: np.ndarray
+    target_positions: np.ndarray
+    moves: np.ndarray
+    spectrum_time: np.ndarray
+    spectra: np.ndarray
+    wavelengths: np.ndarray | None
+    events: list[dict[str, Any]]
+
+    @classmethod
+    def load(cls, path: str | os.PathLike[str]) -> RecordedSession:
+        "Read a session directory"
+        path = Path(path)
+        index = json.loads((path / INDEX_NAME).read_text())
+        streams = index["streams"]
+
+        def read(name: str, width: int) -> np.ndarray:
+            if name not in streams:
+                return np.empty((0, width))
+            parts = []
+            for seg in streams[name]["segments"]:
+                file = path / seg["file"]
+                if file.suffix == ".npz":
+                    with np.load(file) as npz:
+                        parts.append(npz["data"][: seg["rows"]])
+                else:
+                    parts.append(np.load(file, mmap_mode="r")[: seg["rows"]])
+            if not parts:
+                return np.empty((0, streams[name]["width"]))
+            return parts[0] if len(parts) == 1 else np.concatenate(parts)
+
+        names = index["motor_names"]
+        motors = read("motors", 1 + 2 * len(names))
+        spectra = read("spectra", 1)
+        wavelengths = index["wavelengths"]
+        return cls(
+            motor_names=names,
+            motor_indices=index.get("motor_indices") or list(range(len(names))),
+            motor_time=motors[:, 0],
+            actual_positions=motors[:, 1: 1 + len(names)],
+            target_positions=motors[:, 1 + len(names):],
+            moves=read("moves", 3),
+            spectrum_time=spectra[:, 0],
+            spectra=spectra[:, 1:],
+            wavelengths=None if wavelengths is None else np.asarray(wavelengths),
+            events=index["events"],
+        )
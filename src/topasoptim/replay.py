@@ -0,0 +1,256 @@
+"""
+Replay of recorded sessions for offline optimizer tuning.
+
+`ReplayConnection` stands in for a `TopasConnection` without any network,
+its motors reach their targets instantly, while the motion time the real OPA
+would have needed is accumulated. `ReplaySpectrometer` returns the spectra
+interpolated between the recordings closest to the current motor positions.
+Together they run an optimizer as fast as the CPU allows::
+
+    session = RecordedSession.load("run-1")
+    conn = ReplayConnection(session)
+    topas = Topas(connection=conn)
+    spectrometer = ReplaySpectrometer(session, conn)
+    func = make_objective(make_measure(topas, spectrometer, names), metric)
+"""
+from __future__ import annotations
+
+import uuid
+from collections.abc import Callable, Iterable, Sequence
+from typing import Any
+from urllib.parse import parse_qs, urlsplit
+
+import numpy as np
+
+from .recording import RecordedSession
+from .simulator import make_motor_properties, trapezoid_time
+from .TopasModel import Topas, format_date
+
+
+class ReplayResponse:
+    "Minimal stand-in for `requests.Response`"
+
+    def __init__(self, status_code: int, result: Any = None) -> None:
+        self.status_code = status_code
+        self.ok = status_code < 400
+        self._result = result
+
+    def json(self) -> Any:
+        return self._result
+
+
+class ReplayConnection:
+    """
+    In-process connection serving the motors of a recorded session
+
+    Implements the methods of `TopasConnection` used by `Topas`. Moves are
+    instantaneous, `motion_time` accumulates the time the moves would have
+    taken with the trapezoidal profiles of the motors.
+
+    Parameters
+    ----------
+    session : RecordedSession
+        Session providing the motors and their initial positions
+    maximal_velocity, acceleration : float
+        Motion limits of all motors, in steps/s and steps/s², used for
+        `motion_time`
+    """
+
+    def __init__(
+        self,
+        session: RecordedSession,
+        maximal_velocity: float = 4000.0,
+        acceleration: float = 20000.0,
+    ) -> None:
+        start = (session.actual_positions[0] if len(session.actual_positions)
+                 else np.zeros(len(session.motor_names)))
+        self.motors = {
+            index: make_motor_properties(
+                index, name, position=int(pos), maximal_position=2**31 - 1,
+                maximal_velocity=maximal_velocity, acceleration=acceleration)
+            for index, name, pos in zip(
+                session.motor_indices, session.motor_names, start, strict=True)
+        }
+        self.positions = {
+            index: int(pos)
+            for index, pos in zip(session.motor_indices, start, strict=True)
+        }
+        self.saved_positions: list[dict[str, Any]] = []
+        self.shutter_open = False
+        self.motion_time = 0.0
+        self.request_count = 0
+
+    def _move(self, index: int, target: int) -> None:
+        props = self.motors[index]
+        self.motion_time += trapezoid_time(
+            target - self.positions[index], props["MaximalVelocity"], props["Acceleration"])
+        self.positions[index] = int(target)
+
+    def _changing(self, index: int) -> dict[str, Any]:
+        pos = self.positions[index]
+        return {"Index": index, "ActualPosition": pos, "TargetPosition": pos,
+                "ActualPositionInUnits": 0.0, "TargetPositionInUnits": 0.0}
+
+    def get(self, url: str) -> Any:
+        self.request_count += 1
+        path = urlsplit(url).path
+        if path == "/Motors/AllProperties":
+            return {"Motors": [{**props, **self._changing(i)}
+                               for i, props in self.motors.items()]}
+        if path == "/Motors/PropertiesThatChangeOften":
+            return [self._changing(i) for i in self.motors]
+        if path == "/Positions":
+            return self.saved_positions
+        if path == "/ShutterInterlock/IsShutterOpen":
+            return self.shutter_open
+        if path == "/CallerHasAccess":
+            return True
+        msg = f"Unknown url: {url}"
+        raise KeyError(msg)
+
+    def put(self, url: str, data: Any) -> ReplayResponse:
+        self.request_count += 1
+        parts = urlsplit(url)
+        if parts.path in ("/TargetPosition", "/Motors/TargetPosition"):
+            self._move(int(parse_qs(parts.query)["id"][0]), int(data))
+        elif parts.path == "/MoveMotorsToPosition":
+            setting = next((p for p in self.saved_positions if p["GUID"] == data), None)
+            if setting is None:
+                return ReplayResponse(400, f"Unknown position: {data}")
+            for pos in setting["MotorPositions"]:
+                self._move(pos["Key"], pos["Value"])
+        elif parts.path == "/ShutterInterlock/OpenCloseShutter":
+            self.shutter_open = bool(data)
+        else:
+            return ReplayResponse(404, f"Unknown url: {url}")
+        return ReplayResponse(200)
+
+    def post(self, url: str, data: Any) -> ReplayResponse:
+        self.request_count += 1
+        if urlsplit(url).path != "/SaveCurrent":
+            return ReplayResponse(404, f"Unknown url: {url}")
+        data = data or {}
+        guid = str(uuid.uuid4())
+        self.saved_positions.append({
+            "Comment": "",
+            "Folder": data.get("Folder", ""),
+            "GUID": guid,
+            "MotorPositions": [{"Key": i, "Value": p} for i, p in self.positions.items()],
+            "Name": data.get("Name", ""),
+            "TimeCreated": format_date(),
+        })
+        return ReplayResponse(200, guid)
+
+    def get_many(self, urls: Iterable[str]) -> list[Any]:
+        return [self.get(url) for url in urls]
+
+    def put_many(self, items: Iterable[tuple[str, Any]]) -> list[ReplayResponse]:
+        return [self.put(url, data) for url, data in items]
+
+    def invalidate(self, *paths: str) -> None:
+        pass
+
+    def close(self) -> None:
+        pass
+
+    def __enter__(self) -> ReplayConnection:
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
+
+
+def settled_spectra(session: RecordedSession) -> tuple[np.ndarray, np.ndarray]:
+    """Motor positions and spectra of the frames recorded while all motors
+    were at their target, using the last motor snapshot before each frame"""
+    rows = np.searchsorted(session.motor_time, session.spectrum_time, side="right") - 1
+    valid = rows >= 0
+    rows = np.where(valid, rows, 0)
+    actual = session.actual_positions[rows]
+    valid &= np.all(actual == session.target_positions[rows], axis=1)
+    return np.asarray(actual[valid]), np.asarray(session.spectra[valid])
+
+
+class ReplaySpectrometer:
+    """
+    Spectrometer returning recorded spectra for the current motor positions
+
+    The spectrum is the inverse-distance weighted mean of the `k` frames
+    recorded at the nearest motor positions. `k` = 1 returns the nearest
+    frame, which makes the objective piecewise constant and stalls optimizers
+    between recorded positions. Distances are measured in units of `scale`
+    steps per motor, by default the spread of the recorded positions.
+
+    Parameters
+    ----------
+    session : RecordedSession
+        Recorded motor snapshots and spectra
+    connection : ReplayConnection
+        Provides the current motor positions
+    k : int
+        Number of neighbours averaged, by default 4, the corners of a grid
+        cell of two motors
+    scale : np.ndarray | None
+        Distance scale of each motor
+    """
+
+    def __init__(
+        self,
+        session: RecordedSession,
+        connection: ReplayConnection,
+        k: int = 4,
+        scale: np.ndarray | None = None,
+    ) -> None:
+        positions, spectra = settled_spectra(session)
+        if len(spectra) == 0:
+            msg = "the session has no spectra recorded at settled motors"
+            raise ValueError(msg)
+        self.connection = connection
+        self.motor_indices = list(session.motor_indices)
+        self.wavelengths = session.wavelengths
+        self.k = min(k, len(spectra))
+        if scale is None:
+            scale = np.ptp(positions, axis=0)
+        self.scale = np.where(np.asarray(scale, dtype=np.float64) > 0, scale, 1.0)
+        self.positions = positions / self.scale
+        self.spectra = spectra
+        self.reads = 0
+
+    def current_positions(self) -> np.ndarray:
+        pos = self.connection.positions
+        return np.array([pos[i] for i in self.motor_indices], dtype=np.float64)
+
+    def spectra_at(self, X: np.ndarray) -> np.ndarray:
+        "Spectra for the ``(n, n_motors)`` motor positions `X`"
+        Q = np.atleast_2d(np.asarray(X, dtype=np.float64)) / self.scale
+        P = self.positions
+        d2 = (np.sum(Q**2, axis=1)[:, None] - 2 * Q @ P.T
+              + np.sum(P**2, axis=1)[None, :])
+        np.maximum(d2, 0, out=d2)
+        if self.k == 1:
+            return self.spectra[np.argmin(d2, axis=1)]
+        nearest = np.argpartition(d2, self.k - 1, axis=1)[:, : self.k]
+        d = np.sqrt(np.take_along_axis(d2, nearest, axis=1))
+        w = 1 / np.maximum(d, 1e-9)
+        exact = d < 1e-9
+        w = np.where(exact.any(axis=1, keepdims=True), exact.astype(float), w)
+        w /= w.sum(axis=1, keepdims=True)
+        return np.einsum("nk,nkp->np", w, self.spectra[nearest])
+
+    def read(self) -> np.ndarray:
+        "Spectrum at the current motor positions"
+        self.reads += 1
+        return self.spectra_at(self.current_positions())[0]
+
+
+def make_measure(
+    topas: Topas, spectrometer: ReplaySpectrometer, names: Sequence[str]
+) -> Callable[[np.ndarray], np.ndarray]:
+    """Measure function for `metrics.make_objective`, moving the motors
+    `names` to the candidate and returning the replayed spectrum"""
+
+    def measure(x: np.ndarray) -> np.ndarray:
+        topas.move_motors(dict(zip(names, np.rint(x).astype(int), strict=True)), wait=True)
+        return spectrometer.read()[np.newaxis, :]
+
+    return measure
@@ -0,0 +1,236 @@
+from __future__ import annotations
+
+import dataclasses
+import itertools
+import threading
+import time
+from collections.abc import Callable, Iterator, Sequence
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import TYPE_CHECKING, Any
+
+import numpy as np
+
+if TYPE_CHECKING:
+    from .TopasModel import Topas
+
+
+@dataclasses.dataclass
+class ScanAxis:
+    """Positions of one motor in a scan
+
+    Attributes
+    ----------
+    name : str
+        Motor name
+    positions : np.ndarray
+        Positions in steps, in scan order
+    """
+    name: str
+    positions: np.ndarray
+
+    def __post_init__(self) -> None:
+        self.positions = np.rint(np.asarray(self.positions, dtype=np.float64)).astype(np.int64)
+
+    @classmethod
+    def linspace(cls, name: str, start: int, stop: int, num: int) -> ScanAxis:
+        return cls(name, np.linspace(start, stop, num))
+
+    @classmethod
+    def arange(cls, name: str, start: int, stop: int, step: int) -> ScanAxis:
+        "Positions from `start` to `stop` inclusive"
+        return cls(name, np.arange(start, stop + step / 2, step))
+
+    def __len__(self) -> int:
+        return len(self.positions)
+
+
+@dataclasses.dataclass(frozen=True)
+class ScanProgress:
+    """State of a running scan, passed to the progress callback
+
+    Attributes
+    ----------
+    done, total : int
+        Points finished and points of the scan
+    index : tuple[int, ...]
+        Grid index of the point just finished
+    elapsed : float
+        Seconds since the start of the scan
+    """
+    done: int
+    total: int
+    index: tuple[int, ...]
+    elapsed: float
+
+    @property
+    def remaining(self) -> float:
+        "Estimated seconds until the scan is finished"
+        return self.elapsed / self.done * (self.total - self.done) if self.done else float("nan")
+
+
+@dataclasses.dataclass
+class ScanResult:
+    """
+    Data of a scan on its grid
+
+    Attributes
+    ----------
+    axes : list[ScanAxis]
+        The scanned motors, one array dimension each
+    data : np.ndarray | None
+        Processed results, shape ``(*grid_shape, *result_shape)``, None if
+        no point was finished
+    done : np.ndarray
+        Boolean grid of the points finished
+    settle_time : np.ndarray
+        Seconds from the move command until the motors settled, per point
+    timestamp : np.ndarray
+        `time.time` at the end of each acquisition
+    elapsed : float
+        Duration of the scan in seconds
+    errors : dict[tuple[int, ...], Exception]
+        Exceptions raised by `process` or `progress` by grid index, the
+        points of `process` errors are not done
+    """
+    axes: list[ScanAxis]
+    data: np.ndarray | None
+    done: np.ndarray
+    settle_time: np.ndarray
+    timestamp: np.ndarray
+    elapsed: float = 0.0
+    errors: dict[tuple[int, ...], Exception] = dataclasses.field(default_factory=dict)
+
+    @property
+    def shape(self) -> tuple[int, ...]:
+        return self.done.shape
+
+
+def grid_order(shape: Sequence[int], snake: bool = True) -> Iterator[tuple[int, ...]]:
+    """Grid indices with the last axis varying fastest, with `snake` every
+    other sweep runs backwards so consecutive points are neighbours"""
+    if not snake:
+        yield from itertools.product(*(range(n) for n in shape))
+        return
+    if len(shape) == 1:
+        yield from ((i,) for i in range(shape[0]))
+        return
+    for k, outer in enumerate(grid_order(shape[:-1], snake)):
+        inner = range(shape[-1]) if k % 2 == 0 else range(shape[-1] - 1, -1, -1)
+        for i in inner:
+            yield (*outer, i)
+
+
+class Scan:
+    """
+    N-dimensional grid scan of motors with pipelined acquisition
+
+    At every grid point the motors are moved, `acquire` records the data once
+    they settled, and `process` reduces it, e.g. to a metric or a copy of the
+    spectrum. As soon as an acquisition is finished, the move to the next
+    point is sent, while `process` runs on a worker thread and writes its
+    result into the preallocated `ScanResult.data`. Only motors whose
+    position changes are moved, and with `snake` the sweeps alternate their
+    direction to avoid long moves back to the start.
+
+    Parameters
+    ----------
+    topas : Topas
+        The OPA
+    axes : Sequence[ScanAxis]
+        Motors of the scan, the first axis varies slowest
+    acquire : Callable[[], Any]
+        Records the data at the current position, must return a new array
+        or value each time
+    process : Callable[[Any], Any] | None
+        Reduces the acquired data, all results must have the same shape
+    progress : Callable[[ScanProgress], None] | None
+        Called from the worker thread after every processed point
+    snake : bool
+        Alternate the sweep direction
+    timeout : float
+        Seconds to wait for the motors at every point
+    """
+
+    def __init__(
+        self,
+        topas: Topas,
+        axes: Sequence[ScanAxis],
+        acquire: Callable[[], Any],
+        process: Callable[[Any], Any] | None = None,
+        progress: Callable[[ScanProgress], None] | None = None,
+        snake: bool = True,
+        timeout: float = 10.0,
+    ) -> None:
+        self.topas = topas
+        self.axes = list(axes)
+        self.acquire = acquire
+        self.process = process
+        self.progress = progress
+        self.snake = snake
+        self.timeout = timeout
+        self.shape = tuple(len(a) for a in self.axes)
+        self._stop = threading.Event()
+        self._result: ScanResult | None = None
+        self._done = 0
+        self._t0 = 0.0
+
+    @property
+    def total(self) -> int:
+        return int(np.prod(self.shape))
+
+    def stop(self) -> None:
+        "Stop after the current point, `run` returns the points finished"
+        self._stop.set()
+
+    def _targets(self, index: tuple[int, ...], previous: tuple[int, ...] | None) -> dict[str, int]:
+        return {axis.name: int(axis.positions[i])
+                for k, (axis, i) in enumerate(zip(self.axes, index, strict=True))
+                if previous is None or previous[k] != i}
+
+    def _store(self, index: tuple[int, ...], raw: Any) -> None:
+        value = np.asarray(raw if self.process is None else self.process(raw))
+        result = self._result
+        if result.data is None:
+            result.data = np.full((*self.shape, *value.shape), np.nan,
+                                  dtype=np.result_type(value.dtype, np.float64))
+        result.data[index] = value
+        result.done[index] = True
+        self._done += 1
+        if self.progress is not None:
+            self.progress(ScanProgress(self._done, self.total, index,
+                                       time.perf_counter() - self._t0))
+
+    def run(self) -> ScanResult:
+        """Run the scan, returns when all points are processed or after `stop`
+
+        Exceptions of `process` do not end the scan, they are collected in
+        `ScanResult.errors`."""
+        self._stop.clear()
+        self._done = 0
+        self._t0 = time.perf_counter()
+        self._result = result = ScanResult(
+            self.axes, None, np.zeros(self.shape, dtype=bool),
+            np.full(self.shape, np.nan), np.full(self.shape, np.nan))
+        order = list(grid_order(self.shape, self.snake))
+        names = [a.name for a in self.axes]
+        futures: dict[tuple[int, ...], Future[None]] = {}
+        with ThreadPoolExecutor(1, thread_name_prefix="scan-process") as worker:
+            t_move = time.perf_counter()
+            self.topas.move_motors(self._targets(order[0], None))
+            for k, index in enumerate(order):
+                self.topas.wait_for_motors(names, self.timeout)
+                result.settle_time[index] = time.perf_counter() - t_move
+                raw = self.acquire()
+                result.timestamp[index] = time.time()
+                if k + 1 < len(order) and not self._stop.is_set():
+                    t_move = time.perf_counter()
+                    self.topas.move_motors(self._targets(order[k + 1], index))
+                futures[index] = worker.submit(self._store, index, raw)
+                if self._stop.is_set():
+                    break
+        for index, future in futures.items():
+            error = future.exception()
+            if error is not None:
+                result.errors[index] = error
+        result.elapsed = time.perf_counter() - self._t0
+        return result
@@ -0,0 +1,220 @@
+from __future__ import annotations
+
+import dataclasses
+import time
+from collections.abc import Iterable, Sequence
+from typing import TYPE_CHECKING, Any
+
+import numpy as np
+
+from .OptimizerModel import BatchObjectiveFunc, ObjectiveFunc
+
+if TYPE_CHECKING:
+    from .TopasModel import Topas, TopasMotor
+
+
+def travel_times(distance: np.ndarray, vmax: np.ndarray, acc: np.ndarray) -> np.ndarray:
+    """Vectorized `simulator.trapezoid_time`, time to travel `distance` steps
+    from rest to rest"""
+    d = np.abs(distance)
+    return np.where(d * acc < vmax**2, 2 * np.sqrt(d / acc), vmax / acc + d / vmax)
+
+
+@dataclasses.dataclass
+class TravelTimeModel:
+    """
+    Predicts the settle time of a move of several motors
+
+    The motors move at the same time, so a move takes as long as its slowest
+    motor, each following a trapezoidal velocity profile.
+
+    Attributes
+    ----------
+    maximal_velocity : np.ndarray
+        Velocity limit of each motor in steps/s
+    acceleration : np.ndarray
+        Acceleration of each motor in steps/s²
+    overhead : float
+        Seconds added to every move with any travel, e.g. the polling delay
+    """
+    maximal_velocity: np.ndarray
+    acceleration: np.ndarray
+    overhead: float = 0.0
+
+    def __post_init__(self) -> None:
+        self.maximal_velocity = np.asarray(self.maximal_velocity, dtype=np.float64)
+        self.acceleration = np.asarray(self.acceleration, dtype=np.float64)
+
+    @classmethod
+    def from_motors(cls, motors: Iterable[TopasMotor], overhead: float = 0.0) -> TravelTimeModel:
+        "Model of the motors, from their ``MaximalVelocity`` and ``Acceleration``"
+        motors = list(motors)
+        missing = [m.name for m in motors
+                   if not m.maximal_velocity or not m.acceleration]
+        if missing:
+            msg = f"Motors {missing} have no maximal velocity or acceleration"
+            raise ValueError(msg)
+        return cls(np.array([m.maximal_velocity for m in motors]),
+                   np.array([m.acceleration for m in motors]), overhead)
+
+    def time(self, a: np.ndarray, b: np.ndarray) -> np.ndarray:
+        "Move times from `a` to `b`, rows of positions broadcast against each other"
+        t = travel_times(np.asarray(b, dtype=np.float64) - a,
+                         self.maximal_velocity, self.acceleration).max(axis=-1)
+        return np.where(t > 0, t + self.overhead, 0.0)
+
+    def matrix(self, X: np.ndarray) -> np.ndarray:
+        "Move times between all rows of `X`"
+        X = np.asarray(X, dtype=np.float64)
+        return self.time(X[:, None, :], X[None, :, :])
+
+    def path_time(self, X: np.ndarray, start: np.ndarray | None = None) -> float:
+        "Time to visit the rows of `X` in order, beginning at `start` if given"
+        X = np.asarray(X, dtype=np.float64)
+        if start is not None:
+            X = np.vstack([start, X])
+        return float(self.time(X[:-1], X[1:]).sum()) if len(X) > 1 else 0.0
+
+
+def nearest_neighbour_order(D: np.ndarray, first: int = 0) -> np.ndarray:
+    "Greedy tour through the nodes of the distance matrix `D` from `first`"
+    n = len(D)
+    order = np.empty(n, dtype=np.intp)
+    visited = np.zeros(n, dtype=bool)
+    current = first
+    for k in range(n):
+        order[k] = current
+        visited[current] = True
+        if k + 1 < n:
+            d = np.where(visited, np.inf, D[current])
+            current = int(np.argmin(d))
+    return order
+
+
+def two_opt(D: np.ndarray, order: np.ndarray, max_passes: int = 20) -> np.ndarray:
+    """Improve an open path starting at ``order[0]`` by reversing segments
+    while that shortens it"""
+    order = order.copy()
+    n = len(order)
+    for _ in range(max_passes):
+        improved = False
+        for i in range(1, n - 1):
+            a, b = order[i - 1], order[i]
+            j = np.arange(i + 1, n)
+            c = order[j]
+            nxt = order[np.minimum(j + 1, n - 1)]
+            after = np.where(j + 1 < n, D[b, nxt] - D[c, nxt], 0.0)
+            delta = D[a, c] - D[a, b] + after
+            k = int(np.argmin(delta))
+            if delta[k] < -1e-12:
+                order[i: j[k] + 1] = order[i: j[k] + 1][::-1].copy()
+                improved = True
+        if not improved:
+            break
+    return order
+
+
+@dataclasses.dataclass
+class ScheduleStats:
+    """Predicted and measured times of the scheduled batches
+
+    Attributes
+    ----------
+    batches, points : int
+        Scheduled batches and points
+    predicted_original : float
+        Predicted travel time in the order the points were generated
+    predicted_scheduled : float
+        Predicted travel time in the scheduled order
+    measured : float
+        Measured wall time of the scheduled evaluations
+    """
+    batches: int = 0
+    points: int = 0
+    predicted_original: float = 0.0
+    predicted_scheduled: float = 0.0
+    measured: float = 0.0
+
+    @property
+    def predicted_saved(self) -> float:
+        return self.predicted_original - self.predicted_scheduled
+
+    def summary(self) -> str:
+        return (f"{self.batches} batches, {self.points} points: travel "
+                f"{self.predicted_original:.2f} s -> {self.predicted_scheduled:.2f} s "
+                f"predicted ({self.predicted_saved:.2f} s saved), "
+                f"{self.measured:.2f} s measured")
+
+
+class TravelScheduler:
+    """
+    Reorders batches of target positions to minimize the motor travel time
+
+    The order is built by a nearest neighbour tour starting at the current
+    position, the last point of the previous batch, and improved by 2-opt.
+    `wrap` turns an objective into a batch objective, e.g. for
+    `AskTellStepper` or `run_ask_tell(..., vectorized=True)`, which
+    evaluates the points in the scheduled order and returns the values in
+    the original order.
+
+    Parameters
+    ----------
+    model : TravelTimeModel
+        Move time model of the motors, in the order of the parameters
+    start : np.ndarray | None
+        Current position, else the first batch starts at its first point
+    improve : bool
+        Improve the nearest neighbour tour with 2-opt
+    """
+
+    def __init__(
+        self,
+        model: TravelTimeModel,
+        start: np.ndarray | None = None,
+        improve: bool = True,
+    ) -> None:
+        self.model = model
+        self.position = None if start is None else np.asarray(start, dtype=np.float64)
+        self.improve = improve
+        self.stats = ScheduleStats()
+
+    @classmethod
+    def for_topas(
+        cls, topas: Topas, names: Sequence[str], overhead: float = 0.0, improve: bool = True
+    ) -> TravelScheduler:
+        "Scheduler for the motors `names` of `topas`, starting at their target positions"
+        model = TravelTimeModel.from_motors((topas.motors[n] for n in names), overhead)
+        start = [topas.motors[n].target_position for n in names]
+        return cls(model, start, improve)
+
+    def order(self, X: np.ndarray) -> np.ndarray:
+        "Visiting order of the rows of `X`, updates the predicted times"
+        X = np.asarray(X, dtype=np.float64)
+        if len(X) == 0:
+            return np.empty(0, dtype=np.intp)
+        nodes = X if self.position is None else np.vstack([self.position, X])
+        D = self.model.matrix(nodes)
+        path = nearest_neighbour_order(D)
+        if self.improve and len(path) > 3:
+            path = two_opt(D, path)
+        perm = path - 1 if self.position is not None else path
+        perm = perm[perm >= 0]
+        self.stats.batches += 1
+        self.stats.points += len(X)
+        self.stats.predicted_original += self.model.path_time(X, self.position)
+        self.stats.predicted_scheduled += self.model.path_time(X[perm], self.position)
+        self.position = X[perm[-1]].copy()
+        return perm
+
+    def wrap(self, func: ObjectiveFunc) -> BatchObjectiveFunc:
+        "Batch objective evaluating `func` on the rows in the scheduled order"
+
+        def batch(X: np.ndarray[Any, np.float64]) -> np.ndarray[Any, np.float64]:
+            y = np.empty(len(X))
+            t0 = time.perf_counter()
+            for i in self.order(X):
+                y[i] = func(X[i])
+            self.stats.measured += time.perf_counter() - t0
+            return y
+
+        return batch
@@ -0,0 +1,397 @@
+"""
+Simulated Topas PublicAPI server for offline tests and benchmarks.
+
+Serves the endpoints used by `topasoptim.TopasModel` over HTTP on the local
+machine. The motors follow trapezoidal velocity profiles limited by their
+``MaximalVelocity`` and ``Acceleration``, and every request can be delayed
+by a configurable network latency with random jitter.
+
+Run ``python -m topasoptim.simulator --help`` to start a standalone server.
+"""
+from __future__ import annotations
+
+import argparse
+import dataclasses
+import json
+import math
+import random
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any
+from urllib.parse import parse_qs, urlsplit
+
+from .TopasModel import TopasConnection, format_date
+
+
+@dataclasses.dataclass
+class SimulatedMotor:
+    """A motor moving along a trapezoidal velocity profile
+
+    Attributes
+    ----------
+    properties : dict[str, Any]
+        Static part of the ``/Motors/AllProperties`` entry of the motor
+    units_per_step : float
+        Conversion from steps to the unit of the motor
+    """
+    properties: dict[str, Any]
+    units_per_step: float = 1e-3
+    _start: float = dataclasses.field(init=False)
+    _target: int = dataclasses.field(init=False)
+    _t0: float = dataclasses.field(init=False, default=0.0)
+
+    def __post_init__(self) -> None:
+        self._start = float(self.properties["ActualPosition"])
+        self._target = int(self.properties["TargetPosition"])
+
+    @property
+    def index(self) -> int:
+        return self.properties["Index"]
+
+    @property
+    def target(self) -> int:
+        return self._target
+
+    def move_time(self, distance: float) -> float:
+        "Time in seconds to travel `distance` steps from rest to rest"
+        return trapezoid_time(
+            distance, self.properties["MaximalVelocity"], self.properties["Acceleration"]
+        )
+
+    def position(self, now: float) -> float:
+        "Position in steps at time `now`"
+        distance = self._target - self._start
+        if distance == 0:
+            return self._start
+        vmax = self.properties["MaximalVelocity"]
+        acc = self.properties["Acceleration"]
+        t = now - self._t0
+        if t >= self.move_time(abs(distance)):
+            return float(self._target)
+        t_acc = vmax / acc
+        d_acc = 0.5 * acc * t_acc**2
+        if 2 * d_acc > abs(distance):
+            # triangular profile, the motor never reaches vmax
+            t_acc = math.sqrt(abs(distance) / acc)
+            vmax = acc * t_acc
+            d_acc = abs(distance) / 2
+        t_total = self.move_time(abs(distance))
+        if t < t_acc:
+            travelled = 0.5 * acc * t**2
+        elif t < t_total - t_acc:
+            travelled = d_acc + vmax * (t - t_acc)
+        else:
+            t_left = t_total - t
+            travelled = abs(distance) - 0.5 * acc * t_left**2
+        return self._start + math.copysign(travelled, distance)
+
+    def set_target(self, target: int, now: float) -> None:
+        """Start moving to `target`; a running move is replaced by a new move
+        starting at rest from the current position"""
+        max_pos = self.properties.get("MaximalPosition")
+        target = max(0, int(target) if max_pos is None else min(int(target), max_pos))
+        self._start = self.position(now)
+        self._target = target
+        self._t0 = now
+
+    def changing_properties(self, now: float) -> dict[str, Any]:
+        "Entry of the motor in ``/Motors/PropertiesThatChangeOften``"
+        actual = round(self.position(now))
+        return {
+            "ActualPosition": actual,
+            "ActualPositionInSuperUnits": 0,
+            "ActualPositionInUnits": actual * self.units_per_step,
+            "Index": self.index,
+            "IsHoming": False,
+            "IsLeftSwitchPressed": False,
+            "IsRightSwitchPressed": False,
+            "TargetPosition": self._target,
+            "TargetPositionInSuperUnits": 0,
+            "TargetPositionInUnits": self._target * self.units_per_step,
+        }
+
+    def all_properties(self, now: float) -> dict[str, Any]:
+        "Entry of the motor in ``/Motors/AllProperties``"
+        return {**self.properties, **self.changing_properties(now)}
+
+
+def trapezoid_time(distance: float, vmax: float, acc: float) -> float:
+    "Time to travel `distance` from rest to rest with velocity and acceleration limits"
+    distance = abs(distance)
+    if distance == 0:
+        return 0.0
+    t_acc = vmax / acc
+    if acc * t_acc**2 > distance:
+        return 2 * math.sqrt(distance / acc)
+    return 2 * t_acc + (distance - acc * t_acc**2) / vmax
+
+
+def make_motor_properties(
+    index: int,
+    title: str,
+    position: int = 5000,
+    maximal_position: int = 20000,
+    maximal_velocity: float = 4000.0,
+    acceleration: float = 20000.0,
+    unit_name: str = "deg",
+) -> dict[str, Any]:
+    "Create an ``/Motors/AllProperties`` entry with realistic fields"
+    return {
+        "Acceleration": acceleration,
+        "ActualPosition": position,
+        "ActualPositionInSuperUnits": 0,
+        "ActualPositionInUnits": 0,
+        "Affix": 0,
+        "Current": 50,
+        "Factor": 0,
+        "ForbiddenRanges": [],
+        "Index": index,
+        "IsHoming": False,
+        "IsLeftSwitchPressed": False,
+        "IsRightSwitchPressed": False,
+        "MaximalPosition": maximal_position,
+        "MaximalPositionInUnits": 0,
+        "MaximalVelocity": maximal_velocity,
+        "MinimalPositionInUnits": 0,
+        "MinimalVelocity": 100,
+        "NamedPositions": [],
+        "PulseDivision": 4,
+        "RampDivision": 8,
+        "StepDivision": 4,
+        "SuperUnitsCalculator": {
+            "Expression": "x",
+            "ParserType": 0,
+            "UnitName": "",
+            "ValidUnitsRange": {"From": -1e300, "To": 1e300},
+        },
+        "TargetPosition": position,
+        "TargetPositionInSuperUnits": 0,
+        "TargetPositionInUnits": 0,
+        "Title": title,
+        "UnitName": unit_name,
+        "ZeroOffset": 0,
+    }
+
+
+def default_motors() -> list[SimulatedMotor]:
+    "Motors of a typical two-stage OPA"
+    names = ["Crystal 1", "Delay 1", "Crystal 2", "Delay 2", "Mixer 1", "Mixer 2"]
+    return [
+        SimulatedMotor(make_motor_properties(i, name, unit_name="mm" if "Delay" in name else "deg"))
+        for i, name in enumerate(names)
+    ]
+
+
+class TopasSimulator:
+    """
+    Local HTTP server simulating the Topas PublicAPI
+
+    Parameters
+    ----------
+    motors : list[SimulatedMotor] | None
+        Simulated motors, `default_motors` if None
+    latency : float
+        Mean network latency added to every request, in seconds
+    jitter : float
+        Standard deviation of a random, non-negative addition to the latency
+    serial_number : str
+        Serial number in the API url
+    host, port : str, int
+        Address to listen on, port 0 picks a free port
+    seed : int | None
+        Seed of the latency jitter
+    """
+
+    def __init__(
+        self,
+        motors: list[SimulatedMotor] | None = None,
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        serial_number: str = "14187",
+        host: str = "127.0.0.1",
+        port: int = 0,
+        seed: int | None = None,
+    ) -> None:
+        self.motors = {m.index: m for m in (motors or default_motors())}
+        self.latency = latency
+        self.jitter = jitter
+        self.serial_number = serial_number
+        self.positions: list[dict[str, Any]] = []
+        self.shutter_open = False
+        self.request_count = 0
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._prefix = f"/{serial_number}/v0/PublicAPI"
+        self._server = ThreadingHTTPServer((host, port), _make_handler(self))
+        self._server.daemon_threads = True
+        self._thread: threading.Thread | None = None
+
+    @property
+    def address(self) -> tuple[str, int]:
+        return self._server.server_address[:2]
+
+    @property
+    def base_address(self) -> str:
+        host, port = self.address
+        return f"http://{host}:{port}{self._prefix}"
+
+    def connection(self, **kwargs: Any) -> TopasConnection:
+        "Create a `TopasConnection` to the simulator"
+        host, port = self.address
+        return TopasConnection.from_info(
+            ip_address=host, port=str(port), serial_number=self.serial_number, **kwargs
+        )
+
+    def start(self) -> TopasSimulator:
+        "Serve in a background thread"
+        self._thread = threading.Thread(
+            target=self._server.serve_forever, name="topas-simulator", daemon=True
+        )
+        self._thread.start()
+        return self
+
+    def serve_forever(self) -> None:
+        "Serve in the calling thread until interrupted, e.g. by Ctrl-C"
+        self._server.serve_forever()
+
+    def stop(self) -> None:
+        "Stop serving and close the socket"
+        if self._thread is not None:
+            self._server.shutdown()
+            self._thread.join()
+            self._thread = None
+        self._server.server_close()
+
+    def __enter__(self) -> TopasSimulator:
+        return self.start()
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.stop()
+
+    def delay(self) -> float:
+        "Draw the latency of one request"
+        with self._lock:
+            jitter = abs(self._rng.gauss(0.0, self.jitter)) if self.jitter else 0.0
+        return self.latency + jitter
+
+    def handle(self, method: str, url: str, body: Any) -> tuple[int, Any]:
+        "Handle one request, returns the status code and the JSON response"
+        parts = urlsplit(url)
+        if not parts.path.startswith(self._prefix):
+            return 404, f"Unknown url: {url}"
+        path = parts.path[len(self._prefix):]
+        query = parse_qs(parts.query)
+        now = time.monotonic()
+        with self._lock:
+            self.request_count += 1
+            route = (method, path)
+            if route == ("GET", "/Motors/AllProperties"):
+                return 200, {"Motors": [m.all_properties(now) for m in self.motors.values()]}
+            if route == ("GET", "/Motors/PropertiesThatChangeOften"):
+                return 200, [m.changing_properties(now) for m in self.motors.values()]
+            if route in (("PUT", "/TargetPosition"), ("PUT", "/Motors/TargetPosition")):
+                try:
+                    motor = self.motors[int(query["id"][0])]
+                except (KeyError, ValueError):
+                    return 400, f"Unknown motor: {parts.query}"
+                motor.set_target(body, now)
+                return 200, None
+            if route == ("GET", "/Positions"):
+                return 200, self.positions
+            if route == ("POST", "/SaveCurrent"):
+                guid = str(uuid.uuid4())
+                body = body or {}
+                self.positions.append({
+                    "Comment": "",
+                    "Folder": body.get("Folder", ""),
+                    "GUID": guid,
+                    "MotorPositions": [
+                        {"Key": i, "Value": m.target} for i, m in self.motors.items()
+                    ],
+                    "Name": body.get("Name", ""),
+                    "TimeCreated": format_date(),
+                })
+                return 200, guid
+            if route == ("PUT", "/MoveMotorsToPosition"):
+                setting = next((p for p in self.positions if p["GUID"] == body), None)
+                if setting is None:
+                    return 400, f"Unknown position: {body}"
+                for pos in setting["MotorPositions"]:
+                    self.motors[pos["Key"]].set_target(pos["Value"], now)
+                return 200, None
+            if route == ("GET", "/ShutterInterlock/IsShutterOpen"):
+                return 200, self.shutter_open
+            if route == ("PUT", "/ShutterInterlock/OpenCloseShutter"):
+                self.shutter_open = bool(body)
+                return 200, None
+            if route == ("GET", "/CallerHasAccess"):
+                return 200, True
+        return 404, f"Unknown url: {url}"
+
+
+def _make_handler(sim: TopasSimulator) -> type[BaseHTTPRequestHandler]:
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        disable_nagle_algorithm = True
+
+        def _respond(self, method: str) -> None:
+            length = int(self.headers.get("Content-Length") or 0)
+            raw = self.rfile.read(length) if length else b""
+            try:
+                body = json.loads(raw) if raw else None
+            except ValueError:
+                status, result = 400, "Invalid JSON"
+            else:
+                status, result = sim.handle(method, self.path, body)
+            delay = sim.delay()
+            if delay > 0:
+                time.sleep(delay)
+            payload = b"" if result is None else json.dumps(result).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def do_GET(self) -> None:
+            self._respond("GET")
+
+        def do_PUT(self) -> None:
+            self._respond("PUT")
+
+        def do_POST(self) -> None:
+            self._respond("POST")
+
+        def log_message(self, *args: object) -> None:
+            pass
+
+    return Handler
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Simulated Topas PublicAPI server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--serial-number", default="14187")
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds")
+    parser.add_argument("--jitter", type=float, default=0.0, help="seconds")
+    args = parser.parse_args(argv)
+    sim = TopasSimulator(
+        latency=args.latency,
+        jitter=args.jitter,
+        serial_number=args.serial_number,
+        host=args.host,
+        port=args.port,
+    )
+    try:
+        sim.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        sim.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,255 @@
+from __future__ import annotations
+
+import dataclasses
+import json
+import os
+import sys
+import time
+from collections.abc import Mapping, Sequence
+from multiprocessing import resource_tracker, shared_memory
+
+import numpy as np
+
+MAGIC = 0x544F504153524E47  # "TOPASRNG"
+NAMES_SIZE = 4096
+"Bytes reserved for the JSON encoded motor names"
+
+HEADER_DTYPE = np.dtype([
+    ("magic", "u8"),
+    ("num_points", "i8"),
+    ("num_slots", "i8"),
+    ("num_motors", "i8"),
+    ("count", "i8"),
+    ("names_len", "i8"),
+])
+
+
+def slot_dtype(num_points: int, num_motors: int) -> np.dtype:
+    "Layout of one frame slot"
+    return np.dtype([
+        ("seq", "i8"),
+        ("index", "i8"),
+        ("timestamp", "f8"),
+        ("motors", "f8", (num_motors,)),
+        ("values", "f8", (num_points,)),
+    ])
+
+
+@dataclasses.dataclass(frozen=True)
+class SpectrumFrame:
+    """A frame read from a `SpectrumRing`
+
+    `values` and `motors` are views into the shared memory. The writer may
+    overwrite the slot once the ring wrapped around, check `valid` after
+    using the views or use `copy`. The views keep the memory mapped, drop
+    frames before closing the ring or keep copies.
+
+    Attributes
+    ----------
+    index : int
+        Number of the frame since the ring was created
+    timestamp : float
+        `time.time` given by the writer
+    values : np.ndarray
+        The spectrum
+    motors : np.ndarray
+        Motor positions in the order of `SpectrumRing.motor_names`
+    """
+    index: int
+    timestamp: float
+    values: np.ndarray
+    motors: np.ndarray
+    _slot: np.ndarray = dataclasses.field(repr=False)
+    _seq: int = dataclasses.field(repr=False)
+
+    @property
+    def valid(self) -> bool:
+        "False once the writer started to overwrite the slot"
+        return int(self._slot["seq"]) == self._seq
+
+    def copy(self) -> SpectrumFrame:
+        "Copy the views, raises `IndexError` if the slot was overwritten"
+        slot = self._slot.copy()
+        if not self.valid:
+            msg = f"frame {self.index} was overwritten"
+            raise IndexError(msg)
+        return dataclasses.replace(
+            self, values=slot["values"], motors=slot["motors"], _slot=slot)
+
+
+class SpectrumRing:
+    """
+    Ring buffer of spectra in shared memory
+
+    One process creates the ring and writes frames, any number of processes
+    attach to it by name and read frames without copying. The header holds
+    the frame counter, the motor names and the wavelength axis, every slot
+    holds a frame index, a timestamp, a motor snapshot and the spectrum.
+
+    Each slot is protected by a sequence number, which is odd while the slot
+    is written. Readers compare it before and after reading, so a torn frame
+    is detected instead of returned. There must be only one writer.
+
+    Use `create` and `attach` instead of the constructor.
+    """
+
+    def __init__(self, shm: shared_memory.SharedMemory, owner: bool) -> None:
+        self.shm = shm
+        self.owner = owner
+        buf = shm.buf
+        # np.frombuffer keeps the buffer exported, so the block cannot be
+        # unmapped while arrays into it are alive
+        self._header = np.frombuffer(buf, HEADER_DTYPE, 1).reshape(())
+        if int(self._header["magic"]) != MAGIC:
+            msg = f"shared memory {shm.name!r} is not a spectrum ring"
+            raise ValueError(msg)
+        self.num_points = int(self._header["num_points"])
+        self.num_slots = int(self._header["num_slots"])
+        num_motors = int(self._header["num_motors"])
+        offset = HEADER_DTYPE.itemsize
+        names = bytes(buf[offset: offset + int(self._header["names_len"])])
+        self.motor_names: list[str] = json.loads(names)
+        offset += NAMES_SIZE
+        self.wavelengths = np.frombuffer(buf, np.float64, self.num_points, offset)
+        offset += self.wavelengths.nbytes
+        self._slots = np.frombuffer(buf, slot_dtype(self.num_points, num_motors),
+                                    self.num_slots, offset)
+
+    @staticmethod
+    def nbytes(num_points: int, num_slots: int, num_motors: int) -> int:
+        "Size of the shared memory block"
+        return (HEADER_DTYPE.itemsize + NAMES_SIZE + 8 * num_points
+                + num_slots * slot_dtype(num_points, num_motors).itemsize)
+
+    @classmethod
+    def create(
+        cls,
+        num_points: int,
+        num_slots: int = 64,
+        motor_names: Sequence[str] = (),
+        wavelengths: np.ndarray | None = None,
+        name: str | None = None,
+    ) -> SpectrumRing:
+        "Create a new ring, the creating process owns and finally unlinks it"
+        names = json.dumps(list(motor_names)).encode()
+        if len(names) > NAMES_SIZE:
+            msg = f"motor names need more than {NAMES_SIZE} bytes"
+            raise ValueError(msg)
+        size = cls.nbytes(num_points, num_slots, len(motor_names))
+        shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        header = np.frombuffer(shm.buf, HEADER_DTYPE, 1).reshape(())
+        header["num_points"] = num_points
+        header["num_slots"] = num_slots
+        header["num_motors"] = len(motor_names)
+        header["count"] = 0
+        header["names_len"] = len(names)
+        shm.buf[HEADER_DTYPE.itemsize: HEADER_DTYPE.itemsize + len(names)] = names
+        header["magic"] = MAGIC
+        del header
+        ring = cls(shm, owner=True)
+        if wavelengths is None:
+            ring.wavelengths[:] = np.arange(num_points)
+        else:
+            ring.wavelengths[:] = wavelengths
+        ring._slots["seq"] = 0
+        ring._slots["index"] = -1
+        return ring
+
+    @classmethod
+    def attach(cls, name: str) -> SpectrumRing:
+        "Attach to a ring created by another process"
+        if sys.version_info >= (3, 13):
+            shm = shared_memory.SharedMemory(name=name, track=False)
+        else:
+            shm = shared_memory.SharedMemory(name=name)
+            if os.name == "posix":
+                # only the creator may unlink the block, see python/cpython#82300,
+                # the tracker knows it by the name with the leading slash
+                resource_tracker.unregister(f"/{shm.name}", "shared_memory")
+        return cls(shm, owner=False)
+
+    @property
+    def name(self) -> str:
+        return self.shm.name
+
+    @property
+    def count(self) -> int:
+        "Number of frames written"
+        return int(self._header["count"])
+
+    def write(
+        self,
+        values: np.ndarray,
+        motors: Mapping[str, float] | np.ndarray | None = None,
+        timestamp: float | None = None,
+    ) -> int:
+        "Write the next frame, returns its index"
+        index = self.count
+        slot = self._slots[index % self.num_slots]
+        seq = int(slot["seq"])
+        slot["seq"] = seq + 1
+        slot["index"] = index
+        slot["timestamp"] = time.time() if timestamp is None else timestamp
+        if motors is None:
+            slot["motors"] = np.nan
+        elif isinstance(motors, Mapping):
+            slot["motors"] = [motors.get(name, np.nan) for name in self.motor_names]
+        else:
+            slot["motors"] = motors
+        slot["values"] = values
+        slot["seq"] = seq + 2
+        self._header["count"] = index + 1
+        return index
+
+    def frame(self, index: int) -> SpectrumFrame:
+        """The frame with the given index, raises `IndexError` if it is not
+        written yet or already overwritten"""
+        slot = self._slots[index % self.num_slots]
+        seq = int(slot["seq"])
+        frame = SpectrumFrame(int(slot["index"]), float(slot["timestamp"]),
+                              slot["values"], slot["motors"], slot, seq)
+        if seq % 2 or frame.index != index or not frame.valid:
+            msg = f"frame {index} is not available"
+            raise IndexError(msg)
+        return frame
+
+    def latest(self) -> SpectrumFrame | None:
+        "The newest complete frame, None if nothing was written yet"
+        while (count := self.count) > 0:
+            try:
+                return self.frame(count - 1)
+            except IndexError:
+                continue
+        return None
+
+    def frames_since(self, index: int) -> list[SpectrumFrame]:
+        "All frames newer than `index` which are still in the ring"
+        count = self.count
+        start = max(index + 1, count - self.num_slots + 1)
+        frames = []
+        for i in range(start, count):
+            try:
+                frames.append(self.frame(i))
+            except IndexError:
+                continue
+        return frames
+
+    def close(self) -> None:
+        """Detach from the shared memory, the owner also unlinks it
+
+        Raises `BufferError` while frames returned by the ring are still
+        referenced, their views keep the memory mapped. The owner unlinks
+        the block anyway, call `close` again once the frames are gone."""
+        self._header = self._slots = self.wavelengths = None
+        try:
+            self.shm.close()
+        finally:
+            if self.owner:
+                self.owner = False
+                self.shm.unlink()
+
+    def __enter__(self) -> SpectrumRing:
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
@@ -0,0 +1,56 @@
+from __future__ import annotations
+
+import threading
+
+import numpy as np
+
+from topasoptim.acquisition import AcquisitionEngine
+
+
+class FakeSpectrometer:
+    """Acquisitions advancing a fake clock by `duration`, sets `done` after
+    `frames` acquisitions"""
+
+    def __init__(self, duration, frames):
+        self.now = 0.0
+        self.duration = duration
+        self.frames = frames
+        self.count = 0
+        self.done = threading.Event()
+
+    def clock(self):
+        return self.now
+
+    def __call__(self, x, y):
+        self.now += self.duration
+        self.count += 1
+        x[:] = np.arange(len(x))
+        y[:] = self.count
+        if self.count >= self.frames:
+            self.done.set()
+
+
+def test_acquisition_rate_and_consistency():
+    spec = FakeSpectrometer(duration=0.001, frames=20)
+    with AcquisitionEngine(spec, 1000, period=0.002, clock=spec.clock) as engine:
+        while not spec.done.is_set():
+            with engine.read() as frame:
+                assert np.all(frame.y == frame.y[0])
+    assert engine.frames == spec.count >= 20
+    assert engine.frame.y[0] == engine.frames
+    assert engine.overruns == 0
+
+
+def test_acquisition_counts_drops_and_overruns():
+    spec = FakeSpectrometer(duration=0.02, frames=5)
+    engine = AcquisitionEngine(spec, 10, period=0.005, clock=spec.clock)
+    engine.acquire_once()
+    engine.acquire_once()
+    with engine.read() as frame:
+        assert frame.index == 1
+    engine.acquire_once()
+    assert engine.drops == 1
+    with engine:
+        assert spec.done.wait(10)
+    assert engine.frames == spec.count >= 5
+    assert engine.overruns == engine.frames - 3
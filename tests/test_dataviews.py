@@ -0,0 +1,46 @@
+from __future__ import annotations
+
+import dataclasses
+
+import pytest
+
+dv = pytest.importorskip("topasoptim.imgui_dataviews")
+
+
+@dataclasses.dataclass
+class Settings:
+    name: str = "OPA"
+    steps: int = 1
+    wavelength: float = 800.0
+    enabled: bool = True
+    ranges: list[int] = dataclasses.field(default_factory=list)
+
+
+def test_view_plan_resolves_string_annotations():
+    plan = dv.view_plan(Settings)
+    assert plan.names == ("name", "steps", "wavelength", "enabled", "ranges")
+    assert plan.views == (dv.text_view, dv.int_view, dv.float_view, dv.bool_view,
+                          dv.default_view)
+    assert plan.edit_views[1] is dv.int_edit_view
+    assert dv.view_plan(Settings) is plan
+
+
+def test_data_view_labels_and_register():
+    settings = Settings()
+    view = dv.DataView(settings)
+    assert view.labels[0] == f"name##{id(settings)}"
+    plan = view.plan
+    dv.register_type_map(list[int], dv.text_view, dv.default_edit_view)
+    assert dv.view_plan(Settings) is not plan
+    assert dv.view_plan(Settings).views[-1] is dv.text_view
+    del dv.TYPE_MAP[list[int]], dv.TYPE_EDIT_MAP[list[int]]
+    dv._PLANS.clear()
+
+
+def test_two_argument_edit_views():
+    def legacy_edit_view(_name, _obj):
+        pass
+
+    assert not dv.takes_label(legacy_edit_view)
+    assert dv.takes_label(dv.int_edit_view)
+    assert dv.takes_label(lambda _name, _obj, *_args: None)
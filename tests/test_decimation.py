@@ -0,0 +1,84 @@
+from __future__ import annotations
+
+import numpy as np
+import pytest
+
+from topasoptim.decimation import DecimatedSeries, minmax_decimate
+
+
+def test_minmax_decimate_keeps_peaks():
+    rng = np.random.default_rng(0)
+    y = rng.normal(size=10_001)
+    y[1234] = 50.0
+    xd, yd = minmax_decimate(None, y, 100)
+    assert len(yd) <= 202
+    assert np.all(np.diff(xd) > 0)
+    assert yd.max() == 50.0
+    assert yd.min() == y.min()
+    x = np.arange(10.0)
+    assert minmax_decimate(x, x, 100)[0] is x
+
+
+def test_decimated_series_incremental():
+    rng = np.random.default_rng(1)
+    y = np.cumsum(rng.normal(size=200_000))
+    x = np.arange(len(y)) * 0.5
+    series = DecimatedSeries(block=16)
+    for end in (5, 1000, 1001, 77_777, 200_000):
+        series.update(x[:end], y[:end])
+    fresh = DecimatedSeries(block=16)
+    fresh.update(x, y)
+    xd, yd = series.decimate(500)
+    np.testing.assert_array_equal(xd, fresh.decimate(500)[0])
+    assert len(xd) <= 4 * 500 + 2 * 16
+    assert np.all(np.diff(xd) > 0)
+    assert yd.max() == y.max()
+    assert yd.min() == y.min()
+    xd, yd = series.decimate(100, x_range=(10_000.0, 20_000.0))
+    inside = y[20_000:40_001]
+    assert xd[0] <= 10_000
+    assert xd[-1] >= 20_000
+    assert yd.max() >= inside.max()
+    assert yd.min() <= inside.min()
+    assert len(xd) < 1000
+
+
+def test_decimated_series_rebuilds_after_drop():
+    y = np.arange(1000.0)
+    series = DecimatedSeries(block=8)
+    series.update(None, y)
+    series.update(None, y[100:] - 100, start=100)
+    _, yd = series.decimate(1000)
+    assert len(yd) == 900
+    assert yd[-1] == 899
+
+
+def test_decimated_series_trims_dropped_blocks():
+    rng = np.random.default_rng(2)
+    y = np.cumsum(rng.normal(size=50_000))
+    x = np.arange(len(y)) * 0.5
+    series = DecimatedSeries(block=16)
+    series.update(x[:20_000], y[:20_000])
+    for start, end in ((0, 20_000), (1000, 21_000), (1003, 30_000), (17_777, 50_000)):
+        series.update(x[start:end], y[start:end], start=start)
+        fresh = DecimatedSeries(block=16)
+        fresh.update(x[start:end], y[start:end], start=start)
+        for pixels, x_range in ((200, None), (50, (x[start + 5000], x[start + 9000]))):
+            xd, yd = series.decimate(pixels, x_range)
+            np.testing.assert_array_equal(xd, fresh.decimate(pixels, x_range)[0])
+            assert np.all(np.diff(xd) > 0)
+        xd, yd = series.decimate(200)
+        assert xd[0] >= x[start]
+        assert xd[-1] <= x[end - 1]
+        assert yd.max() == y[start:end].max()
+        assert yd.min() == y[start:end].min()
+
+
+def test_decimate_rejects_no_pixels():
+    y = np.arange(10.0)
+    with pytest.raises(ValueError, match="buckets"):
+        minmax_decimate(None, y, 0)
+    series = DecimatedSeries()
+    series.update(None, y)
+    with pytest.raises(ValueError, match="pixels"):
+        series.decimate(0)
@@ -0,0 +1,79 @@
+from __future__ import annotations
+
+import json
+
+import numpy as np
+import pytest
+
+from topasoptim import decoding
+from topasoptim.simulator import TopasSimulator, default_motors
+from topasoptim.TopasModel import MotorTable, Topas, TopasMotor
+
+
+def payload(separators=(", ", ": ")):
+    motors = default_motors()
+    for i, m in enumerate(motors):
+        m.set_target(5000 + 300 * i, 0.0)
+    return json.dumps([m.changing_properties(0.01) for m in motors],
+                      separators=separators).encode()
+
+
+@pytest.mark.parametrize("backend", decoding.BACKENDS)
+@pytest.mark.parametrize("separators", [(", ", ": "), (",", ":")])
+def test_backends_agree(backend, separators):
+    if backend == "orjson" and decoding.orjson is None:
+        pytest.skip("orjson is not installed")
+    raw = payload(separators)
+    expected = decoding.motor_states_from_dicts(json.loads(raw))
+    states = decoding.decode_motor_states(raw, backend=backend)
+    assert states.dtype == decoding.MOTOR_DTYPE
+    np.testing.assert_array_equal(states, expected)
+    assert states["target_position"].tolist() == [5000 + 300 * i for i in range(6)]
+
+
+def test_output_is_reused():
+    raw = payload()
+    out = np.zeros(6, decoding.MOTOR_DTYPE)
+    assert decoding.decode_motor_states(raw, out) is out
+    assert decoding.decode_motor_states(raw, out[:2]) is not out
+
+
+def test_invalid_payloads():
+    props = json.loads(payload())
+    props[2]["TargetPositionInUnits"] = None
+    states = decoding.decode_motor_states(json.dumps(props).encode())
+    assert np.isnan(states["target_position_in_units"][2])
+    del props[3]["TargetPosition"]
+    with pytest.raises(KeyError):
+        decoding.decode_motor_states(json.dumps(props).encode())
+    with pytest.raises(ValueError, match="Unknown backend"):
+        decoding.decode_motor_states(b"[]", backend="simdjson")
+
+
+def make_table():
+    return MotorTable(TopasMotor.from_dict(m.all_properties(0.0)) for m in default_motors())
+
+
+def test_table_update_states():
+    raw = payload()
+    expected = make_table()
+    expected.update(json.loads(raw))
+    table = make_table()
+    table.reorder(["Delay 2", "Crystal 1"])
+    table.update_states(decoding.decode_motor_states(raw)[::-1])
+    assert table.motors[0].target_position == 5900
+    assert table.target_positions(expected.names).tolist() == \
+        expected.target_positions().tolist()
+
+
+def test_connection_motor_states():
+    with TopasSimulator() as sim, sim.connection() as conn:
+        topas = Topas(connection=conn)
+        topas.move_motors({"Crystal 1": 5100}, wait=True, min_interval=0.001)
+        assert topas.get_actual_positions()["Crystal 1"] == 5100
+        states = conn.get_motor_states()
+        assert states["actual_position"].tolist() == [
+            m.actual_position for m in topas.motors.values()]
+        buf = topas._states_buf
+        topas.update_motor_positions()
+        assert topas._states_buf is buf
@@ -0,0 +1,79 @@
+from __future__ import annotations
+
+import numpy as np
+
+from topasoptim.evaluation import MemoizedObjective
+
+
+class Counter:
+    def __init__(self, values=None):
+        self.calls = 0
+        self.values = values
+
+    def __call__(self, x):
+        self.calls += 1
+        if self.values is not None:
+            return self.values[self.calls - 1]
+        return float(np.sum(np.rint(x) ** 2))
+
+
+def test_memoized_rounds_positions():
+    func = Counter()
+    memo = MemoizedObjective(func)
+    assert memo(np.array([1.2, 2.0])) == 5.0
+    assert memo(np.array([0.8, 2.4])) == 5.0
+    assert func.calls == 1
+    assert memo.stats.hits == 1
+    assert memo.stats.misses == 1
+    assert memo.stats.hit_rate == 0.5
+
+
+def test_memoized_averages_repeats():
+    func = Counter([1.0, 3.0])
+    memo = MemoizedObjective(func, repeats=2)
+    x = np.array([10.0])
+    assert memo(x) == 1.0
+    assert memo(x) == 2.0
+    assert memo(x) == 2.0
+    assert func.calls == 2
+
+
+def test_memoized_lru_eviction_and_age():
+    now = [0.0]
+    func = Counter()
+    memo = MemoizedObjective(func, maxsize=2, max_age=5.0, clock=lambda: now[0])
+    memo(np.array([1.0]))
+    memo(np.array([2.0]))
+    memo(np.array([1.0]))
+    memo(np.array([3.0]))  # evicts 2, the least recently used
+    assert len(memo) == 2
+    assert memo.stats.evictions == 1
+    memo(np.array([2.0]))
+    assert func.calls == 4
+    now[0] = 10.0
+    memo(np.array([2.0]))
+    assert func.calls == 5
+
+
+def test_memoized_batch_evaluates_missing_only():
+    func = Counter()
+    seen = []
+
+    def batch_func(X):
+        seen.append(len(X))
+        return np.sum(np.rint(X) ** 2, axis=1)
+
+    memo = MemoizedObjective(func, batch_func=batch_func)
+    memo(np.array([1.0, 1.0]))
+    y = memo.batch(np.array([[1.0, 1.0], [2.0, 0.0], [2.0, 0.1]]))
+    np.testing.assert_array_equal(y, [2.0, 4.0, 4.0])
+    assert seen == [1]
+    assert memo.stats.hits == 2
+
+
+def test_memoized_batch_measures_duplicates_once():
+    func = Counter()
+    memo = MemoizedObjective(func)
+    y = memo.batch(np.array([[3.0, 3.0], [1.0, 0.0], [3.2, 2.9]]))
+    np.testing.assert_array_equal(y, [18.0, 1.0, 18.0])
+    assert func.calls == 2
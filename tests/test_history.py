@@ -0,0 +1,64 @@
+from __future__ import annotations
+
+import numpy as np
+
+from topasoptim.history import OptimizerHistory
+
+
+def test_growth_and_views():
+    hist = OptimizerHistory(2, chunk_size=4)
+    hist.append([1, 2], 0.5, timestamp=10.0, settle_time=0.1)
+    view = hist.objective
+    assert np.shares_memory(view, hist.table())
+    hist.extend(np.arange(20).reshape(10, 2), np.arange(10), timestamp=np.arange(10))
+    assert len(hist) == 11
+    assert hist.capacity == 12
+    assert hist.get_history().shape == (11, 3)
+    assert hist.params[0].tolist() == [1, 2]
+    assert hist.objective[1:].tolist() == list(range(10))
+    assert hist.settle_time[0] == 0.1
+    assert np.isnan(hist.settle_time[1:]).all()
+
+
+def test_ring_buffer_keeps_last_rows_contiguous():
+    hist = OptimizerHistory(1, chunk_size=4, max_rows=8)
+    for i in range(21):
+        hist.append([i], float(i))
+    assert len(hist) == 8
+    assert hist.dropped == 13
+    table = hist.table()
+    assert table.flags.c_contiguous
+    assert hist.objective.tolist() == list(range(13, 21))
+    hist.extend(np.arange(100, 120)[:, None], np.arange(100, 120))
+    assert hist.objective.tolist() == list(range(112, 120))
+
+
+def test_batch_larger_than_ring():
+    hist = OptimizerHistory(1, chunk_size=4, max_rows=8)
+    hist.extend(np.arange(20.0)[:, None], np.arange(20.0))
+    assert len(hist) == 8
+    assert hist.dropped == 12
+    assert hist.objective.tolist() == list(range(12, 20))
+    hist = OptimizerHistory(1, chunk_size=4, max_rows=8)
+    hist.extend(np.arange(3.0)[:, None], np.arange(3.0))
+    hist.extend(np.arange(10.0)[:, None], np.arange(10.0))
+    assert hist.objective.tolist() == list(range(2, 10))
+    hist.append([10.0], 10.0)
+    assert hist.objective.tolist() == list(range(3, 11))
+
+
+def test_spill_to_disk(tmp_path):
+    path = tmp_path / "hist.bin"
+    hist = OptimizerHistory(3, chunk_size=4, max_rows=8, spill_path=path)
+    X = np.arange(60.0).reshape(20, 3)
+    hist.extend(X[:5], np.arange(5))
+    assert not hist.spilled
+    hist.extend(X[5:], np.arange(5, 20))
+    assert hist.spilled
+    assert len(hist) == 20
+    assert np.array_equal(hist.params, X)
+    hist.close()
+    on_disk = OptimizerHistory.open_spilled(path, 3)
+    assert on_disk.shape == (20, 6)
+    assert np.array_equal(on_disk[:, :3], X)
+    assert on_disk[:, 3].tolist() == list(range(20))
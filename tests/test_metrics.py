@@ -0,0 +1,44 @@
+from __future__ import annotations
+
+import numpy as np
+import pytest
+
+from topasoptim import metrics
+
+
+def gaussians(axis, centers, sigma=5.0):
+    wl = axis.wavelengths
+    return np.exp(-0.5 * ((wl - np.asarray(centers)[:, None]) / sigma) ** 2)
+
+
+def test_metrics_on_gaussian_batch():
+    axis = metrics.SpectralAxis(np.linspace(600, 800, 2001))
+    S = gaussians(axis, [650.0, 700.0, 750.0])
+    np.testing.assert_allclose(metrics.centroid(S, axis), [650, 700, 750], atol=1e-6)
+    np.testing.assert_allclose(metrics.fwhm(S, axis), 2 * np.sqrt(2 * np.log(2)) * 5, rtol=1e-4)
+    np.testing.assert_allclose(metrics.band_power(S, axis, 600, 800), np.sqrt(2 * np.pi) * 5,
+                               rtol=1e-6)
+    np.testing.assert_allclose(metrics.intensity_at(S, axis, 700.0), [0, 1, 0], atol=1e-12)
+    assert metrics.intensity_at(S[1], axis, 700.0, width=1.0)[0] == pytest.approx(1, abs=3e-3)
+    assert np.isnan(metrics.fwhm(np.ones((1, 2001)), axis)[0])
+
+
+def test_axis_validation_and_index():
+    axis = metrics.SpectralAxis([1.0, 2.0, 4.0])
+    assert [axis.index(w) for w in (0.0, 1.4, 1.6, 3.1, 9.0)] == [0, 0, 1, 2, 2]
+    with pytest.raises(ValueError, match="no pixels"):
+        axis.band(2.5, 3.5)
+    with pytest.raises(ValueError, match="strictly increasing"):
+        metrics.SpectralAxis([2.0, 1.0])
+
+
+def test_make_objective():
+    axis = metrics.SpectralAxis(np.linspace(600, 800, 201))
+
+    def measure(x):
+        return gaussians(axis, [x[0], x[0]])
+
+    power = metrics.make_objective(measure, metrics.intensity_metric(axis, 700.0))
+    assert power(np.array([700.0])) == pytest.approx(-1)
+    tune = metrics.make_objective(measure, metrics.centroid_metric(axis), target=690.0)
+    assert tune(np.array([700.0])) == pytest.approx(100, rel=1e-6)
@@ -0,0 +1,143 @@
+from __future__ import annotations
+
+import numpy as np
+import pytest
+
+from topasoptim.OptimizerModel import (
+    AskTellStepper,
+    StepAskTell,
+    evaluate_batch,
+    run_ask_tell,
+)
+from topasoptim.optimizers import SPSA, Bounds
+
+
+def sphere(x):
+    return float(np.sum((x - 3.0) ** 2))
+
+
+class RandomSearch:
+    """Minimal ask/tell optimizer sampling around the best point"""
+
+    def __init__(self, x0):
+        self.num_params = len(x0)
+        self.best = np.asarray(x0, dtype=float)
+        self.best_y = np.inf
+        self.rng = np.random.default_rng(0)
+        self.history = []
+
+    def ask(self, n=1):
+        return self.best + self.rng.normal(size=(n, self.num_params))
+
+    def tell(self, X, y):
+        self.history.extend(np.column_stack([X, y]))
+        i = np.argmin(y)
+        if y[i] < self.best_y:
+            self.best, self.best_y = X[i], y[i]
+
+    def get_history(self):
+        return np.array(self.history)
+
+
+class CoordinateStep:
+    """Minimal step-style optimizer probing each coordinate"""
+
+    num_params = 2
+
+    def __init__(self):
+        self.history = []
+
+    def step(self, params, func):
+        y0 = func(params)
+        for i in range(self.num_params):
+            for delta in (1.0, -1.0):
+                x = params.copy()
+                x[i] += delta
+                y = func(x)
+                if y < y0:
+                    params[:], y0 = x, y
+        self.history.append(y0)
+        return y0
+
+    def get_history(self):
+        return np.array(self.history)
+
+
+def test_evaluate_batch():
+    X = np.array([[3.0, 3.0], [4.0, 3.0]])
+    assert evaluate_batch(sphere, X).tolist() == [0.0, 1.0]
+
+
+def test_run_ask_tell_vectorized():
+    calls = []
+
+    def batch(X):
+        calls.append(len(X))
+        return np.sum((X - 3.0) ** 2, axis=1)
+
+    opt = RandomSearch(np.zeros(2))
+    x, y = run_ask_tell(opt, batch, max_evals=300, batch_size=16, vectorized=True)
+    assert sum(calls) == 300
+    assert max(calls) == 16
+    assert y < 0.1
+    assert opt.get_history().shape == (300, 3)
+
+
+def test_ask_tell_stepper():
+    stepper = AskTellStepper(RandomSearch(np.zeros(2)), batch_size=8)
+    params = np.zeros(2)
+    values = [stepper.step(params, sphere) for _ in range(40)]
+    assert values[-1] == sphere(params)
+    assert values[-1] < 0.5
+
+
+def test_step_ask_tell():
+    opt = StepAskTell(CoordinateStep(), np.zeros(2))
+    try:
+        for _ in range(40):
+            X = opt.ask(4)
+            assert X.shape == (1, 2)
+            opt.tell(X, evaluate_batch(sphere, X))
+        opt.ask()
+        with pytest.raises(RuntimeError):
+            opt.ask()
+    finally:
+        opt.close()
+    assert opt.params.tolist() == [3.0, 3.0]
+    assert opt.get_history()[-1] == 0.0
+
+
+def test_step_ask_tell_forwards_errors():
+    class Failing(CoordinateStep):
+        def step(self, _params, _func):
+            msg = "broken"
+            raise ValueError(msg)
+
+    opt = StepAskTell(Failing(), np.zeros(2))
+    with pytest.raises(ValueError, match="broken"):
+        opt.ask()
+    opt.close()
+
+
+def test_step_ask_tell_ends_with_the_budget():
+    opt = StepAskTell(SPSA(Bounds([0, 0], [10, 10]), x0=[5, 5], max_evals=4, seed=0),
+                      np.full(2, 5.0))
+    try:
+        for _ in range(4):
+            X = opt.ask()
+            opt.tell(X, evaluate_batch(sphere, X))
+        assert opt.ask().shape == (0, 2)
+        assert opt.ask().shape == (0, 2)
+    finally:
+        opt.close()
+    stepper = AskTellStepper(SPSA(Bounds([0, 0], [10, 10]), x0=[5, 5], max_evals=3))
+    opt = StepAskTell(stepper, np.full(2, 5.0))
+    try:
+        for _ in range(3):
+            X = opt.ask()
+            opt.tell(X, evaluate_batch(sphere, X))
+        assert len(opt.ask()) == 0
+    finally:
+        opt.close()
+    assert np.isnan(stepper.step(np.zeros(2), sphere))
+    assert stepper.done
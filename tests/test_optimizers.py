@@ -0,0 +1,99 @@
+from __future__ import annotations
+
+import numpy as np
+import pytest
+
+from topasoptim.OptimizerModel import run_ask_tell
+from topasoptim.optimizers import CMAES, SPSA, Bounds, NelderMead, PhasedOptimizer
+from topasoptim.TopasModel import TopasMotor
+
+OPTIMUM = np.array([400.0, 620.0, 100.0])
+
+
+def quadratic(X):
+    X = np.atleast_2d(X)
+    return np.sum(((X - OPTIMUM) / 100) ** 2, axis=1)
+
+
+@pytest.fixture()
+def bounds():
+    return Bounds(lower=[0, 0, 0], upper=[1000, 1000, 1000])
+
+
+def test_bounds_project():
+    b = Bounds(lower=[0, 0], upper=[100, 1], integer=[True, False],
+               forbidden=[[(10, 20), (95, 100)], []])
+    X = b.project([[12.2, 0.5], [18.7, 2.0], [-3, 0.25], [97, 0.1]])
+    assert X.tolist() == [[9, 0.5], [21, 1.0], [0, 0.25], [94, 0.1]]
+    assert b.contains(X).all()
+    assert not b.contains([[15, 0.5]]).any()
+    covered = Bounds(lower=[10], upper=[20], forbidden=[[(5, 30)]])
+    assert covered.project([[12], [19]]).tolist() == [[10], [10]]
+
+
+def test_bounds_from_motors():
+    motors = [
+        TopasMotor("a", 1, 0, 0, 0.0, 0.0, "deg", maximal_position=500,
+                   forbidden_ranges=[(100, 200)]),
+        TopasMotor("b", 2, 0, 0, 0.0, 0.0, "mm", maximal_position=800),
+    ]
+    b = Bounds.from_motors(motors)
+    assert b.upper.tolist() == [500, 800]
+    assert b.forbidden == [[(100, 200)], []]
+    motors[1].maximal_position = None
+    with pytest.raises(ValueError, match="maximal position"):
+        Bounds.from_motors(motors)
+
+
+@pytest.mark.parametrize(
+    ("opt", "max_evals", "tol"),
+    [
+        (lambda b: CMAES(b, x0=[500, 500, 500], seed=1), 400, 0.05),
+        (lambda b: NelderMead(b, x0=[500, 500, 500]), 200, 0.05),
+        (lambda b: NelderMead(b, x0=[500, 500, 500], speculative=True), 400, 0.05),
+        (lambda b: SPSA(b, x0=[500, 500, 500], num_perturbations=2, seed=1), 600, 0.5),
+    ],
+)
+def test_optimizers_converge(bounds, opt, max_evals, tol):
+    optimizer = opt(bounds)
+    x, y = run_ask_tell(optimizer, quadratic, max_evals, batch_size=8, vectorized=True)
+    assert y < tol
+    assert optimizer.evals <= max_evals
+    history = optimizer.get_history()
+    assert history.shape == (optimizer.evals, 4)
+    assert np.array_equal(history[:, :3], np.rint(history[:, :3]))
+    assert bounds.contains(history[:, :3]).all()
+    assert y == history[:, 3].min()
+
+
+def test_tell_in_any_order(bounds):
+    opt = CMAES(bounds, popsize=6, seed=0)
+    X = opt.ask(6)
+    assert len(opt.ask(1)) == 0
+    opt.tell(X[::-1], quadratic(X[::-1]))
+    assert opt.generation == 1
+    with pytest.raises(ValueError, match="not asked"):
+        opt.tell(X[:1], [0.0])
+
+
+def test_invalid_tell_keeps_state(bounds):
+    opt = CMAES(bounds, popsize=4, seed=0)
+    X = opt.ask(4)
+    with pytest.raises(ValueError, match="not asked"):
+        opt.tell(np.vstack([X[:2], X[:1]]), [1.0, 2.0, 3.0])
+    assert opt.evals == 0
+    assert len(opt.history) == 0
+    opt.tell(X, quadratic(X))
+    assert opt.generation == 1
+    with pytest.raises(TypeError):
+        PhasedOptimizer(bounds)
+
+
+def test_budget_and_step(bounds):
+    opt = NelderMead(bounds, max_evals=10)
+    params = np.zeros(3)
+    for _ in range(20):
+        value = opt.step(params, lambda x: float(quadratic(x)[0]))
+    assert opt.evals == 10
+    assert opt.done
+    assert value == float(quadratic(params)[0])
@@ -1,9 +1,32 @@
 from __future__ import annotations
 
 import importlib.metadata
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
 
 import topasoptim as m
 
 
 def test_version():
     assert importlib.metadata.version("topasoptim") == m.__version__
+
+
+def test_lazy_attributes():
+    from topasoptim.TopasModel import Topas
+
+    assert m.Topas is Topas
+    assert m.metrics.__name__ == "topasoptim.metrics"
+    assert "TopasPool" in dir(m)
+    assert set(m.__all__) == {"__version__", *m._LAZY_ATTRS}
+    with pytest.raises(AttributeError):
+        m.missing  # noqa: B018
+
+
+def test_import_is_light():
+    code = "import sys, topasoptim; print('numpy' in sys.modules)"
+    out = subprocess.run([sys.executable, "-c", code], capture_output=True,
+                         text=True, check=True, cwd=Path(m.__file__).parents[1])
+    assert out.stdout.strip() == "False"
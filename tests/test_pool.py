@@ -0,0 +1,62 @@
+from __future__ import annotations
+
+import socket
+import threading
+
+import pytest
+import requests
+
+from topasoptim.pool import TopasPool
+from topasoptim.simulator import TopasSimulator
+
+
+@pytest.fixture()
+def sims():
+    with TopasSimulator(serial_number="1", latency=0.01) as a, \
+            TopasSimulator(serial_number="2", latency=0.01) as b:
+        yield {"opa1": a, "opa2": b}
+
+
+def test_pool_parallel_control(sims):
+    devices = {name: {"ip_address": sim.address[0], "port": str(sim.address[1]),
+                      "serial_number": sim.serial_number}
+               for name, sim in sims.items()}
+    with TopasPool.connect(devices) as pool:
+        assert set(pool) == {"opa1", "opa2"}
+        session = pool["opa1"].connection.session
+        assert pool["opa2"].connection.session is session
+        settle = pool.move_motors({"opa1": {"Crystal 1": 5050},
+                                   "opa2": {"Delay 1": 4950}}, wait=True)
+        assert all(t > 0 for t in settle.values())
+        snaps = pool.snapshots()
+        assert snaps["opa1"].actual_positions["Crystal 1"] == 5050
+        assert snaps["opa2"].actual_positions["Delay 1"] == 4950
+        assert sims["opa2"].motors[0].target == 5000
+        summary = pool.summary()
+        assert summary["opa1"]["/Motors/AllProperties"]["calls"] == 1
+        results = pool.map(lambda name: 1 / 0 if name == "opa2" else name,
+                           return_exceptions=True)
+        assert results["opa1"] == "opa1"
+        assert isinstance(results["opa2"], ZeroDivisionError)
+        with pytest.raises(ZeroDivisionError):
+            pool.map(lambda _name: 1 / 0)
+    with pytest.raises(RuntimeError):
+        pool["opa1"].connection.put_many([("/TargetPosition?id=1", 0)])
+
+
+def pool_threads():
+    return [t for t in threading.enumerate() if t.name.startswith(("topas-pool", "topas-put"))]
+
+
+def test_pool_cleans_up_failed_connect(sims):
+    sim = sims["opa1"]
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        closed_port = sock.getsockname()[1]
+    devices = {"opa1": {"ip_address": sim.address[0], "port": str(sim.address[1]),
+                        "serial_number": sim.serial_number},
+               "offline": {"ip_address": "127.0.0.1", "port": str(closed_port)}}
+    threads = pool_threads()
+    with pytest.raises(requests.ConnectionError):
+        TopasPool.connect(devices, max_retries=0)
+    assert pool_threads() == threads
@@ -0,0 +1,95 @@
+from __future__ import annotations
+
+import json
+import time
+
+import numpy as np
+import pytest
+
+from topasoptim.acquisition import AcquisitionEngine
+from topasoptim.recording import RecordedSession, SessionRecorder
+from topasoptim.simulator import TopasSimulator
+from topasoptim.TopasModel import Topas
+
+
+@pytest.mark.parametrize("compress", [False, True])
+def test_recorder_roundtrip(tmp_path, compress):
+    with SessionRecorder(tmp_path, segment_rows=4, compress=compress) as rec:
+        for i in range(10):
+            rec.record_spectrum(np.full(3, float(i)), timestamp=i,
+                                wavelengths=[1.0, 2.0, 3.0])
+        rec.record_moves({2: 100, 3: 200}, timestamp=5.0)
+        rec.record_event("goto_position", guid="abc")
+    index = json.loads((tmp_path / "index.json").read_text())
+    assert [s["rows"] for s in index["streams"]["spectra"]["segments"]] == [4, 4, 2]
+    session = RecordedSession.load(tmp_path)
+    np.testing.assert_array_equal(session.spectrum_time, np.arange(10))
+    np.testing.assert_array_equal(session.spectra[:, 0], np.arange(10))
+    np.testing.assert_array_equal(session.wavelengths, [1, 2, 3])
+    np.testing.assert_array_equal(session.moves, [[5, 2, 100], [5, 3, 200]])
+    assert session.events[0]["guid"] == "abc"
+    assert len(session.motor_time) == 0
+
+
+class SlowRecorder(SessionRecorder):
+    def _write(self, item):
+        time.sleep(0.01)
+        super()._write(item)
+
+
+def test_recorder_drops_when_full(tmp_path):
+    rec = SlowRecorder(tmp_path, max_queue=1)
+    for _ in range(100):
+        rec.record_spectrum(np.zeros(2))
+    rec.close()
+    assert rec.dropped > 0
+    assert rec.dropped + rec.recorded == 100
+
+
+def test_topas_records_motors_moves_and_frames(tmp_path):
+    with TopasSimulator() as sim, sim.connection() as conn:
+        topas = Topas(connection=conn)
+        rec = topas.start_recording(tmp_path)
+        topas.move_motors({"Crystal 1": 5100}, wait=True)
+        engine = AcquisitionEngine(
+            lambda _x, y: y.fill(1.0), 5,
+            on_frame=lambda f: rec.record_spectrum(f.y, f.timestamp))
+        engine.acquire_once()
+        topas.stop_recording()
+    session = RecordedSession.load(tmp_path)
+    assert session.motor_names == list(topas.table.names)
+    col = session.motor_names.index("Crystal 1")
+    assert session.actual_positions[-1, col] == 5100
+    assert session.moves[0, 1:].tolist() == [topas.motors["Crystal 1"].index, 5100]
+    assert session.spectra.shape == (1, 5)
+
+
+def test_motor_columns_survive_reorder(tmp_path):
+    with TopasSimulator() as sim, sim.connection() as conn:
+        topas = Topas(connection=conn)
+        topas.start_recording(tmp_path)
+        topas.update_motor_positions()
+        topas.set_parameter_order(["Delay 2", "Crystal 1"])
+        topas.move_motors({"Delay 2": 5200}, wait=True)
+        topas.stop_recording()
+    session = RecordedSession.load(tmp_path)
+    assert session.motor_names[0] == "Crystal 1"
+    col = session.motor_names.index("Delay 2")
+    assert session.target_positions[-1, col] == 5200
+    assert session.target_positions[-1, 0] == 5000
+
+
+def test_motor_removed_after_recording_started(tmp_path):
+    with TopasSimulator() as sim, sim.connection() as conn:
+        topas = Topas(connection=conn)
+        topas.start_recording(tmp_path)
+        topas.update_motor_positions()
+        index = topas.motors["Mixer 2"].index
+        del sim.motors[index]
+        topas.update_motors()
+        topas.update_motor_positions()
+        topas.stop_recording()
+    session = RecordedSession.load(tmp_path)
+    col = session.motor_indices.index(index)
+    assert np.isnan(session.actual_positions[-1, col])
+    assert not np.isnan(np.delete(session.actual_positions[-1], col)).any()
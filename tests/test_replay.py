@@ -0,0 +1,71 @@
+from __future__ import annotations
+
+import numpy as np
+import pytest
+
+from topasoptim import metrics
+from topasoptim.OptimizerModel import run_ask_tell
+from topasoptim.optimizers import Bounds, NelderMead
+from topasoptim.recording import RecordedSession
+from topasoptim.replay import ReplayConnection, ReplaySpectrometer, make_measure
+from topasoptim.TopasModel import Topas
+
+WAVELENGTHS = np.linspace(600, 800, 101)
+
+
+def grid_session():
+    "Spectra on a grid of two motors, brightest at (5200, 4900)"
+    c1, d1 = np.meshgrid(np.arange(4800, 5601, 20), np.arange(4600, 5201, 20))
+    pos = np.column_stack([c1.ravel(), d1.ravel()]).astype(float)
+    amp = np.exp(-((pos[:, 0] - 5200) ** 2 + (pos[:, 1] - 4900) ** 2) / 200**2)
+    spectra = amp[:, None] * np.exp(-0.5 * ((WAVELENGTHS - 700) / 10) ** 2)
+    t = np.arange(len(pos), dtype=float)
+    return RecordedSession(
+        motor_names=["Crystal 1", "Delay 1"], motor_indices=[3, 7],
+        motor_time=t, actual_positions=pos, target_positions=pos,
+        moves=np.empty((0, 3)), spectrum_time=t + 0.5, spectra=spectra,
+        wavelengths=WAVELENGTHS, events=[])
+
+
+def test_replay_connection_moves_instantly():
+    conn = ReplayConnection(grid_session())
+    topas = Topas(connection=conn)
+    assert topas.get_actual_positions() == {"Crystal 1": 4800, "Delay 1": 4600}
+    assert topas.move_motors({"Crystal 1": 5000}, wait=True) < 0.1
+    assert conn.motion_time > 0
+    guid = topas.save_positions("here", "")
+    topas.move_motor("Crystal 1", 4800)
+    topas.goto_position_by_id(guid)
+    assert topas.get_actual_positions()["Crystal 1"] == 5000
+
+
+def test_replay_connection_posts_without_body():
+    conn = ReplayConnection(grid_session())
+    assert conn.post("http://replay/SaveCurrent", None).status_code == 200
+    assert conn.saved_positions[-1]["Name"] == ""
+
+
+@pytest.mark.parametrize("k", [1, 4])
+def test_replay_spectrometer_interpolates(k):
+    session = grid_session()
+    spec = ReplaySpectrometer(session, ReplayConnection(session), k=k)
+    assert spec.spectra_at([5200, 4900])[0, 50] == pytest.approx(1)
+    near = spec.spectra_at([[5205, 4903], [4800, 4600]])
+    assert near[0, 50] == pytest.approx(1, abs=0.01)
+    assert near[1, 50] < 0.01
+
+
+def test_replay_optimization():
+    session = grid_session()
+    conn = ReplayConnection(session)
+    topas = Topas(connection=conn)
+    spec = ReplaySpectrometer(session, conn)
+    axis = metrics.SpectralAxis(WAVELENGTHS)
+    func = metrics.make_objective(
+        make_measure(topas, spec, ["Crystal 1", "Delay 1"]),
+        metrics.intensity_metric(axis, 700.0))
+    opt = NelderMead(Bounds([4800, 4600], [5600, 5200]), x0=[5000, 4700], initial_step=0.2)
+    x, y = run_ask_tell(opt, func, 100)
+    assert y < -0.95
+    assert np.allclose(x, [5200, 4900], atol=40)
+    assert spec.reads == opt.evals
@@ -0,0 +1,66 @@
+from __future__ import annotations
+
+import numpy as np
+
+from topasoptim.scan import Scan, ScanAxis, grid_order
+from topasoptim.simulator import TopasSimulator
+from topasoptim.TopasModel import Topas
+
+
+def test_grid_order_snake():
+    assert list(grid_order((2, 3))) == [(0, 0), (0, 1), (0, 2), (1, 2), (1, 1), (1, 0)]
+    assert len(set(grid_order((3, 2, 4)))) == 24
+    assert list(grid_order((2, 2), snake=False))[2] == (1, 0)
+
+
+def test_scan_2d_on_simulator():
+    with TopasSimulator() as sim, sim.connection() as conn:
+        topas = Topas(connection=conn)
+        axes = [ScanAxis.linspace("Crystal 1", 5000, 5100, 3),
+                ScanAxis.arange("Delay 1", 4900, 4960, 20)]
+        visited = []
+
+        def acquire():
+            pos = topas.get_actual_positions()
+            visited.append((pos["Crystal 1"], pos["Delay 1"]))
+            return np.array([pos["Crystal 1"], pos["Delay 1"]], dtype=float)
+
+        progress = []
+        scan = Scan(topas, axes, acquire, process=lambda x: x * 2, progress=progress.append)
+        result = scan.run()
+    assert result.data.shape == (3, 4, 2)
+    assert result.done.all()
+    np.testing.assert_array_equal(result.data[2, 1], [2 * 5100, 2 * 4920])
+    assert visited[3:5] == [(5000, 4960), (5050, 4960)]
+    assert [p.done for p in progress] == list(range(1, 13))
+    assert progress[-1].remaining == 0
+    assert np.all(result.settle_time >= 0)
+
+
+def test_scan_stop():
+    with TopasSimulator() as sim, sim.connection() as conn:
+        topas = Topas(connection=conn)
+        scan = Scan(topas, [ScanAxis.linspace("Crystal 1", 5000, 5010, 5)], lambda: 1.0)
+        scan.progress = lambda p: p.done == 2 and scan.stop()
+        result = scan.run()
+    assert 2 <= result.done.sum() < 5
+    assert np.isnan(result.data[~result.done]).all()
+
+
+def test_scan_keeps_result_on_process_error():
+    with TopasSimulator() as sim, sim.connection() as conn:
+        topas = Topas(connection=conn)
+        axes = [ScanAxis.linspace("Crystal 1", 5000, 5010, 3)]
+        positions = iter([5000, 5005, 5010])
+
+        def process(x):
+            if x == 5005:
+                raise ZeroDivisionError
+            return x
+
+        scan = Scan(topas, axes, lambda: next(positions), process=process)
+        result = scan.run()
+    assert result.done.tolist() == [True, False, True]
+    assert list(result.errors) == [(1,)]
+    assert isinstance(result.errors[(1,)], ZeroDivisionError)
+    assert result.data[2] == 5010
@@ -0,0 +1,48 @@
+from __future__ import annotations
+
+import itertools
+
+import numpy as np
+import pytest
+
+from topasoptim.scheduling import TravelScheduler, TravelTimeModel, travel_times
+from topasoptim.simulator import TopasSimulator, trapezoid_time
+from topasoptim.TopasModel import Topas
+
+
+def test_travel_times_match_trapezoid():
+    d = np.array([0.0, 10.0, 500.0, 5000.0])
+    expected = [trapezoid_time(x, 4000.0, 20000.0) for x in d]
+    np.testing.assert_allclose(travel_times(d, 4000.0, 20000.0), expected)
+
+
+def test_scheduler_finds_short_path():
+    model = TravelTimeModel([1000.0, 1000.0], [1e6, 1e6])
+    rng = np.random.default_rng(0)
+    X = rng.uniform(0, 1000, (7, 2))
+    scheduler = TravelScheduler(model, start=[0.0, 0.0])
+    perm = scheduler.order(X)
+    assert sorted(perm) == list(range(7))
+    best = min(model.path_time(X[list(p)], [0, 0]) for p in itertools.permutations(range(7)))
+    assert model.path_time(X[perm], [0, 0]) <= 1.1 * best
+    assert scheduler.stats.predicted_saved > 0
+    np.testing.assert_array_equal(scheduler.position, X[perm[-1]])
+
+
+def test_wrap_returns_values_in_original_order():
+    model = TravelTimeModel([1000.0], [1e5])
+    scheduler = TravelScheduler(model)
+    visited = []
+    batch = scheduler.wrap(lambda x: visited.append(x[0]) or x[0] * 2)
+    X = np.array([[0.0], [900.0], [100.0], [800.0], [200.0]])
+    np.testing.assert_array_equal(batch(X), X[:, 0] * 2)
+    assert visited == [0, 100, 200, 800, 900]
+    assert scheduler.stats.points == 5
+
+
+def test_model_from_motors():
+    with TopasSimulator() as sim, sim.connection() as conn:
+        topas = Topas(connection=conn)
+    names = ["Crystal 1", "Delay 1"]
+    model = TravelTimeModel.from_motors(topas.motors[n] for n in names)
+    assert model.time([0, 0], [400, 0]) == pytest.approx(trapezoid_time(400, 4000, 20000))
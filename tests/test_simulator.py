@@ -0,0 +1,143 @@
+from __future__ import annotations
+
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from topasoptim.cache import ResponseCache
+from topasoptim.simulator import (
+    SimulatedMotor,
+    TopasSimulator,
+    make_motor_properties,
+    trapezoid_time,
+)
+from topasoptim.TopasModel import Topas
+
+
+@pytest.fixture()
+def topas():
+    with TopasSimulator() as sim, sim.connection() as conn:
+        yield Topas(connection=conn)
+
+
+def test_trapezoid_profile():
+    motor = SimulatedMotor(
+        make_motor_properties(0, "m", position=0, maximal_velocity=100, acceleration=100)
+    )
+    motor.set_target(1000, now=0.0)
+    t_total = motor.move_time(1000)
+    assert t_total == pytest.approx(trapezoid_time(1000, 100, 100)) == 11.0
+    assert motor.position(0.5) == pytest.approx(12.5)
+    assert motor.position(t_total / 2) == pytest.approx(500)
+    assert motor.position(t_total) == 1000
+    # triangular profile for short moves
+    motor.set_target(1100, now=t_total)
+    assert motor.position(t_total + 1.0) == pytest.approx(1050)
+
+
+def test_topas_on_simulator(topas):
+    assert list(topas.motors) == [
+        "Crystal 1", "Delay 1", "Crystal 2", "Delay 2", "Mixer 1", "Mixer 2"
+    ]
+    assert topas.get_authentication_status()
+    topas.toggle_shutter(True)
+    assert topas.is_open()
+    settle_time = topas.move_motors({"Crystal 1": 5400, "Delay 2": 4800}, wait=True)
+    assert 0.1 < settle_time < 1.0
+    positions = topas.get_actual_positions()
+    assert positions["Crystal 1"] == 5400
+    assert positions["Delay 2"] == 4800
+
+
+def test_saved_positions(topas):
+    topas.move_motors({"Crystal 1": 5100}, wait=True)
+    guid = topas.save_positions("start", "tests")
+    assert topas.positions[guid].name == "start"
+    topas.move_motors({"Crystal 1": 5000}, wait=True)
+    topas.goto_position_by_name("start")
+    topas.wait_for_motors(["Crystal 1"])
+    assert topas.motors["Crystal 1"].actual_position == 5100
+    response = topas.connection.post("/SaveCurrent", None)
+    assert response.ok
+    topas.load_positions()
+    assert topas.positions[response.json()].name == ""
+
+
+def test_unknown_motor(topas):
+    response = topas.connection.put("/TargetPosition?id=99", 1)
+    assert response.status_code == 400
+
+
+def test_connection_stats(topas):
+    stats = topas.connection.enable_stats()
+    with stats.trace("step") as trace:
+        topas.move_motors({"Crystal 1": 5050, "Crystal 2": 5050}, wait=True)
+    assert trace.endpoints["/TargetPosition"].calls == 2
+    polls = trace.endpoints["/Motors/PropertiesThatChangeOften"]
+    assert polls.calls >= 1
+    assert polls.bytes_received > 0
+    assert trace.calls == 2 + polls.calls
+    assert trace.request_time > 0
+    topas.connection.put("/TargetPosition?id=99", 1)
+    summary = stats.summary()["/TargetPosition"]
+    assert summary["calls"] == 3
+    assert summary["errors"] == 1
+    assert summary["p50"] <= summary["p95"] <= summary["p99"]
+    assert stats.reset()["/TargetPosition"].calls == 3
+    assert stats.snapshot() == {}
+
+
+def test_response_cache(topas):
+    conn = topas.connection
+    cache = conn.enable_cache({"/Motors/PropertiesThatChangeOften": 60.0})
+    requests_made = conn.enable_stats()
+    for _ in range(3):
+        topas.update_motors()
+        topas.get_authentication_status()
+        topas.update_motor_positions()
+    assert cache.hits == {
+        "/Motors/AllProperties": 2,
+        "/CallerHasAccess": 2,
+        "/Motors/PropertiesThatChangeOften": 2,
+    }
+    assert requests_made.snapshot()["/Motors/AllProperties"].calls == 1
+    # a move invalidates every endpoint holding the motor positions
+    topas.move_motors({"Crystal 1": 5100})
+    topas.update_motor_positions()
+    assert cache.misses["/Motors/PropertiesThatChangeOften"] == 2
+    assert topas.motors["Crystal 1"].target_position == 5100
+    topas.update_motors()
+    assert cache.misses["/Motors/AllProperties"] == 2
+    assert topas.motors["Crystal 1"].target_position == 5100
+    topas.update_motors()
+    assert cache.hits["/Motors/AllProperties"] == 3
+    # saving a position invalidates the saved positions
+    guid = topas.save_positions("cached", "")
+    assert guid in topas.positions
+    assert cache.misses["/Positions"] == 1
+    assert 0 < cache.hit_rate() < 1
+
+
+def test_cache_drops_response_older_than_invalidation():
+    cache = ResponseCache()
+    url = "/Motors/AllProperties"
+    generation = cache.generation(url)
+    cache.written("/TargetPosition?id=1")
+    cache.store(url, "stale", generation)
+    assert cache.lookup(url) == (False, None)
+    cache.store(url, "fresh", cache.generation(url))
+    assert cache.lookup(url) == (True, "fresh")
+    generation = cache.generation(url)
+    cache.invalidate()
+    cache.store(url, "stale", generation)
+    assert cache.lookup(url) == (False, None)
+
+
+def test_get_many_on_busy_shared_executor():
+    with (TopasSimulator() as sim, ThreadPoolExecutor(1) as executor,
+          sim.connection(executor=executor) as conn):
+        topas = Topas(connection=conn, lazy=True)
+        topas.preload().result(timeout=5)
+        urls = ["/Motors/AllProperties", "/Positions", "/CallerHasAccess"]
+        assert conn.get_many(urls) == [conn.get(url) for url in urls]
+        assert conn.executor is executor
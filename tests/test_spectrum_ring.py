@@ -0,0 +1,57 @@
+from __future__ import annotations
+
+import multiprocessing
+
+import numpy as np
+import pytest
+
+from topasoptim.spectrum_ring import SpectrumRing
+
+
+def _write_frames(name, n):
+    ring = SpectrumRing.attach(name)
+    for i in range(n):
+        ring.write(np.full(ring.num_points, float(i)), {"Crystal 1": 100 + i})
+    ring.close()
+
+
+def test_ring_roundtrip_and_wrap():
+    with SpectrumRing.create(16, num_slots=4, motor_names=["Crystal 1", "Delay 1"],
+                             wavelengths=np.linspace(600, 700, 16)) as ring:
+        assert ring.latest() is None
+        reader = SpectrumRing.attach(ring.name)
+        assert reader.motor_names == ["Crystal 1", "Delay 1"]
+        assert reader.wavelengths[-1] == 700
+        for i in range(6):
+            ring.write(np.full(16, float(i)), {"Crystal 1": i}, timestamp=i)
+        frame = reader.latest()
+        assert frame.index == 5
+        assert frame.values[0] == 5.0
+        assert frame.motors[0] == 5
+        assert np.isnan(frame.motors[1])
+        assert [f.index for f in reader.frames_since(1)] == [3, 4, 5]
+        with pytest.raises(IndexError):
+            reader.frame(0)
+        old = reader.frame(3)
+        ring.write(np.zeros(16))
+        ring.write(np.zeros(16))
+        assert not old.valid
+        with pytest.raises(IndexError):
+            old.copy()
+        with pytest.raises(BufferError):
+            reader.close()
+        del frame, old
+        reader.close()
+
+
+def test_ring_across_processes():
+    with SpectrumRing.create(8, num_slots=16, motor_names=["Crystal 1"]) as ring:
+        ctx = multiprocessing.get_context("spawn")
+        proc = ctx.Process(target=_write_frames, args=(ring.name, 10))
+        proc.start()
+        proc.join(30)
+        assert proc.exitcode == 0
+        assert ring.count == 10
+        frame = ring.latest().copy()
+        assert frame.values[0] == 9.0
+        assert frame.motors[0] == 109
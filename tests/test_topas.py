@@ -1,8 +1,16 @@
 from __future__ import annotations
 
+import asyncio
 import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pytest
 
 import topasoptim.TopasModel as tm
+from topasoptim.AsyncTopasModel import AsyncTopas, AsyncTopasConnection
 
 test_props = """{
   "Motors": [
@@ -129,12 +137,14 @@ test_props = """{
   ]
 }"""
 
+# The motors are matched by their "Index", so the indices are those of the
+# motors in test_props.
 changing_props = """[
   {
     "ActualPosition": 75,
     "ActualPositionInSuperUnits": 0,
     "ActualPositionInUnits": 0,
-    "Index": 38,
+    "Index": 86,
     "IsHoming": false,
     "IsLeftSwitchPressed": false,
     "IsRightSwitchPressed": false,
@@ -146,7 +156,7 @@ changing_props = """[
     "ActualPosition": 69,
     "ActualPositionInSuperUnits": 0,
     "ActualPositionInUnits": 0,
-    "Index": 23,
+    "Index": 95,
     "IsHoming": false,
     "IsLeftSwitchPressed": false,
     "IsRightSwitchPressed": false,
@@ -197,6 +207,15 @@ position_settings = r"""
 
 
 class MockConnection:
+    def __init__(self):
+        self.puts = []
+
+    def put(self, url, data):
+        self.puts.append((url, data))
+
+    def put_many(self, items):
+        return [self.put(url, data) for url, data in items]
+
     def get(self, url):
         url_data_map = {
             "/Motors/AllProperties": json.loads(test_props),
@@ -211,6 +230,30 @@ class MockConnection:
         raise ValueError(msg)
 
 
+class MovingConnection(MockConnection):
+    """Motors approach their target by `speed` steps on every poll"""
+
+    def __init__(self, speed=10):
+        super().__init__()
+        self.speed = speed
+        self.polls = 0
+        self.state = {m["Index"]: m for m in json.loads(changing_props)}
+
+    def put(self, url, data):
+        super().put(url, data)
+        index = int(url.partition("id=")[2])
+        self.state[index]["TargetPosition"] = data
+
+    def get(self, url):
+        if url != "/Motors/PropertiesThatChangeOften":
+            return super().get(url)
+        self.polls += 1
+        for m in self.state.values():
+            diff = m["TargetPosition"] - m["ActualPosition"]
+            m["ActualPosition"] += max(-self.speed, min(self.speed, diff))
+        return [dict(m) for m in self.state.values()]
+
+
 def test_from_dict():
     """Test the from_dict method of TopasModel."""
     data = json.loads(test_props)
@@ -219,3 +262,287 @@ def test_from_dict():
 
 def test_update_motors():
     tm.Topas(connection=MockConnection())
+
+
+def test_connection_endpoint_timeouts():
+    conn = tm.TopasConnection.from_info(
+        timeout=0.5, endpoint_timeouts={"/TargetPosition": 2.0}
+    )
+    assert conn.timeout_for("/TargetPosition?id=3") == 2.0
+    assert conn.timeout_for("/Positions") == 0.5
+    conn.close()
+
+
+def test_connection_pool():
+    with tm.TopasConnection.from_info(pool_size=7, max_retries=3) as conn:
+        adapter = conn.session.get_adapter(conn.baseAddress)
+        assert adapter._pool_maxsize == 7
+        assert adapter.max_retries.total == 3
+        assert "POST" not in adapter.max_retries.allowed_methods
+
+
+def test_update_motor_positions():
+    topas = tm.Topas(connection=MockConnection())
+    assert topas.get_actual_positions() == {
+        "Local High School Dropouts Cut in Half": 75,
+        "Officials Determine Crash Occured When Plane Hit the Ground": 69,
+    }
+
+
+def test_async_topas():
+    async def run():
+        conn = MockConnection()
+        async with AsyncTopasConnection(connection=conn) as aconn:
+            topas = await AsyncTopas.create(aconn)
+            sync_topas = tm.Topas(connection=MockConnection())
+            assert topas.motors == sync_topas.motors
+            assert topas.positions == sync_topas.positions
+            assert (
+                await topas.get_target_positions()
+                == sync_topas.get_target_positions()
+            )
+            await topas.move_motors(
+                {
+                    "Local High School Dropouts Cut in Half": 10,
+                    "Officials Determine Crash Occured When Plane Hit the Ground": 20.0,
+                }
+            )
+        return conn.puts
+
+    puts = asyncio.run(run())
+    assert sorted(puts) == [("/TargetPosition?id=86", 10), ("/TargetPosition?id=95", 20)]
+
+
+def test_async_topas_shares_operations(tmp_path):
+    async def run():
+        conn = MockConnection()
+        async with AsyncTopasConnection(connection=conn) as aconn:
+            topas = AsyncTopas(connection=aconn)
+            recorder = topas.start_recording(tmp_path)
+            await topas.move_motor("Local High School Dropouts Cut in Half", 5)
+            assert topas.initialized
+            await topas.update_motor_positions()
+            topas.stop_recording()
+        return conn.puts, recorder
+
+    puts, recorder = asyncio.run(run())
+    assert puts == [("/TargetPosition?id=86", 5)]
+    assert recorder.recorded == 2
+
+
+def test_move_motors_wait():
+    conn = MovingConnection(speed=10)
+    topas = tm.Topas(connection=conn)
+    name = "Local High School Dropouts Cut in Half"
+    assert topas.move_motors({name: 130}, wait=False) is None
+    settle_time = topas.move_motors({name: 130}, wait=True, min_interval=0.0)
+    assert settle_time >= 0
+    assert topas.motors[name].actual_position == 130
+    assert conn.polls == 6
+
+
+def test_move_motors_timeout():
+    topas = tm.Topas(connection=MovingConnection(speed=0))
+    with pytest.raises(TimeoutError):
+        topas.move_motors(
+            {"Local High School Dropouts Cut in Half": 100}, wait=True, timeout=0.02
+        )
+
+
+def test_async_move_motors_wait():
+    async def run():
+        conn = MovingConnection(speed=10)
+        async with AsyncTopasConnection(connection=conn) as aconn:
+            topas = await AsyncTopas.create(aconn)
+            await topas.move_motors(
+                {"Officials Determine Crash Occured When Plane Hit the Ground": 0},
+                wait=True,
+                min_interval=0.0,
+            )
+            return await topas.get_actual_positions()
+
+    positions = asyncio.run(run())
+    assert positions["Officials Determine Crash Occured When Plane Hit the Ground"] == 0
+
+
+def test_poller_snapshots_and_subscriptions():
+    conn = MovingConnection(speed=10)
+    topas = tm.Topas(connection=conn)
+    name = "Local High School Dropouts Cut in Half"
+    changes = []
+    poller = topas.start_polling(fast_interval=0.001, slow_interval=10.0)
+    try:
+        poller.subscribe(lambda n, snap: changes.append(snap.actual_positions[n]), [name])
+        polls = conn.polls
+        snapshot = topas.snapshot()
+        assert topas.get_actual_positions() == dict(snapshot.actual_positions)
+        assert conn.polls == polls
+        with pytest.raises(TypeError):
+            snapshot.actual_positions[name] = 0
+        topas.move_motors({name: 105})
+        deadline = time.time() + 5
+        while topas.snapshot().actual_positions[name] != 105 and time.time() < deadline:
+            time.sleep(0.001)
+    finally:
+        topas.stop_polling()
+    assert changes[-1] == 105
+    assert changes == sorted(changes)
+    assert not topas.snapshot().moving
+
+
+def test_motor_table_views():
+    topas = tm.Topas(connection=MockConnection())
+    first = "Local High School Dropouts Cut in Half"
+    second = "Officials Determine Crash Occured When Plane Hit the Ground"
+    assert topas.table.data["index"].tolist() == [86, 95]
+    topas.set_parameter_order([second, first])
+    params = topas.params
+    assert params.tolist() == [47, 19]
+    topas.update_motor_positions()
+    assert params.tolist() == [69, 75]
+    assert np.shares_memory(params, topas.table.data)
+    assert topas.motors[first].actual_position == 75
+    assert topas.table.target_positions([first, second]).tolist() == [69, 25]
+    topas.motors[first].actual_position = 3
+    assert params.tolist() == [69, 3]
+    with pytest.raises(ValueError, match="read-only"):
+        params[0] = 1
+
+
+def test_standalone_motor():
+    motor = tm.TopasMotor.from_dict(json.loads(test_props)["Motors"][0])
+    assert motor.actual_position == 19
+    assert isinstance(motor.actual_position, int)
+    assert motor == tm.TopasMotor.from_dict(json.loads(test_props)["Motors"][0])
+    assert "actual_position=19" in repr(motor)
+
+
+def test_position_store_sync():
+    data = json.loads(position_settings)
+    store = tm.PositionStore(data)
+    assert len(store) == 2
+    assert [p.GUID for p in store.find_by_name("")] == [d["GUID"] for d in data]
+    created = store[data[0]["GUID"]].created
+    assert created.utcoffset().total_seconds() == 3 * 3600
+    assert created.timestamp() == 1500038173.392
+    assert tm.format_date(created) == "/Date(1500038173392+0300)/"
+    assert tm.parse_date(tm.format_date()).utcoffset().total_seconds() == 0
+
+    new = dict(data[1], GUID="new", Name="scan", Folder="f",
+               TimeCreated="/Date(1600000000000)/")
+    changed = dict(data[1], Name="renamed")
+    result = store.sync([changed, new])
+    assert result == tm.PositionSync(
+        added=["new"], changed=[data[1]["GUID"]], removed=[data[0]["GUID"]])
+    assert store.find_by_name("") == []
+    assert store.find_by_name("renamed")[0].GUID == data[1]["GUID"]
+    assert store.find_by_folder("f") == [store["new"]]
+    assert store.created_between(start=created) == [
+        store[data[1]["GUID"]], store["new"]]
+    assert store.created_between(end=created) == []
+    assert store.sync([changed, new]) == tm.PositionSync()
+
+
+def test_position_store_invalid_date(caplog):
+    data = json.loads(position_settings)
+    broken = dict(data[1], GUID="broken", TimeCreated="yesterday")
+    store = tm.PositionStore([data[0], broken])
+    assert len(store) == 2
+    assert store["broken"].created is None
+    assert "broken" in caplog.text
+    assert store.created_between() == [store[data[0]["GUID"]]]
+    assert store.sync([data[0]]).removed == ["broken"]
+
+
+def test_goto_position_by_name():
+    conn = MockConnection()
+    topas = tm.Topas(connection=conn)
+    topas.goto_position_by_name("")
+    assert conn.puts == [("/MoveMotorsToPosition", json.loads(position_settings)[0]["GUID"])]
+    with pytest.raises(KeyError):
+        topas.goto_position_by_name("missing")
+
+
+class CountingConnection(MockConnection):
+    def __init__(self, delay=0.0):
+        super().__init__()
+        self.delay = delay
+        self.gets = []
+
+    def get(self, url):
+        self.gets.append(url)
+        time.sleep(self.delay)
+        return super().get(url)
+
+
+def test_initial_fetches_are_concurrent():
+    conn = CountingConnection(delay=0.05)
+    t0 = time.perf_counter()
+    topas = tm.Topas(connection=conn)
+    assert time.perf_counter() - t0 < 0.09
+    assert sorted(conn.gets) == ["/Motors/AllProperties", "/Positions"]
+    assert topas.initialized
+    assert len(topas.positions) == 2
+
+
+def test_lazy_topas():
+    conn = CountingConnection()
+    topas = tm.Topas(connection=conn, lazy=True)
+    assert conn.gets == []
+    assert topas.motors == {}
+    name = "Local High School Dropouts Cut in Half"
+    topas.move_motor(name, 10)
+    assert topas.initialized
+    assert conn.puts == [("/TargetPosition?id=86", 10)]
+    assert topas.motors == tm.Topas(connection=MockConnection()).motors
+    topas.get_actual_positions()
+    assert conn.gets.count("/Motors/AllProperties") == 1
+
+
+def test_preload():
+    conn = CountingConnection(delay=0.02)
+    topas = tm.Topas(connection=conn, lazy=True)
+    future = topas.preload()
+    topas.set_parameter_order(["Local High School Dropouts Cut in Half"])
+    assert future.done()
+    future.result()
+    assert conn.gets.count("/Motors/AllProperties") == 1
+    assert topas.params.tolist() == [19]
+
+
+def test_preload_on_connection_executor():
+    conn = CountingConnection()
+    release = threading.Event()
+    with ThreadPoolExecutor(1) as conn.executor:
+        conn.executor.submit(release.wait)
+        topas = tm.Topas(connection=conn, lazy=True)
+        future = topas.preload()
+        assert topas.preload() is future
+        release.set()
+        future.result()
+    assert conn.gets.count("/Motors/AllProperties") == 1
+
+
+def test_lazy_positions_initialize():
+    conn = CountingConnection()
+    topas = tm.Topas(connection=conn, lazy=True)
+    topas.load_positions()
+    assert topas.initialized
+    assert len(topas.motors) == 2
+
+
+def test_move_motors_wait_uses_poller():
+    conn = MovingConnection(speed=10)
+    topas = tm.Topas(connection=conn)
+    name = "Local High School Dropouts Cut in Half"
+    poller = topas.start_polling(fast_interval=0.001, slow_interval=10.0)
+    try:
+        settle_time = topas.move_motors({name: 130}, wait=True, timeout=5.0)
+        assert settle_time >= 0
+        assert topas.snapshot().settled([name])
+        assert topas.snapshot().actual_positions[name] == 130
+        assert conn.polls == poller.polls
+        topas.update_motor_positions()
+        assert conn.polls == poller.polls + 1
+    finally:
+        topas.stop_polling()